@@ -3,6 +3,11 @@ ASGI config for FarmerChain project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server so negotiation event streams
+(/api/negotiation/<pk>/stream/) are coroutines rather than blocked threads:
+
+    uvicorn FarmerChain.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -6,6 +6,8 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
@@ -31,6 +33,8 @@ INSTALLED_APPS = [
     'corsheaders',
 
     # Custom apps
+    'common',
+    'users',
     'farmer',
     'fpo',
     'retailer',
@@ -112,6 +116,9 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Keyset pagination on (created_at, id); clients may pass ?page_size= up to 200
+    "DEFAULT_PAGINATION_CLASS": "common.pagination.KeysetPagination",
+    "PAGE_SIZE": 50,
 }
 from datetime import timedelta
 
@@ -121,9 +128,91 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Per-process cache of the Farmer/FPO/Retailer/Admin row behind each JWT
+# (users/principal_cache.py). TTL is in seconds; 0 disables the cache.
+PRINCIPAL_CACHE = {
+    "MAX_ENTRIES": 10000,
+    "TTL": 60,
+}
+
+# Opt-in: put approval status and a token version into the JWT so requests are
+# authenticated and authorized without a DB query. Revoked principals
+# (rejected, logged out) are tracked in users.PrincipalRevocation and mirrored
+# in-process, refreshed every REVOCATION_REFRESH seconds.
+STATELESS_AUTH = {
+    "ENABLED": False,
+    "REVOCATION_REFRESH": 5,
+}
+
+# Process pool for PBKDF2 hashing/verification on login and registration
+# (users/password_pool.py), WORKERS processes per web worker. MAX_PENDING
+# caps the jobs queued or running across every web worker on the host (lock
+# files in LOCK_DIR, default: the temp dir); beyond it, or after TIMEOUT
+# seconds, requests get a 429. Keep MAX_PENDING below the web server's total
+# workers x threads so a login storm can't occupy all of them, and near the
+# core count to bound hashing CPU. WORKERS = 0 hashes inline, unbounded.
+PASSWORD_POOL = {
+    "WORKERS": 1,
+    "MAX_PENDING": 4,
+    "TIMEOUT": 30,
+    "LOCK_DIR": None,
+}
+
+# Sealed-bid auctions (common/auction.py): score = PRICE_WEIGHT * bid_amount
+# - DELIVERY_WEIGHT * delivery_time_days; order books keep the TOP_K best
+# bids and reload from the database after REFRESH_SECONDS.
+AUCTION = {
+    "PRICE_WEIGHT": 1.0,
+    "DELIVERY_WEIGHT": 0.5,
+    "TOP_K": 10,
+    "REFRESH_SECONDS": 30,
+}
+
+# Quote recommendations (common/matching.py, match_quotes command)
+MATCHING = {
+    "CATEGORY_WEIGHT": 0.4,
+    "QUANTITY_WEIGHT": 0.15,
+    "PRICE_WEIGHT": 0.2,
+    "REGION_WEIGHT": 0.25,
+    "REGION_SCALE_KM": 300,
+    "TOP_N": 50,
+    "MIN_SCORE": 0.05,
+    # Score matrix cells per chunk; bounds memory per batch
+    "MAX_CELLS": 2_000_000,
+}
+
+# Idempotency-Key replay on create endpoints (common/idempotency.py). Keys
+# are kept for TTL seconds; a first request that hasn't finished after
+# IN_PROGRESS_TIMEOUT seconds is assumed dead and the key can be reclaimed.
+IDEMPOTENCY = {
+    "TTL": 24 * 3600,
+    "IN_PROGRESS_TIMEOUT": 60,
+}
+
+# Negotiation SSE streams (negotiation/stream.py). Idle streams send a
+# keepalive and re-read the table every KEEPALIVE seconds (this is how
+# messages from other workers arrive); connections end after MAX_SECONDS
+# and the browser reconnects with Last-Event-ID after RETRY_MS.
+NEGOTIATION_STREAM = {
+    "KEEPALIVE": 15,
+    "MAX_SECONDS": 300,
+    "QUEUE_SIZE": 100,
+    "RETRY_MS": 3000,
+}
+
+# Per-process cache (farmer/contract_cache.py). With several workers point
+# this at a shared backend (Redis/Memcached) so invalidations reach them all.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "farmerchain",
+    }
+}
+
 
 # CORS (React frontend)
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 # Or restrict like:
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:3000",
@@ -3,7 +3,7 @@ from django.contrib import admin
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from users.token import CustomTokenObtainPairView
-from users.views import CookieTokenRefreshView, LogoutView  # Add this import
+from users.views import CookieTokenRefreshView, LogoutView, MetricsView, AccountStatusView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -17,4 +17,6 @@ urlpatterns = [
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', CookieTokenRefreshView.as_view(), name='token_refresh'),  # Updated
     path('api/token/logout/', LogoutView.as_view(), name='token_logout'),  # New endpoint
+    path('api/token/status/', AccountStatusView.as_view(), name='token_account_status'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
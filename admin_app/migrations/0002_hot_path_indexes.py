@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admin',
+            index=models.Index(fields=['created_at', 'id'], name='admin_created_idx'),
+        ),
+    ]
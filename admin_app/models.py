@@ -7,6 +7,11 @@ class Admin(models.Model):
     wallet_address = models.CharField(max_length=100, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='admin_created_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
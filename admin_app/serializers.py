@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from users.models import identifier_taken
+from users.password_pool import hash_password
 from .models import Admin
 
 class AdminSerializer(serializers.ModelSerializer):
@@ -7,15 +9,27 @@ class AdminSerializer(serializers.ModelSerializer):
         fields = '__all__'
         extra_kwargs = {'password': {'write_only': True}}
 
+    def validate_username(self, value):
+        if identifier_taken(value, 'admin', getattr(self.instance, 'pk', None)):
+            raise serializers.ValidationError("Admin with this username already exists.")
+        return value
+
 class AdminRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Admin
         fields = ['username', 'password', 'wallet_address']
-        extra_kwargs = {'password': {'write_only': True}}
+        # Uniqueness is checked against the credential index in validate_username
+        extra_kwargs = {'password': {'write_only': True}, 'username': {'validators': []}}
+
+    def validate_username(self, value):
+        if identifier_taken(value, 'admin'):
+            raise serializers.ValidationError("Admin with this username already exists.")
+        return value
 
     def create(self, validated_data):
         password = validated_data.pop('password')
-        admin = Admin.objects.create(**validated_data)
-        admin.set_password(password)
+        admin = Admin(**validated_data)
+        # Hash off-thread and insert once, instead of INSERT then UPDATE
+        admin.password = hash_password(password)
         admin.save()
         return admin
\ No newline at end of file
@@ -1,3 +1,99 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from common import metrics
+from common.geo import locate
+from common.testing import make_admin, make_farmer, make_fpo, auth_header
+from farmer.models import FarmerQuote
+from users.principal_cache import principal_cache
+from users.revocation import revocation_set
+
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        principal_cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.admin = make_admin()
+        self.farmer = make_farmer()
+
+    def test_repeat_requests_hit_cache(self):
+        headers = auth_header(self.farmer, 'farmer')
+        self.client.get('/api/farmer/dashboard/', **headers)
+        with self.assertNumQueries(1):  # dashboard stats row only, no principal lookup
+            response = self.client.get('/api/farmer/dashboard/', **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metrics.get('principal_cache.misses'), 1)
+        self.assertEqual(metrics.get('principal_cache.hits'), 1)
+
+    def test_reject_evicts_cached_principal(self):
+        farmer_headers = auth_header(self.farmer, 'farmer')
+        self.assertEqual(self.client.get('/api/farmer/dashboard/', **farmer_headers).status_code, 200)
+
+        response = self.client.post(f'/api/admin/reject-farmer/{self.farmer.id}/', **auth_header(self.admin, 'admin'))
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get('/api/farmer/dashboard/', **farmer_headers).status_code, 403)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get('/api/metrics/', **auth_header(self.farmer, 'farmer')).status_code, 403)
+        response = self.client.get('/api/metrics/', **auth_header(self.admin, 'admin'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('principal_cache.misses', response.json())
+
+
+@override_settings(STATELESS_AUTH={'ENABLED': True, 'REVOCATION_REFRESH': 60})
+class StatelessAuthTests(TestCase):
+    def setUp(self):
+        principal_cache.clear()
+        revocation_set.clear()
+        self.client = APIClient()
+        self.admin = make_admin()
+        self.farmer = make_farmer()
+        self.farmer.set_password('password123')
+        self.farmer.save()
+
+    def login(self, account=None, role='farmer'):
+        account = account or self.farmer
+        response = self.client.post('/api/token/', {
+            'username': account.email, 'password': 'password123', 'role': role,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.cookies.clear()
+        return {'HTTP_AUTHORIZATION': f"Bearer {response.json()['access']}"}
+
+    def test_authorizes_from_claims_without_principal_query(self):
+        headers = self.login()
+        revocation_set.refresh(force=True)
+        with self.assertNumQueries(1):  # dashboard stats row only
+            response = self.client.get('/api/farmer/dashboard/', **headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_reject_revokes_issued_tokens(self):
+        headers = self.login()
+        self.client.post(f'/api/admin/reject-farmer/{self.farmer.id}/', **auth_header(self.admin, 'admin'))
+        self.assertEqual(self.client.get('/api/farmer/dashboard/', **headers).status_code, 401)
+
+    def test_logout_revokes_issued_tokens(self):
+        headers = self.login()
+        self.assertEqual(self.client.post('/api/token/logout/', **headers).status_code, 200)
+        self.assertEqual(self.client.get('/api/farmer/dashboard/', **headers).status_code, 401)
+
+    def test_stand_ins_resolve_their_location(self):
+        headers = self.login()
+        response = self.client.post('/api/farmer/quotes/', {
+            'product_name': 'Rice', 'category': 'Grains', 'description': 'Sona masuri', 'quantity': '10',
+            'unit': 'quintal', 'deadline': str(date.today() + timedelta(days=5)),
+        }, format='json', **headers)
+        self.assertEqual(response.status_code, 201)
+        quote = FarmerQuote.objects.get(pk=response.json()['id'])
+        self.assertEqual((quote.latitude, quote.longitude), locate('Pune', 'Maharashtra'))
+
+        fpo = make_fpo(city='Nashik', state='Maharashtra')
+        fpo.set_password('password123')
+        fpo.save()
+        response = self.client.get('/api/fpo/quotes/farmer/open/?order=nearby&radius_km=300', **self.login(fpo, 'fpo'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [quote.id])
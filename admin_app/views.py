@@ -12,6 +12,9 @@ from retailer.models import Retailer
 from farmer.serializers import FarmerSerializer
 from fpo.serializers import FPOSerializer
 from retailer.serializers import RetailerSerializer
+from users.models import Credential, normalize_identifier
+from users.principal_cache import invalidate_principal
+from users.revocation import revoke_principal
 
 
 class AdminRegistrationView(generics.CreateAPIView):
@@ -35,20 +38,18 @@ class AdminRegistrationView(generics.CreateAPIView):
 @permission_classes([AllowAny])
 def admin_login_check(request):
     username = request.data.get('username')
-    
-    try:
-        admin = Admin.objects.get(username=username)
+
+    if Credential.objects.filter(identifier=normalize_identifier(username), role='admin').exists():
         return Response({
             'message': 'Admin account found. You can proceed to login.',
             'approved': True,
             'status': 'approved'
         }, status=status.HTTP_200_OK)
-    except Admin.DoesNotExist:
-        return Response({
-            'message': 'Admin not found with this username.',
-            'approved': False,
-            'status': 'not_found'
-        }, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'message': 'Admin not found with this username.',
+        'approved': False,
+        'status': 'not_found'
+    }, status=status.HTTP_404_NOT_FOUND)
 
 
 class AdminListView(generics.ListAPIView):
@@ -62,14 +63,25 @@ class AdminDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AdminSerializer
     permission_classes = [IsAuthenticated, IsAdminApp]
 
+    def perform_update(self, serializer):
+        admin = serializer.save()
+        invalidate_principal('admin', admin.id)
+
+    def perform_destroy(self, instance):
+        admin_id = instance.id
+        instance.delete()
+        invalidate_principal('admin', admin_id)
+        revoke_principal('admin', admin_id)
+
 
 # New views for admin approval system
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminApp])
 def pending_registrations(request):
-    pending_farmers = Farmer.objects.filter(approval_status='pending')
-    pending_fpos = FPO.objects.filter(approval_status='pending')
-    pending_retailers = Retailer.objects.filter(approval_status='pending')
+    # Served by the partial *_pending_idx indexes
+    pending_farmers = Farmer.objects.filter(approval_status='pending').order_by('created_at')
+    pending_fpos = FPO.objects.filter(approval_status='pending').order_by('created_at')
+    pending_retailers = Retailer.objects.filter(approval_status='pending').order_by('created_at')
     
     farmer_serializer = FarmerSerializer(pending_farmers, many=True)
     fpo_serializer = FPOSerializer(pending_fpos, many=True)
@@ -88,6 +100,7 @@ def approve_farmer(request, farmer_id):
     farmer = get_object_or_404(Farmer, id=farmer_id)
     farmer.approval_status = 'approved'
     farmer.save()
+    invalidate_principal('farmer', farmer.id)
     return Response({'message': 'Farmer approved successfully'})
 
 
@@ -97,6 +110,8 @@ def reject_farmer(request, farmer_id):
     farmer = get_object_or_404(Farmer, id=farmer_id)
     farmer.approval_status = 'rejected'
     farmer.save()
+    invalidate_principal('farmer', farmer.id)
+    revoke_principal('farmer', farmer.id)
     return Response({'message': 'Farmer rejected successfully'})
 
 
@@ -106,6 +121,7 @@ def approve_fpo(request, fpo_id):
     fpo = get_object_or_404(FPO, id=fpo_id)
     fpo.approval_status = 'approved'
     fpo.save()
+    invalidate_principal('fpo', fpo.id)
     return Response({'message': 'FPO approved successfully'})
 
 
@@ -115,6 +131,8 @@ def reject_fpo(request, fpo_id):
     fpo = get_object_or_404(FPO, id=fpo_id)
     fpo.approval_status = 'rejected'
     fpo.save()
+    invalidate_principal('fpo', fpo.id)
+    revoke_principal('fpo', fpo.id)
     return Response({'message': 'FPO rejected successfully'})
 
 
@@ -124,6 +142,7 @@ def approve_retailer(request, retailer_id):
     retailer = get_object_or_404(Retailer, id=retailer_id)
     retailer.approval_status = 'approved'
     retailer.save()
+    invalidate_principal('retailer', retailer.id)
     return Response({'message': 'Retailer approved successfully'})
 
 
@@ -133,4 +152,6 @@ def reject_retailer(request, retailer_id):
     retailer = get_object_or_404(Retailer, id=retailer_id)
     retailer.approval_status = 'rejected'
     retailer.save()
+    invalidate_principal('retailer', retailer.id)
+    revoke_principal('retailer', retailer.id)
     return Response({'message': 'Retailer rejected successfully'})
\ No newline at end of file
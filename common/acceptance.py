@@ -0,0 +1,38 @@
+"""
+Bid acceptance as a single conditional transition. All reads and permission
+checks happen before the transaction, which is then just a handful of
+UPDATEs, so the SQLite write lock is held only briefly.
+"""
+from django.db import transaction
+
+from common import metrics
+from common.stats import ACCEPTED, OPEN, bid_status_changed, quote_status_changed
+
+REJECTED = 'rejected'
+
+
+def accept_bid(bid, quote_status, *, owner_role, owner_id, bidder_role, bidder_id):
+    """
+    Award `bid`'s quote to it: the quote moves open -> `quote_status` only if
+    it is still open (UPDATE ... WHERE status='open'), the bid is accepted and
+    every other bid on the quote rejected in one UPDATE. Returns False, with
+    nothing written, if another acceptance got there first.
+    """
+    bid_model = type(bid)
+    quote_model = bid_model._meta.get_field('quote').related_model
+    with transaction.atomic():
+        won = quote_model.objects.filter(pk=bid.quote_id, status=OPEN).update(
+            status=quote_status, accepted_bid=bid
+        )
+        if not won:
+            metrics.incr('bid_acceptance.conflicts')
+            return False
+        bid_model.objects.filter(pk=bid.pk).update(status=ACCEPTED)
+        bid_model.objects.filter(quote_id=bid.quote_id).exclude(pk=bid.pk).exclude(status=REJECTED).update(
+            status=REJECTED
+        )
+        bid_status_changed(bidder_role, bidder_id, bid.status, ACCEPTED)
+        quote_status_changed(owner_role, owner_id, OPEN, quote_status)
+    bid.status = ACCEPTED
+    metrics.incr('bid_acceptance.accepted')
+    return True
@@ -0,0 +1,163 @@
+"""
+Sealed-bid auctions for quotes with auction_enabled set.
+
+Each auctioned quote has an in-memory order book holding its best TOP_K
+bids in a bounded min-heap (O(log K) per new bid, no re-sort). Books are
+loaded from the database on first use and reloaded after REFRESH_SECONDS,
+so they survive restarts and pick up bids placed through other workers.
+At the deadline award_due() reloads the book from the database, accepts
+the best bid and rejects the rest through common.acceptance.
+"""
+import heapq
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+
+from common import metrics
+from common.acceptance import REJECTED, accept_bid
+from common.stats import OPEN
+
+
+def bid_score(bid_amount, delivery_time_days):
+    """Higher is better: a better price, then a faster delivery."""
+    config = settings.AUCTION
+    return float(bid_amount) * config['PRICE_WEIGHT'] - delivery_time_days * config['DELIVERY_WEIGHT']
+
+
+class AuctionKind:
+    """How one quote/bid pair maps onto the engine (farmer quotes + FPO bids, FPO quotes + retailer bids)."""
+    __slots__ = ('name', 'quote_model', 'bid_model', 'owner_field', 'bidder_role', 'bidder_field', 'award_status')
+
+    def __init__(self, name, quote_model, bid_model, owner_field, bidder_role, bidder_field, award_status):
+        self.name = name
+        self.quote_model = quote_model
+        self.bid_model = bid_model
+        self.owner_field = owner_field
+        self.bidder_role = bidder_role
+        self.bidder_field = bidder_field
+        self.award_status = award_status
+
+
+@lru_cache(maxsize=1)
+def auction_kinds():
+    from farmer.models import FarmerQuote
+    from fpo.models import FPOBid, FPOQuote
+    from retailer.models import RetailerBid
+    return {
+        'farmer': AuctionKind('farmer', FarmerQuote, FPOBid, 'farmer', 'fpo', 'fpo', 'accepted'),
+        'fpo': AuctionKind('fpo', FPOQuote, RetailerBid, 'fpo', 'retailer', 'retailer', 'awarded'),
+    }
+
+
+class OrderBook:
+    """The best `capacity` bids of one quote. Ties go to the earlier bid."""
+    __slots__ = ('capacity', 'heap', 'bid_count', 'loaded_at')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.heap = []
+        self.bid_count = 0
+        self.loaded_at = time.monotonic()
+
+    def push(self, bid, bidder_name):
+        self.bid_count += 1
+        entry = (bid_score(bid.bid_amount, bid.delivery_time_days), -bid.pk,
+                 bidder_name, str(bid.bid_amount), bid.delivery_time_days)
+        if len(self.heap) < self.capacity:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def top(self):
+        return [
+            {'bid_id': -neg_id, 'bidder': bidder, 'bid_amount': amount,
+             'delivery_time_days': days, 'score': round(score, 4)}
+            for score, neg_id, bidder, amount, days in sorted(self.heap, reverse=True)
+        ]
+
+    def best_bid_id(self):
+        return -max(self.heap)[1] if self.heap else None
+
+
+class AuctionEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._books = {}
+
+    def load(self, kind, quote_id):
+        """(Re)build a quote's book from its non-rejected bids."""
+        book = OrderBook(settings.AUCTION['TOP_K'])
+        bids = (kind.bid_model.objects.filter(quote_id=quote_id).exclude(status=REJECTED)
+                .select_related(kind.bidder_field).order_by('id'))
+        for bid in bids:
+            book.push(bid, getattr(bid, kind.bidder_field).name)
+        with self._lock:
+            self._books[(kind.name, quote_id)] = book
+        metrics.incr('auction.book_loads')
+        return book
+
+    def book(self, kind, quote_id):
+        with self._lock:
+            book = self._books.get((kind.name, quote_id))
+        if book is None or time.monotonic() - book.loaded_at > settings.AUCTION['REFRESH_SECONDS']:
+            book = self.load(kind, quote_id)
+        return book
+
+    def bid_placed(self, kind_name, bid, bidder_name):
+        kind = auction_kinds()[kind_name]
+        with self._lock:
+            book = self._books.get((kind.name, bid.quote_id))
+            if book is not None:
+                book.push(bid, bidder_name)
+
+    def forget(self, kind_name, quote_id):
+        with self._lock:
+            self._books.pop((kind_name, quote_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._books.clear()
+
+    def award_due(self, today=None):
+        """
+        Award every open auction whose deadline has passed (deadline < today)
+        to its best bid. Auctions without bids are left for the expiry sweep.
+        Returns the number of quotes awarded.
+        """
+        today = today or timezone.now().date()
+        awarded = 0
+        for kind in auction_kinds().values():
+            owner_column = f'{kind.owner_field}_id'
+            due = (kind.quote_model.objects.filter(status=OPEN, auction_enabled=True, deadline__lt=today)
+                   .order_by('deadline', 'id').values_list('id', owner_column))
+            for quote_id, owner_id in due:
+                # Always award from the database, not from a possibly stale book
+                best = self.load(kind, quote_id).best_bid_id()
+                if best is None:
+                    continue
+                bid = kind.bid_model.objects.get(pk=best)
+                if accept_bid(bid, kind.award_status, owner_role=kind.name, owner_id=owner_id,
+                              bidder_role=kind.bidder_role, bidder_id=getattr(bid, f'{kind.bidder_field}_id')):
+                    awarded += 1
+                    metrics.incr('auction.awarded')
+                self.forget(kind.name, quote_id)
+        return awarded
+
+
+auction_engine = AuctionEngine()
+
+
+def order_book_payload(kind_name, quote):
+    kind = auction_kinds()[kind_name]
+    book = auction_engine.book(kind, quote.pk)
+    return {
+        'quote_id': quote.pk,
+        'auction_enabled': quote.auction_enabled,
+        'status': quote.status,
+        'deadline': quote.deadline,
+        'bid_count': book.bid_count,
+        'top_bids': book.top(),
+    }
@@ -0,0 +1,84 @@
+"""Helpers for the bench_* management commands."""
+import os
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def scratch_database():
+    """
+    Run a benchmark against a throwaway, fully migrated SQLite file so the
+    real database is never touched. A file (rather than :memory:) lets
+    benchmark threads use their own connections.
+    """
+    fd, path = tempfile.mkstemp(prefix='farmerchain-bench-', suffix='.sqlite3')
+    os.close(fd)
+    old_name = connection.settings_dict['NAME']
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield path
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def post_loop_worker(database, overrides, path, body, seconds, results):
+    """
+    Stand-in for one sync web worker (gunicorn's default class), run in a
+    spawned process: POST `body` to `path` one request at a time against the
+    scratch `database` for `seconds`, then put the status counts on `results`.
+    Lives here, not in a command module, so the child can import it before
+    Django is set up.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FarmerChain.settings')
+    import django
+    django.setup()
+    from django.db import connections
+    from django.test import Client, override_settings
+
+    connections['default'].settings_dict['NAME'] = database
+    statuses = Counter()
+    with override_settings(**overrides):
+        client = Client()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            statuses[client.post(path, body, content_type='application/json').status_code] += 1
+    connections.close_all()
+    results.put(dict(statuses))
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def timed():
+    """with timed() as t: ... ; t() -> elapsed seconds."""
+    start = time.perf_counter()
+    end = None
+
+    def elapsed():
+        return (end or time.perf_counter()) - start
+
+    try:
+        yield elapsed
+    finally:
+        end = time.perf_counter()
+
+
+def summarize(label, samples_ms):
+    return (f"{label}: n={len(samples_ms)} p50={percentile(samples_ms, 50):.1f}ms "
+            f"p99={percentile(samples_ms, 99):.1f}ms max={max(samples_ms, default=0):.1f}ms")
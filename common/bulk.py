@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import generics, serializers, status
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+
+from common import metrics
+from common.geo import location_fields, owner_location
+from common.idempotency import idempotent
+from common.parsers import CSVParser
+from common.stats import quotes_created
+
+BULK_MAX_ROWS = 5000
+
+
+class BulkQuoteCreateView(generics.GenericAPIView):
+    """
+    POST a JSON array or a CSV file of quotes owned by the caller.
+
+    One serializer instance validates every row (fields are built once and
+    "today" is computed once), errors are reported per row, and the valid
+    rows go in with bulk_create inside one transaction. Subclasses set
+    `serializer_class`, `owner_field` and `owner_role`.
+    """
+    parser_classes = [JSONParser, CSVParser]
+    owner_field = None
+    owner_role = None
+    max_rows = BULK_MAX_ROWS
+    batch_size = 500
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['today'] = timezone.now().date()
+        return context
+
+    def validate_rows(self, rows):
+        serializer = self.get_serializer()
+        valid, errors = [], []
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors.append({'row': index, 'errors': {'non_field_errors': ['Expected an object.']}})
+                continue
+            try:
+                valid.append(serializer.run_validation(row))
+            except serializers.ValidationError as exc:
+                errors.append({'row': index, 'errors': exc.detail})
+        return valid, errors
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "Expected a non-empty list of quotes."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.max_rows:
+            return Response({"error": f"At most {self.max_rows} quotes per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        valid, errors = self.validate_rows(rows)
+        if not valid:
+            return Response({"created": 0, "ids": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        owner = request.user.user_obj
+        model = self.get_serializer_class().Meta.model
+        # bulk_create skips Model.save(), so locate the owner once here
+        location = location_fields(owner_location(owner))
+        with transaction.atomic():
+            quotes = model.objects.bulk_create(
+                [model(**{self.owner_field: owner}, **location, **data) for data in valid], batch_size=self.batch_size
+            )
+            quotes_created(self.owner_role, owner.id, count=len(quotes))
+        metrics.incr('bulk_quotes.created', len(quotes))
+        metrics.incr('bulk_quotes.rejected', len(errors))
+
+        return Response(
+            {"created": len(quotes), "ids": [quote.pk for quote in quotes], "errors": errors},
+            status=status.HTTP_201_CREATED
+        )
@@ -0,0 +1,65 @@
+"""
+Close open quotes whose deadline has passed, in small indexed chunks so the
+SQLite write lock is only ever held for one short transaction at a time.
+"""
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from common import metrics
+from common.models import Checkpoint
+from common.stats import OPEN, quote_status_changed
+
+CLOSED = 'closed'
+
+
+def expire_quotes(quote_model, owner_role, owner_field, today=None, chunk_size=500, pause=0.0):
+    """
+    Move `quote_model` rows with status 'open' and deadline before `today` to
+    'closed'. Returns the number of quotes closed. A Checkpoint records the
+    day swept through, so a finished sweep is skipped; an interrupted one
+    needs no cursor, as the quotes it closed have left the open index.
+    """
+    today = today or timezone.now().date()
+    checkpoint, _ = Checkpoint.objects.get_or_create(name=f'expire:{quote_model._meta.model_name}')
+    if checkpoint.state.get('swept_through') == today.isoformat():
+        return 0
+
+    owner_column = f'{owner_field}_id'
+    closed = 0
+    while True:
+        with transaction.atomic():
+            # Walks the partial (deadline, id) index of open quotes
+            rows = list(
+                quote_model.objects.filter(status=OPEN, deadline__lt=today)
+                .order_by('deadline', 'id')
+                .values_list('id', owner_column)[:chunk_size]
+            )
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            updated = quote_model.objects.filter(id__in=ids, status=OPEN).update(status=CLOSED)
+            if updated != len(ids):
+                # Some quotes were accepted meanwhile; only count the ones we closed
+                moved = set(quote_model.objects.filter(id__in=ids, status=CLOSED).values_list('id', flat=True))
+                rows = [row for row in rows if row[0] in moved]
+            for owner_id, count in Counter(row[1] for row in rows).items():
+                quote_status_changed(owner_role, owner_id, OPEN, CLOSED, count=count)
+
+            checkpoint.state = {
+                **checkpoint.state,
+                'closed_total': checkpoint.state.get('closed_total', 0) + len(rows),
+            }
+            checkpoint.save()
+
+        closed += len(rows)
+        metrics.incr('quote_expiry.batches')
+        metrics.incr('quote_expiry.closed', len(rows))
+        if pause:
+            time.sleep(pause)
+
+    checkpoint.state = {**checkpoint.state, 'swept_through': today.isoformat()}
+    checkpoint.save()
+    return closed
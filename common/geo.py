@@ -0,0 +1,140 @@
+"""
+Offline geocoding and a coarse spatial grid for region-aware quote feeds.
+
+Locations come from the bundled data/cities.csv (city, state -> lat/lon);
+unknown cities fall back to the mean of their state's known cities. Quotes
+store their owner's point and a grid cell id, so a radius query only reads
+the cells overlapping the radius (through the partial open-quote index).
+"""
+import csv
+import math
+import os
+from collections import defaultdict
+from functools import lru_cache
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Coalesce, Sqrt
+from rest_framework.exceptions import ValidationError
+
+CITIES_CSV = os.path.join(os.path.dirname(__file__), 'data', 'cities.csv')
+CELL_DEGREES = 0.5
+GRID_COLUMNS = int(360 / CELL_DEGREES)
+KM_PER_DEGREE = 111.2
+MAX_RADIUS_KM = 1000
+# Sorts quotes with no known location after every located one
+UNKNOWN_DISTANCE_KM = 100000.0
+
+
+def _key(value):
+    return ' '.join((value or '').lower().split())
+
+
+@lru_cache(maxsize=1)
+def _places():
+    cities, by_state = {}, defaultdict(list)
+    with open(CITIES_CSV, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            point = (float(row['latitude']), float(row['longitude']))
+            cities[(_key(row['city']), _key(row['state']))] = point
+            by_state[_key(row['state'])].append(point)
+    states = {
+        state: (sum(lat for lat, _ in points) / len(points), sum(lon for _, lon in points) / len(points))
+        for state, points in by_state.items()
+    }
+    return cities, states
+
+
+def locate(city, state):
+    """(latitude, longitude) for a city/state pair, or None if neither is known."""
+    cities, states = _places()
+    return cities.get((_key(city), _key(state))) or states.get(_key(state))
+
+
+def cell_id(latitude, longitude):
+    row = int((latitude + 90) // CELL_DEGREES)
+    column = int((longitude + 180) // CELL_DEGREES)
+    return row * GRID_COLUMNS + column
+
+
+def cells_within(latitude, longitude, radius_km):
+    """Ids of every grid cell overlapping the radius' bounding box."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    first, last = cell_id(latitude - dlat, longitude - dlon), cell_id(latitude + dlat, longitude + dlon)
+    first_row, first_column = divmod(first, GRID_COLUMNS)
+    last_row, last_column = divmod(last, GRID_COLUMNS)
+    return [row * GRID_COLUMNS + column
+            for row in range(first_row, last_row + 1)
+            for column in range(first_column, last_column + 1)]
+
+
+def owner_location(owner):
+    """
+    Point for a farmer/FPO/retailer row. Token stand-ins (stateless auth)
+    are unsaved instances with only an id, so their place is read from the
+    database.
+    """
+    city, state = getattr(owner, 'city', None), getattr(owner, 'state', None)
+    if owner._state.adding and owner.pk:
+        city, state = type(owner).objects.filter(pk=owner.pk).values_list('city', 'state').first() or (None, None)
+    return locate(city, state)
+
+
+def location_fields(point):
+    """Quote field values for a point (or None)."""
+    if point is None:
+        return {'latitude': None, 'longitude': None, 'geo_cell': None}
+    return {'latitude': point[0], 'longitude': point[1], 'geo_cell': cell_id(*point)}
+
+
+def distance_km(point):
+    """
+    Expression for the distance from `point` to a quote, using the
+    equirectangular approximation (plenty within a country).
+    """
+    latitude, longitude = point
+    scale = math.cos(math.radians(latitude))
+    dlat = F('latitude') - Value(latitude)
+    dlon = (F('longitude') - Value(longitude)) * Value(scale)
+    return Coalesce(Sqrt(dlat * dlat + dlon * dlon) * Value(KM_PER_DEGREE),
+                    Value(UNKNOWN_DISTANCE_KM), output_field=FloatField())
+
+
+class RegionFilterMixin:
+    """
+    For open-quote feeds. Query parameters:
+      state=<name>      only quotes whose owner is in that state
+      radius_km=<n>     only quotes within n km of the caller's city
+      order=nearby      closest first (keyset on distance, id)
+    Views set `owner_field` to the quote's owner FK.
+    """
+    owner_field = None
+
+    @property
+    def keyset_ordering(self):
+        if self.request.query_params.get('order') == 'nearby':
+            return ('distance_km', 'id')
+        return ('-created_at', '-id')
+
+    def filter_region(self, queryset):
+        params = self.request.query_params
+        if params.get('state'):
+            queryset = queryset.filter(**{f'{self.owner_field}__state__iexact': params['state']})
+
+        radius = params.get('radius_km')
+        if radius is None and params.get('order') != 'nearby':
+            return queryset
+
+        point = owner_location(self.request.user.user_obj)
+        if point is None:
+            raise ValidationError({'detail': 'Your city/state is not in the location table.'})
+        queryset = queryset.annotate(distance_km=distance_km(point))
+        if radius is not None:
+            try:
+                radius = float(radius)
+            except ValueError:
+                raise ValidationError({'radius_km': 'A valid number is required.'})
+            if not 0 < radius <= MAX_RADIUS_KM:
+                raise ValidationError({'radius_km': f'Must be between 0 and {MAX_RADIUS_KM}.'})
+            queryset = queryset.filter(geo_cell__in=cells_within(*point, radius), distance_km__lte=radius)
+        return queryset
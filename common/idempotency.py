@@ -0,0 +1,124 @@
+"""
+Idempotency-Key support for create endpoints.
+
+A client that may retry a POST sends `Idempotency-Key: <unique string>`.
+The first request claims the key with an INSERT (the unique (owner, key)
+constraint decides races), then runs the view and stores its response in
+one transaction, so the create and its recorded response commit together.
+Retries with the same key get that response back (`Idempotent-Replayed:
+true`) without touching the view; a retry that arrives while the first is
+still running gets a 409. Reusing a key for a different request body is a
+422. Error responses (4xx/5xx) are not recorded: a retry runs again.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from common import metrics
+from common.models import IdempotencyKey
+from common.stats import stats_key
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _claim(owner, key, fingerprint):
+    """
+    (record, claimed). Retries are a single indexed SELECT; first requests
+    INSERT, and the unique constraint settles concurrent first requests.
+    Keys past their TTL or abandoned mid-request are reclaimed.
+    """
+    config = settings.IDEMPOTENCY
+    now = timezone.now()
+    for _ in range(2):
+        record = IdempotencyKey.objects.filter(owner=owner, key=key).first()
+        if record is not None:
+            expired = record.created_at < now - timedelta(seconds=config['TTL'])
+            abandoned = (record.status_code is None
+                         and record.created_at < now - timedelta(seconds=config['IN_PROGRESS_TIMEOUT']))
+            if not (expired or abandoned):
+                return record, False
+            # Only if unchanged: a request judged abandoned may finish meanwhile
+            IdempotencyKey.objects.filter(pk=record.pk, status_code=record.status_code).delete()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(owner=owner, key=key, fingerprint=fingerprint), True
+        except IntegrityError:
+            continue  # another request claimed it first; read theirs
+    return record, False
+
+
+def _in_progress():
+    return Response({"error": "A request with this Idempotency-Key is still in progress."},
+                    status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+
+
+def idempotent(view_method):
+    """Decorator for a view's post()/create() making it replay-safe under Idempotency-Key."""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = _claim(stats_key(request.user.role, request.user.id), key, fingerprint)
+        if not claimed:
+            if record.fingerprint != fingerprint:
+                return Response({"error": f"{HEADER} was already used for a different request."},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record.status_code is None:
+                return _in_progress()
+            metrics.incr('idempotency.replayed')
+            return Response(record.response_body, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+        try:
+            with transaction.atomic():
+                # Lock the claim first; a retry that takes it over as abandoned waits for this transaction
+                if not IdempotencyKey.objects.select_for_update().filter(pk=record.pk, status_code=None).exists():
+                    return _in_progress()
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 400:
+                    record.delete()
+                else:
+                    record.status_code = response.status_code
+                    record.response_body = response.data
+                    record.save(update_fields=['status_code', 'response_body'])
+        except Exception:
+            # Crashes roll the create back with the response; the retry runs again
+            IdempotencyKey.objects.filter(pk=record.pk, status_code=None).delete()
+            raise
+        return response
+
+    return wrapper
+
+
+class IdempotentCreateMixin:
+    """For generic create views: honours Idempotency-Key on create()."""
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+
+def purge_idempotency_keys():
+    """Delete keys older than the TTL; returns how many went."""
+    cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY['TTL'])
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
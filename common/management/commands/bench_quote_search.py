@@ -0,0 +1,79 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from common.bench import scratch_database, timed
+from common.search import search_quotes
+from common.testing import make_farmer
+from farmer.models import FarmerQuote
+
+PRODUCTS = ['wheat', 'rice', 'onion', 'tomato', 'potato', 'cotton', 'soybean', 'turmeric', 'chilli', 'mango',
+            'banana', 'grapes', 'jowar', 'bajra', 'maize', 'groundnut', 'sugarcane', 'garlic', 'ginger', 'moong']
+ADJECTIVES = ['organic', 'premium', 'graded', 'sorted', 'fresh', 'dried', 'export', 'local', 'bulk', 'certified']
+CATEGORIES = ['Grains', 'Vegetables', 'Fruits', 'Pulses', 'Spices', 'Oilseeds', 'Fibre']
+QUERIES = ['wheat', 'org tom', 'turm', 'certified dried chilli', 'mango 977', 'basmati']
+
+
+class Command(BaseCommand):
+    help = ("Time quote search (FTS5 match + rank, first page) against a LIKE scan "
+            "over a large quote table. Uses a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quotes', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            with timed() as elapsed:
+                self.seed(rng, options['quotes'])
+            self.stdout.write(f"seeded {options['quotes']:,} quotes (triggers maintaining FTS) in {elapsed():.1f}s")
+
+            for text in QUERIES:
+                fts = self.time(lambda: search_quotes(FarmerQuote.objects.filter(status='open'), text)
+                                .order_by('rank', 'id'), options['repeat'])
+                like = self.time(lambda: self.like(text).order_by('-created_at', '-id'), options['repeat'])
+                self.stdout.write(f"{text!r:>26}  FTS5: {fts:8.2f}ms   LIKE scan: {like:8.2f}ms")
+
+    @staticmethod
+    def like(text):
+        queryset = FarmerQuote.objects.filter(status='open')
+        for term in text.split():
+            queryset = queryset.filter(Q(product_name__icontains=term) | Q(category__icontains=term)
+                                       | Q(description__icontains=term))
+        return queryset
+
+    @staticmethod
+    def seed(rng, count):
+        farmers = [make_farmer() for _ in range(100)]
+        deadline = date.today() + timedelta(days=30)
+        batch = []
+        with transaction.atomic():
+            for n in range(count):
+                product = rng.choice(PRODUCTS)
+                batch.append(FarmerQuote(
+                    farmer=rng.choice(farmers), product_name=f'{rng.choice(ADJECTIVES)} {product}',
+                    category=rng.choice(CATEGORIES),
+                    description=' '.join(rng.sample(ADJECTIVES, 3) + [product, 'lot', str(n % 997)]),
+                    quantity=100, unit='kg', price_per_unit=rng.randint(10, 200), deadline=deadline,
+                    status='open' if rng.random() < 0.3 else 'closed',
+                ))
+                if len(batch) >= 20000:
+                    FarmerQuote.objects.bulk_create(batch)
+                    batch = []
+            FarmerQuote.objects.bulk_create(batch)
+
+    @staticmethod
+    def time(build_queryset, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(build_queryset()[:51])
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
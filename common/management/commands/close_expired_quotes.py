@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from common.auction import auction_engine
+from common.expiry import expire_quotes
+from farmer.models import FarmerQuote
+from fpo.models import FPOQuote
+
+QUOTE_TABLES = ((FarmerQuote, 'farmer', 'farmer'), (FPOQuote, 'fpo', 'fpo'))
+
+
+class Command(BaseCommand):
+    help = ("Award due sealed-bid auctions, then close open farmer and FPO quotes whose deadline "
+            "has passed, in chunked UPDATEs. Run from cron, or with --loop as a long-lived worker.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help="Seconds to sleep between chunks so other writers get the lock")
+        parser.add_argument('--loop', action='store_true', help="Keep running, sweeping every --interval seconds")
+        parser.add_argument('--interval', type=float, default=300)
+
+    def handle(self, *args, **options):
+        while True:
+            # Auctions first, so the sweep doesn't close quotes that have a winner
+            awarded = auction_engine.award_due()
+            if awarded:
+                self.stdout.write(f"Awarded {awarded} auctions.")
+            for quote_model, owner_role, owner_field in QUOTE_TABLES:
+                closed = expire_quotes(quote_model, owner_role, owner_field,
+                                       chunk_size=options['chunk_size'], pause=options['pause'])
+                if closed:
+                    self.stdout.write(f"Closed {closed} expired {quote_model._meta.verbose_name_plural}.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
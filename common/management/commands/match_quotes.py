@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from common.matching import match_sides, run_matching
+
+
+class Command(BaseCommand):
+    help = ("Score open quotes created since the last run against every FPO and retailer and store "
+            "their ranked recommendations. Run from cron, or with --loop as a long-lived worker.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="Rescore every open quote and replace the stored recommendations")
+        parser.add_argument('--loop', action='store_true', help="Keep running, matching every --interval seconds")
+        parser.add_argument('--interval', type=float, default=60)
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            for side_role in match_sides():
+                scored = run_matching(side_role, full=full)
+                if scored:
+                    self.stdout.write(f"Scored {scored} quotes for {side_role} recommendations.")
+            full = False
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from common.idempotency import purge_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than IDEMPOTENCY['TTL']."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Purged {purge_idempotency_keys()} idempotency keys."))
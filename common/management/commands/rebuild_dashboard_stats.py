@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from common.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute every DashboardStats row from the quote and bid tables (run on a schedule to correct drift)."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuild()} dashboard rows."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from common.search import rebuild_search_index
+from farmer.models import FarmerQuote
+from fpo.models import FPOQuote
+
+
+class Command(BaseCommand):
+    help = "Recreate the quote full-text indexes (FTS5 tables and sync triggers) from the quote tables."
+
+    def handle(self, *args, **options):
+        for model in (FarmerQuote, FPOQuote):
+            rebuild_search_index(model)
+            self.stdout.write(f"Rebuilt search index for {model._meta.verbose_name_plural}.")
@@ -0,0 +1,333 @@
+"""
+Batch supply/demand matching: farmer quotes -> FPOs, FPO quotes -> retailers.
+
+Each buyer's demand profile comes from their bid history (category mix,
+typical quantity and price per kg) plus their location. Open quotes are
+scored against every buyer at once as (buyers x quotes) NumPy matrices,
+and each buyer's best TOP_N are stored in a Recommendation row. Runs are
+incremental: only quotes created since the last checkpoint are scored and
+merged into the stored lists, dropping quotes that are no longer open, and
+buyers without a list yet are scored against every open quote. Profiles
+are kept in-process between runs and only fed new buyers and new bids.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from common import metrics
+from common.geo import KM_PER_DEGREE, locate
+from common.models import Checkpoint, Recommendation
+from common.stats import OPEN, stats_key
+
+# Multipliers to kilograms; other units (bags, crates...) can't be compared
+UNIT_TO_KG = {
+    'g': 0.001, 'gram': 0.001, 'grams': 0.001,
+    'kg': 1.0, 'kgs': 1.0, 'kilogram': 1.0, 'kilograms': 1.0,
+    'quintal': 100.0, 'quintals': 100.0, 'qtl': 100.0,
+    'ton': 1000.0, 'tons': 1000.0, 'tonne': 1000.0, 'tonnes': 1000.0, 't': 1000.0,
+}
+# Single precision halves the memory traffic of the score matrices
+DTYPE = np.float32
+# Score for a component that can't be computed (no history, unknown unit or place)
+NEUTRAL = 0.5
+
+
+def unit_factor(unit):
+    return UNIT_TO_KG.get((unit or '').strip().lower(), math.nan)
+
+
+class MatchSide:
+    """One buyer population and the quotes it buys from."""
+    __slots__ = ('role', 'buyer_model', 'quote_model', 'bid_model', 'bidder_field')
+
+    def __init__(self, role, buyer_model, quote_model, bid_model, bidder_field):
+        self.role = role
+        self.buyer_model = buyer_model
+        self.quote_model = quote_model
+        self.bid_model = bid_model
+        self.bidder_field = bidder_field
+
+
+@lru_cache(maxsize=1)
+def match_sides():
+    from farmer.models import FarmerQuote
+    from fpo.models import FPO, FPOBid, FPOQuote
+    from retailer.models import Retailer, RetailerBid
+    return {
+        'fpo': MatchSide('fpo', FPO, FarmerQuote, FPOBid, 'fpo'),
+        'retailer': MatchSide('retailer', Retailer, FPOQuote, RetailerBid, 'retailer'),
+    }
+
+
+def _points(places):
+    return np.array([locate(city, state) or (math.nan, math.nan) for city, state in places],
+                    dtype=DTYPE).reshape(-1, 2)
+
+
+class ProfileArrays:
+    """What score_matrix reads for a set of buyers."""
+    __slots__ = ('ids', 'points', 'affinity', 'has_history', 'log_quantity', 'price_kg')
+
+    def __init__(self, ids, points, affinity, has_history, log_quantity, price_kg):
+        self.ids, self.points = ids, points
+        self.affinity, self.has_history = affinity, has_history
+        self.log_quantity, self.price_kg = log_quantity, price_kg
+
+
+class Profiles:
+    """
+    Demand profiles, one row per approved buyer, kept as running sums so
+    refresh() can fold in newly approved buyers and new bids instead of
+    re-reading the whole bid table.
+    """
+
+    def __init__(self, side):
+        self.side, self.categories = side, {}
+        self.ids, self.places = np.zeros(0, dtype=np.int64), []
+        self.points = np.zeros((0, 2), dtype=DTYPE)
+        self.counts = np.zeros((0, 1), dtype=DTYPE)  # bids per (buyer, category)
+        self.quantity = np.zeros((0, 2))  # per buyer: sum and count of log quantity in kg
+        self.price = np.zeros((0, 2))  # per buyer: sum and count of price per kg
+        self.last_bid_id = 0
+        self.refresh()
+
+    def refresh(self):
+        """
+        Add buyers approved since the last refresh, with their whole history,
+        and every approved buyer's bids placed since. Returns False, changing
+        nothing, if a known buyer is no longer approved or has moved: the
+        caller rebuilds instead.
+        """
+        side = self.side
+        buyers = list(side.buyer_model.objects.filter(approval_status='approved')
+                      .order_by('id').values_list('id', 'city', 'state'))
+        current = {row[0]: row[1:] for row in buyers}
+        known = dict(zip(self.ids.tolist(), self.places))
+        if any(current.get(buyer_id) != place for buyer_id, place in known.items()):
+            return False
+
+        added = [row for row in buyers if row[0] not in known]
+        if added:
+            self.ids = np.concatenate([self.ids, np.array([row[0] for row in added], dtype=np.int64)])
+            self.places += [row[1:] for row in added]
+            self.points = np.concatenate([self.points, _points([row[1:] for row in added])])
+            self.counts = np.pad(self.counts, ((0, len(added)), (0, 0)))
+            self.quantity = np.pad(self.quantity, ((0, len(added)), (0, 0)))
+            self.price = np.pad(self.price, ((0, len(added)), (0, 0)))
+
+        bidder = f'{side.bidder_field}_id'
+        new_bids = Q(id__gt=self.last_bid_id)
+        if added and self.last_bid_id:
+            new_bids |= Q(**{f'{bidder}__in': [row[0] for row in added]})
+        history = list(side.bid_model.objects.filter(new_bids, **{f'{side.bidder_field}__approval_status': 'approved'})
+                       .values_list('id', bidder, 'quote__category', 'quote__quantity', 'quote__unit', 'bid_amount'))
+        if history:
+            self.last_bid_id = max(self.last_bid_id, max(row[0] for row in history))
+        row_of = {buyer_id: index for index, buyer_id in enumerate(self.ids.tolist())}
+        # A buyer approved after the buyer read is picked up, history and all, next time
+        history = [row for row in history if row[1] in row_of]
+
+        rows = np.array([row_of[row[1]] for row in history], dtype=np.int64)
+        columns = np.array([self.categories.setdefault(_category(row[2]), len(self.categories)) for row in history],
+                           dtype=np.int64)
+        self.grow()
+        np.add.at(self.counts, (rows, columns), 1.0)
+        factors = np.array([unit_factor(row[4]) for row in history], dtype=DTYPE)
+        _accumulate(self.quantity, rows, np.log(np.array([float(row[3]) for row in history], dtype=DTYPE) * factors))
+        _accumulate(self.price, rows, np.array([float(row[5]) for row in history], dtype=DTYPE) / factors)
+        return True
+
+    def grow(self):
+        """Add zero columns for categories first seen on new quotes or bids."""
+        missing = len(self.categories) - self.counts.shape[1]
+        if missing > 0:
+            self.counts = np.pad(self.counts, ((0, 0), (0, missing)))
+
+    def arrays(self, rows=slice(None)):
+        """Normalized profile arrays for the buyers at `rows`."""
+        counts = self.counts[rows]
+        totals = counts.sum(axis=1, keepdims=True)
+        affinity = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        return ProfileArrays(self.ids[rows], self.points[rows], affinity, totals[:, 0] > 0,
+                             _mean(self.quantity[rows]), _mean(self.price[rows]))
+
+
+def _category(value):
+    return ' '.join((value or '').lower().split())
+
+
+def _accumulate(sums, rows, values):
+    """Add each value, ignoring NaN, to its buyer's (sum, count)."""
+    valid = ~np.isnan(values)
+    np.add.at(sums[:, 0], rows[valid], values[valid])
+    np.add.at(sums[:, 1], rows[valid], 1)
+
+
+def _mean(sums):
+    """Per-buyer mean from (sum, count) rows; NaN where a buyer has none."""
+    means = np.full(len(sums), math.nan, dtype=DTYPE)
+    np.divide(sums[:, 0], sums[:, 1], out=means, where=sums[:, 1] > 0, casting='unsafe')
+    return means
+
+
+# Profiles kept between runs of a long-lived matcher (match_quotes --loop)
+profile_cache = {}
+
+
+def buyer_profiles(side, full=False):
+    """`side`'s profiles, brought up to date; rebuilt on full runs or when a buyer left or moved."""
+    profiles = None if full else profile_cache.get(side.role)
+    if profiles is None or not profiles.refresh():
+        profiles = profile_cache[side.role] = Profiles(side)
+    return profiles
+
+
+def load_quotes(side, categories, since_id=0):
+    """Arrays for the open quotes with id > since_id."""
+    quotes = list(side.quote_model.objects.filter(status=OPEN, id__gt=since_id).order_by('id').values_list(
+        'id', 'category', 'quantity', 'unit', 'price_per_unit', 'latitude', 'longitude'))
+    factors = np.array([unit_factor(row[3]) for row in quotes], dtype=DTYPE)
+    return {
+        'ids': np.array([row[0] for row in quotes], dtype=np.int64),
+        'category': np.array([categories.setdefault(_category(row[1]), len(categories)) for row in quotes],
+                             dtype=np.int64),
+        'log_quantity': np.log(np.array([float(row[2]) for row in quotes], dtype=DTYPE) * factors),
+        'price_kg': np.array([math.nan if row[4] is None else float(row[4]) for row in quotes],
+                             dtype=DTYPE) / factors,
+        'points': np.array([(math.nan, math.nan) if row[5] is None else (row[5], row[6]) for row in quotes],
+                           dtype=DTYPE).reshape(-1, 2),
+    }
+
+
+def score_matrix(profiles, quotes, config):
+    """(buyers x quotes) match scores in [0, 1]."""
+    category = profiles.affinity[:, quotes['category']]
+    category[~profiles.has_history] = NEUTRAL
+
+    quantity = np.exp(-np.abs(profiles.log_quantity[:, None] - quotes['log_quantity'][None, :]))
+    # Paying less than the buyer usually does scores 1, more scores proportionally less
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = np.clip(profiles.price_kg[:, None] / quotes['price_kg'][None, :], 0.0, 1.0)
+
+    buyer_lat, buyer_lon = profiles.points[:, 0:1], profiles.points[:, 1:2]
+    quote_lat, quote_lon = quotes['points'][None, :, 0], quotes['points'][None, :, 1]
+    dlat = quote_lat - buyer_lat
+    dlon = (quote_lon - buyer_lon) * np.cos(np.radians(buyer_lat))
+    region = np.exp(-np.hypot(dlat, dlon) * KM_PER_DEGREE / config['REGION_SCALE_KM'])
+
+    total = np.zeros_like(category)
+    for component, weight in ((category, 'CATEGORY_WEIGHT'), (quantity, 'QUANTITY_WEIGHT'),
+                              (price, 'PRICE_WEIGHT'), (region, 'REGION_WEIGHT')):
+        total += config[weight] * np.where(np.isnan(component), NEUTRAL, component)
+    return total
+
+
+def top_matches(profiles, quotes, config):
+    """Best TOP_N (score, quote_id) pairs per buyer, scoring quotes in column chunks."""
+    buyers_count, top_n = len(profiles.ids), config['TOP_N']
+    best_scores = np.full((buyers_count, 0), -np.inf, dtype=DTYPE)
+    best_ids = np.zeros((buyers_count, 0), dtype=np.int64)
+    chunk = max(1, config['MAX_CELLS'] // max(buyers_count, 1))
+
+    for start in range(0, len(quotes['ids']), chunk):
+        part = {name: values[start:start + chunk] for name, values in quotes.items()}
+        scores = np.concatenate([best_scores, score_matrix(profiles, part, config)], axis=1)
+        ids = np.concatenate([best_ids, np.broadcast_to(part['ids'], (buyers_count, len(part['ids'])))], axis=1)
+        if scores.shape[1] > top_n:
+            keep = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+            scores, ids = np.take_along_axis(scores, keep, axis=1), np.take_along_axis(ids, keep, axis=1)
+        best_scores, best_ids = scores, ids
+    return best_scores, best_ids
+
+
+def run_matching(side_role, full=False):
+    """
+    Score open quotes created since the last run (all open quotes with
+    full=True) for every buyer of `side_role` and merge them into the stored
+    recommendations. Buyers with no recommendations yet, such as newly
+    approved ones, are scored against every open quote. Returns the number
+    of quotes scored.
+    """
+    side, config = match_sides()[side_role], settings.MATCHING
+    checkpoint, _ = Checkpoint.objects.get_or_create(name=f'matching:{side_role}')
+    since_id = 0 if full else checkpoint.state.get('last_quote_id', 0)
+
+    profiles = buyer_profiles(side, full)
+    keys = [stats_key(side_role, buyer_id) for buyer_id in profiles.ids.tolist()]
+    stored = {} if full else {row.key: row.quotes for row in Recommendation.objects.filter(key__in=keys)}
+    unscored = np.array([index for index, key in enumerate(keys) if key not in stored], dtype=np.int64)
+    scored = np.array([index for index, key in enumerate(keys) if key in stored], dtype=np.int64)
+
+    quotes = load_quotes(side, profiles.categories, since_id)
+    backlog = load_quotes(side, profiles.categories) if since_id and len(unscored) else quotes
+    profiles.grow()
+    if not len(quotes['ids']) and not len(unscored) and not full:
+        return 0
+
+    stored_ids = {entry['quote_id'] for entries in stored.values() for entry in entries}
+    still_open = set(side.quote_model.objects.filter(id__in=stored_ids, status=OPEN).values_list('id', flat=True))
+
+    rows = []
+    # Known buyers only need the new quotes (and nothing written if there are none)
+    for buyer_rows, batch in ((scored, quotes), (unscored, backlog)):
+        if not len(buyer_rows) or (buyer_rows is scored and not len(batch['ids'])):
+            continue
+        scores, ids = top_matches(profiles.arrays(buyer_rows), batch, config)
+        for position, index in enumerate(buyer_rows.tolist()):
+            key = keys[index]
+            merged = {entry['quote_id']: entry['score'] for entry in stored.get(key, ())
+                      if entry['quote_id'] in still_open}
+            for score, quote_id in zip(scores[position].tolist(), ids[position].tolist()):
+                if score >= config['MIN_SCORE']:
+                    merged[quote_id] = round(score, 4)
+            ranked = sorted(merged.items(), key=lambda item: (-item[1], -item[0]))[:config['TOP_N']]
+            rows.append(Recommendation(key=key, quotes=[{'quote_id': q, 'score': s} for q, s in ranked]))
+
+    with transaction.atomic():
+        Recommendation.objects.bulk_create(rows, batch_size=500, update_conflicts=True,
+                                           unique_fields=['key'], update_fields=['quotes', 'updated_at'])
+        if len(quotes['ids']):
+            checkpoint.state = {**checkpoint.state, 'last_quote_id': int(quotes['ids'].max())}
+        checkpoint.save()
+
+    scored_quotes = len(backlog['ids']) if len(unscored) else len(quotes['ids'])
+    metrics.incr('matching.quotes_scored', scored_quotes)
+    metrics.incr('matching.new_buyers', len(unscored))
+    metrics.incr('matching.runs')
+    return scored_quotes
+
+
+class RecommendationListView(generics.ListAPIView):
+    """
+    GET [?limit=N] -> the caller's stored recommendations, best first, each
+    quote with its match `score`. Quotes closed since the last matching run
+    are skipped. Subclasses set `side_role`.
+    """
+    side_role = None
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), settings.MATCHING['TOP_N']))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+
+        row = Recommendation.objects.filter(key=stats_key(self.side_role, request.user.user_obj.id)).first()
+        entries = row.quotes[:limit] if row else []
+        quotes = match_sides()[self.side_role].quote_model.objects.filter(
+            id__in=[entry['quote_id'] for entry in entries], status=OPEN)
+        by_id = {quote.id: quote for quote in self.get_serializer_class().setup_eager_loading(quotes)}
+
+        results = []
+        for entry in entries:
+            quote = by_id.get(entry['quote_id'])
+            if quote is not None:
+                results.append({**self.get_serializer(quote).data, 'score': entry['score']})
+        return Response({'updated_at': row.updated_at if row else None, 'results': results})
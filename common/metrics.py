@@ -0,0 +1,26 @@
+import threading
+
+# Simple in-process counters. Each gunicorn worker keeps its own set, so a
+# scraper should sum the values it gets back from every worker.
+_lock = threading.Lock()
+_counters = {}
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def get(name):
+    return _counters.get(name, 0)
+
+
+def snapshot():
+    """Return a copy of all counters, safe to serialize."""
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStats',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('quotes', models.IntegerField(default=0)),
+                ('open_quotes', models.IntegerField(default=0)),
+                ('awarded_quotes', models.IntegerField(default=0)),
+                ('bids_received', models.IntegerField(default=0)),
+                ('bids_placed', models.IntegerField(default=0)),
+                ('bids_accepted', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def rebuild_dashboard_stats(apps, schema_editor):
+    from common.stats import rebuild
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_idempotencykey'),
+        ('farmer', '0007_hot_path_indexes'),
+        ('fpo', '0007_hot_path_indexes'),
+        ('retailer', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_dashboard_stats, migrations.RunPython.noop),
+    ]
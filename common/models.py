@@ -0,0 +1,76 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class DashboardStats(models.Model):
+    """
+    Pre-aggregated dashboard counters, one row per principal ("farmer:12",
+    "fpo:3", "retailer:9") plus one per marketplace ("market:farmer",
+    "market:fpo") for the open-quote totals. Maintained by common.stats in
+    the same transaction as the quote/bid write; rebuild_dashboard_stats
+    recomputes everything from scratch (see common.stats on drift).
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    quotes = models.IntegerField(default=0)
+    open_quotes = models.IntegerField(default=0)
+    awarded_quotes = models.IntegerField(default=0)
+    bids_received = models.IntegerField(default=0)
+    bids_placed = models.IntegerField(default=0)
+    bids_accepted = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+
+class Checkpoint(models.Model):
+    """
+    Progress of a resumable background job (e.g. "expire:farmerquote"),
+    so a restarted run picks up where the last one stopped.
+    """
+    name = models.CharField(max_length=60, primary_key=True)
+    state = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Recommendation(models.Model):
+    """
+    Ranked open quotes for one buyer ("fpo:3", "retailer:9"), written by the
+    matching engine (common/matching.py) so the endpoint is one key lookup.
+    `quotes` is a list of {"quote_id": int, "score": float}, best first.
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    quotes = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+
+class IdempotencyKey(models.Model):
+    """
+    One Idempotency-Key sent by a principal ("fpo:3") on a create request,
+    with a fingerprint of the request and, once it has finished, the
+    response to replay on retries (common/idempotency.py). status_code is
+    null while the first request is still running.
+    """
+    owner = models.CharField(max_length=40)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='unique_idempotency_key_per_owner'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} {self.key}"
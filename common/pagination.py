@@ -0,0 +1,140 @@
+import base64
+import datetime
+import decimal
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a stable two-column ordering, by default
+    (-created_at, -id). The cursor is an opaque token holding the last row's
+    key, so every page is an index range scan no matter how deep it is.
+
+    Views may set `keyset_ordering` to paginate on other columns, e.g.
+    ('-submitted_at', '-id'). The last column must be unique.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = None  # falls back to REST_FRAMEWORK['PAGE_SIZE']
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, view):
+        return getattr(view, 'keyset_ordering', self.ordering)
+
+    def get_page_size(self, request):
+        default = self.page_size or api_settings.PAGE_SIZE or 50
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return default
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        cursor = self.decode_cursor(request)
+
+        reverse = cursor is not None and cursor['d'] == 'p'
+        ordering = [self._flip(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, cursor['v']))
+
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if reverse:
+            rows.reverse()
+
+        # Coming from a cursor means there is something in the other direction
+        self.has_next = has_more if not reverse else True
+        self.has_previous = cursor is not None if not reverse else has_more
+        self.first_key = self.row_key(rows[0]) if rows else None
+        self.last_key = self.row_key(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or self.last_key is None:
+            return None
+        return self.encode_cursor('n', self.last_key)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_key is None:
+            return None
+        return self.encode_cursor('p', self.first_key)
+
+    # --- cursor helpers ---
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def row_key(self, row):
+        return [self._jsonable(getattr(row, field.lstrip('-'))) for field in self.ordering]
+
+    @staticmethod
+    def _jsonable(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+    @staticmethod
+    def seek_filter(ordering, values):
+        """Rows strictly after `values` in `ordering`: (a > x) OR (a = x AND b > y) ..."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, direction, key):
+        token = json.dumps({'d': direction, 'v': key}, separators=(',', ':')).encode()
+        token = base64.urlsafe_b64encode(token).decode().rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            token += '=' * (-len(token) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+            if cursor['d'] not in ('n', 'p') or len(cursor['v']) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
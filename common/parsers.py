@@ -0,0 +1,26 @@
+import csv
+import io
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class CSVParser(BaseParser):
+    """
+    text/csv with a header row -> list of dicts. Empty cells are dropped so
+    optional fields fall back to their defaults.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        try:
+            text = stream.read().decode('utf-8-sig' if encoding.lower() == 'utf-8' else encoding)
+            reader = csv.DictReader(io.StringIO(text))
+            return [
+                {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+                for row in reader
+            ]
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ParseError(f'CSV parse error - {exc}')
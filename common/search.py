@@ -0,0 +1,139 @@
+"""
+Full-text search over quote product_name/category/description.
+
+On SQLite each quote table gets an external-content FTS5 table
+("<table>_fts") kept in sync by triggers (created in the farmer/fpo
+migrations). Other backends fall back to icontains filters without ranking.
+Migrations that make SQLite rebuild a quote table drop its triggers; run
+rebuild_search_index after them.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+
+SEARCH_COLUMNS = ('product_name', 'category', 'description')
+# bm25 column weights: a hit in the product name counts most
+SEARCH_WEIGHTS = (10.0, 4.0, 1.0)
+MAX_TERMS = 8
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def _create_statements(model):
+    table, fts = model._meta.db_table, fts_table(model)
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', content_rowid='id', "
+        f"prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _drop_statements(model):
+    fts = fts_table(model)
+    return [f"DROP TRIGGER IF EXISTS {fts}_{suffix}" for suffix in ('ai', 'ad', 'au')] + [
+        f"DROP TABLE IF EXISTS {fts}"
+    ]
+
+
+def create_search_index(schema_editor, model):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in _create_statements(model):
+            schema_editor.execute(statement)
+
+
+def drop_search_index(schema_editor, model):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in _drop_statements(model):
+            schema_editor.execute(statement)
+
+
+def rebuild_search_index(model):
+    """Recreate the FTS table and triggers and re-index every row."""
+    if connection.vendor != 'sqlite':
+        return
+    fts = fts_table(model)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for statement in _drop_statements(model) + _create_statements(model):
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text or '')[:MAX_TERMS]
+
+
+def match_expression(terms):
+    """Every term must match, each as a prefix: 'org whe' -> '"org"* "whe"*'."""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_quotes(queryset, text):
+    """
+    Restrict `queryset` to quotes matching `text` and annotate `rank`
+    (lower is better, as with bm25).
+    """
+    terms = search_terms(text)
+    model = queryset.model
+    if connection.vendor != 'sqlite':
+        for term in terms:
+            queryset = queryset.filter(
+                Q(product_name__icontains=term) | Q(category__icontains=term) | Q(description__icontains=term)
+            )
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+
+    table, fts = model._meta.db_table, fts_table(model)
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    match = match_expression(terms)
+    # The match set is computed once; bm25 needs a MATCH query of its own per row
+    matches = RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', (match,))
+    rank = RawSQL(f'SELECT bm25({fts}, {weights}) FROM {fts} WHERE {fts} MATCH %s AND rowid = {table}.id',
+                  (match,), output_field=FloatField())
+    return queryset.filter(id__in=matches).annotate(rank=rank)
+
+
+class QuoteSearchView(generics.ListAPIView):
+    """
+    GET ?q=<text>[&status=open][&state=..][&min_price=..][&max_price=..]
+    Results are best match first, keyset-paginated on (rank, id). `state`
+    is the quote owner's state; subclasses set `owner_field`.
+    """
+    keyset_ordering = ('rank', 'id')
+    owner_field = None
+
+    def get_base_queryset(self):
+        raise NotImplementedError
+
+    def get_queryset(self):
+        params = self.request.query_params
+        if not search_terms(params.get('q')):
+            raise ValidationError({'q': 'Enter at least one search term.'})
+
+        queryset = self.get_base_queryset().filter(status=params.get('status') or 'open')
+        if params.get('state'):
+            queryset = queryset.filter(**{f'{self.owner_field}__state__iexact': params['state']})
+        for param, lookup in (('min_price', 'gte'), ('max_price', 'lte')):
+            if params.get(param):
+                try:
+                    value = float(params[param])
+                except ValueError:
+                    raise ValidationError({param: 'A valid number is required.'})
+                queryset = queryset.filter(**{f'price_per_unit__{lookup}': value})
+
+        queryset = search_quotes(queryset, params['q'])
+        return self.get_serializer_class().setup_eager_loading(queryset)
@@ -0,0 +1,63 @@
+from rest_framework import serializers
+from rest_framework.fields import SerializerMethodField
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def query_list(request, param):
+    """Comma-separated names from ?param=a,b (repeatable), as a set."""
+    values = request.query_params.getlist(param) if request is not None else []
+    return {name.strip() for value in values for name in value.split(',') if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for read requests on the top-level serializer:
+    ?fields=id,status keeps only those fields, and ?expand=quote replaces a
+    compact field with the nested serializer named in
+    Meta.expandable_fields = {'quote': (SerializerClass, {kwargs})}.
+    Unknown names are ignored. Writes always see every field.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self._is_top_level():
+            return fields
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in query_list(request, 'expand') & expandable.keys():
+            serializer_class, kwargs = expandable[name]
+            fields[name] = serializer_class(**kwargs)
+
+        selected = query_list(request, 'fields')
+        if selected:
+            fields = {name: field for name, field in fields.items() if name in selected}
+        return fields
+
+    def _is_top_level(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def expanded(self, name):
+        return isinstance(self.fields.get(name), serializers.BaseSerializer)
+
+    def project(self, queryset, extra=()):
+        """
+        select_related() the relations the selected fields read and, when
+        every one of them is a plain column, .only() those columns (plus
+        `extra`, e.g. the pagination key). Nested/method fields load the
+        full rows and are left to the serializer's own eager loading.
+        """
+        columns, relations, plain = {queryset.model._meta.pk.name, *extra}, set(), True
+        for field in self.fields.values():
+            if isinstance(field, (serializers.BaseSerializer, SerializerMethodField)) or field.source == '*':
+                plain = False
+                continue
+            path = field.source.split('.')
+            columns.add('__'.join(path))
+            relations.update('__'.join(path[:depth]) for depth in range(1, len(path)))
+
+        if relations:
+            queryset = queryset.select_related(*sorted(relations))
+        return queryset.only(*columns, *relations) if plain else queryset
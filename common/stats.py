@@ -0,0 +1,120 @@
+"""
+Maintenance of DashboardStats counters. Call these inside the same
+transaction.atomic() block as the write they describe.
+
+Only writes that go through these helpers are counted: rows removed by a
+cascade (deleting a profile deletes its quotes and bids) and queryset
+.update() calls elsewhere leave the counters off until the next rebuild(),
+so run rebuild_dashboard_stats on a schedule (e.g. nightly).
+"""
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from common.models import DashboardStats
+
+# Status values that count towards the open/awarded quote and accepted bid counters
+OPEN = 'open'
+AWARDED = 'awarded'
+ACCEPTED = 'accepted'
+
+
+def stats_key(role, user_id):
+    return f"{role}:{user_id}"
+
+
+def market_key(quote_owner_role):
+    return f"market:{quote_owner_role}"
+
+
+def bump(key, **deltas):
+    """Add `deltas` to the counters of one row, creating it on first use."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if DashboardStats.objects.filter(key=key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            DashboardStats.objects.create(key=key, **deltas)
+    except IntegrityError:
+        # Someone created the row concurrently
+        DashboardStats.objects.filter(key=key).update(**changes)
+
+
+def _delta(old, new, value):
+    return (new == value) - (old == value)
+
+
+def quotes_created(owner_role, owner_id, count=1):
+    bump(stats_key(owner_role, owner_id), quotes=count, open_quotes=count)
+    bump(market_key(owner_role), open_quotes=count)
+
+
+def quote_status_changed(owner_role, owner_id, old_status, new_status, count=1):
+    open_delta = _delta(old_status, new_status, OPEN) * count
+    bump(
+        stats_key(owner_role, owner_id),
+        open_quotes=open_delta,
+        awarded_quotes=_delta(old_status, new_status, AWARDED) * count,
+    )
+    bump(market_key(owner_role), open_quotes=open_delta)
+
+
+def bid_created(bidder_role, bidder_id, owner_role, owner_id):
+    bump(stats_key(bidder_role, bidder_id), bids_placed=1)
+    bump(stats_key(owner_role, owner_id), bids_received=1)
+
+
+def bid_status_changed(bidder_role, bidder_id, old_status, new_status, count=1):
+    bump(stats_key(bidder_role, bidder_id), bids_accepted=_delta(old_status, new_status, ACCEPTED) * count)
+
+
+def read_stats(*keys):
+    """Fetch rows for `keys` in one query; missing rows read as all zeros."""
+    rows = {row.key: row for row in DashboardStats.objects.filter(key__in=keys)}
+    return [rows.get(key) or DashboardStats(key=key) for key in keys]
+
+
+def rebuild(apps=global_apps):
+    """
+    Recompute every DashboardStats row from the quote and bid tables and
+    return how many there are. Migrations pass their historical `apps`.
+    """
+    counters = defaultdict(lambda: defaultdict(int))
+
+    for quote_label, owner_role in (('farmer.FarmerQuote', 'farmer'), ('fpo.FPOQuote', 'fpo')):
+        rows = apps.get_model(quote_label).objects.values(owner_role).annotate(
+            quotes=Count('id'),
+            open_quotes=Count('id', filter=Q(status=OPEN)),
+            awarded_quotes=Count('id', filter=Q(status=AWARDED)),
+        )
+        for row in rows:
+            key = stats_key(owner_role, row[owner_role])
+            for field in ('quotes', 'open_quotes', 'awarded_quotes'):
+                counters[key][field] = row[field]
+            counters[market_key(owner_role)]['open_quotes'] += row['open_quotes']
+
+    for bid_label, bidder_role, owner_role in (('fpo.FPOBid', 'fpo', 'farmer'), ('retailer.RetailerBid', 'retailer', 'fpo')):
+        bid_model = apps.get_model(bid_label)
+        for row in bid_model.objects.values(bidder_role).annotate(
+            placed=Count('id'), accepted=Count('id', filter=Q(status=ACCEPTED))
+        ):
+            key = stats_key(bidder_role, row[bidder_role])
+            counters[key]['bids_placed'] = row['placed']
+            counters[key]['bids_accepted'] = row['accepted']
+        owner_field = f'quote__{owner_role}'
+        for row in bid_model.objects.values(owner_field).annotate(received=Count('id')):
+            counters[stats_key(owner_role, row[owner_field])]['bids_received'] = row['received']
+
+    stats_model = apps.get_model('common', 'DashboardStats')
+    with transaction.atomic():
+        stats_model.objects.all().delete()
+        stats_model.objects.bulk_create(
+            [stats_model(key=key, **fields) for key, fields in counters.items()],
+            batch_size=1000,
+        )
+    return len(counters)
@@ -0,0 +1,103 @@
+"""Shared fixtures for the app test suites."""
+import itertools
+from datetime import date, timedelta
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from farmer.models import Farmer, FarmerQuote
+from fpo.models import FPO, FPOBid, FPOQuote
+from retailer.models import Retailer, RetailerBid
+from admin_app.models import Admin
+from users.principal_cache import Principal
+
+_seq = itertools.count(1)
+
+
+def make_farmer(**kwargs):
+    n = next(_seq)
+    defaults = {
+        'name': f'Farmer {n}', 'email': f'farmer{n}@test.com', 'aadhaar_number': f'{n:012d}',
+        'wallet_address': f'0xFARMER{n}', 'city': 'Pune', 'state': 'Maharashtra',
+        'approval_status': 'approved',
+    }
+    defaults.update(kwargs)
+    return Farmer.objects.create(**defaults)
+
+
+def make_fpo(**kwargs):
+    n = next(_seq)
+    defaults = {
+        'name': f'FPO {n}', 'email': f'fpo{n}@test.com', 'corporate_identification_number': f'CIN{n}',
+        'wallet_address': f'0xFPO{n}', 'city': 'Nashik', 'state': 'Maharashtra',
+        'approval_status': 'approved',
+    }
+    defaults.update(kwargs)
+    return FPO.objects.create(**defaults)
+
+
+def make_retailer(**kwargs):
+    n = next(_seq)
+    defaults = {
+        'name': f'Retailer {n}', 'email': f'retailer{n}@test.com', 'gstin': f'GSTIN{n}',
+        'wallet_address': f'0xRETAILER{n}', 'city': 'Mumbai', 'state': 'Maharashtra',
+        'approval_status': 'approved',
+    }
+    defaults.update(kwargs)
+    return Retailer.objects.create(**defaults)
+
+
+def make_admin(**kwargs):
+    n = next(_seq)
+    defaults = {'username': f'admin{n}', 'wallet_address': f'0xADMIN{n}'}
+    defaults.update(kwargs)
+    return Admin.objects.create(**defaults)
+
+
+def access_token(user, role):
+    """Build an access token carrying the same claims as /api/token/."""
+    refresh = RefreshToken.for_user(user)
+    refresh['user_id'] = user.id
+    refresh['username'] = getattr(user, 'email', None) or user.username
+    refresh['role'] = role
+    refresh['name'] = getattr(user, 'name', None) or user.username
+    return str(refresh.access_token)
+
+
+def auth_header(user, role):
+    return {'HTTP_AUTHORIZATION': f'Bearer {access_token(user, role)}'}
+
+
+def principal(user, role):
+    """request.user for APIClient.force_authenticate (skips JWT and the principal lookup)."""
+    username = getattr(user, 'email', None) or user.username
+    return Principal(user.id, username, role, getattr(user, 'name', username), user)
+
+
+def make_farmer_quote(farmer, **kwargs):
+    defaults = {
+        'product_name': 'Wheat', 'category': 'Grains', 'description': 'Organic wheat',
+        'quantity': '500.00', 'unit': 'kg', 'deadline': date.today() + timedelta(days=30),
+    }
+    defaults.update(kwargs)
+    return FarmerQuote.objects.create(farmer=farmer, **defaults)
+
+
+def make_fpo_quote(fpo, **kwargs):
+    defaults = {
+        'product_name': 'Wheat flour', 'category': 'Processed Grains', 'description': '10kg bags',
+        'quantity': '200.00', 'unit': 'bags', 'deadline': date.today() + timedelta(days=30),
+    }
+    defaults.update(kwargs)
+    return FPOQuote.objects.create(fpo=fpo, **defaults)
+
+
+def make_fpo_bid(fpo, quote, **kwargs):
+    defaults = {'bid_amount': '20.00', 'delivery_time_days': 10}
+    defaults.update(kwargs)
+    return FPOBid.objects.create(fpo=fpo, quote=quote, **defaults)
+
+
+def make_retailer_bid(retailer, quote, **kwargs):
+    defaults = {'bid_amount': '150.00', 'delivery_time_days': 10}
+    defaults.update(kwargs)
+    return RetailerBid.objects.create(retailer=retailer, quote=quote, **defaults)
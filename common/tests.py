@@ -0,0 +1,623 @@
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from common import geo, metrics
+from common.auction import OrderBook, auction_engine
+from common.expiry import expire_quotes
+from common.matching import UNIT_TO_KG, buyer_profiles, match_sides, profile_cache, run_matching
+from common.models import Checkpoint, DashboardStats, IdempotencyKey, Recommendation
+from common.testing import (
+    make_farmer, make_fpo, make_retailer, make_farmer_quote, make_fpo_quote, make_fpo_bid, make_retailer_bid, principal,
+)
+from farmer.models import Farmer, FarmerQuote
+from farmer.views import accept_fpo_bid
+from fpo.models import FPO, FPOBid, FPOQuote
+from fpo.views import accept_retailer_bid
+from retailer.models import Retailer, RetailerBid
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.farmer = make_farmer()
+        self.fpo = make_fpo()
+        self.retailer = make_retailer()
+        self.clients = {}
+        for role, user in (('farmer', self.farmer), ('fpo', self.fpo), ('retailer', self.retailer)):
+            client = APIClient()
+            client.force_authenticate(principal(user, role))
+            self.clients[role] = client
+
+    def post(self, role, url, data=None):
+        response = self.clients[role].post(url, data or {}, format='json')
+        self.assertIn(response.status_code, (200, 201), response.content)
+        return response.json()
+
+    def quote_data(self):
+        return {
+            'product_name': 'Wheat', 'category': 'Grains', 'description': 'Organic',
+            'quantity': '100.00', 'unit': 'kg', 'deadline': str(date.today() + timedelta(days=10)),
+        }
+
+    def dashboards(self):
+        return {role: self.clients[role].get(f'/api/{role}/dashboard/').json() for role in self.clients}
+
+    def run_marketplace(self):
+        farmer_quote = self.post('farmer', '/api/farmer/quotes/', self.quote_data())
+        self.post('farmer', '/api/farmer/quotes/', self.quote_data())
+        fpo_bid = self.post('fpo', f"/api/fpo/quotes/farmer/{farmer_quote['id']}/bids/",
+                            {'bid_amount': '20.00', 'delivery_time_days': 5})
+        self.post('farmer', f"/api/farmer/bids/fpo/{fpo_bid['id']}/accept/")
+
+        fpo_quote = self.post('fpo', '/api/fpo/quotes/', self.quote_data())
+        retailer_bid = self.post('retailer', f"/api/retailer/quotes/fpo/{fpo_quote['id']}/bids/",
+                                 {'bid_amount': '30.00', 'delivery_time_days': 3})
+        self.post('fpo', f"/api/fpo/bids/retailer/{retailer_bid['id']}/accept/")
+
+    def test_dashboards_follow_writes(self):
+        self.run_marketplace()
+        self.assertEqual(self.dashboards(), {
+            'farmer': {'my_quotes_count': 2, 'bids_received_count': 1, 'active_quotes': 1, 'awarded_quotes': 0},
+            'fpo': {'available_farmer_quotes_count': 1, 'my_bids_count': 1, 'my_quotes_count': 1,
+                    'retailer_bids_count': 1},
+            'retailer': {'available_fpo_quotes_count': 0, 'my_bids_count': 1, 'accepted_bids_count': 1},
+        })
+
+    def test_dashboard_is_one_query(self):
+        for role in self.clients:
+            with self.assertNumQueries(1):
+                self.clients[role].get(f'/api/{role}/dashboard/')
+
+    def test_rebuild_matches_maintained_counters(self):
+        self.run_marketplace()
+        maintained = self.dashboards()
+        DashboardStats.objects.all().delete()
+        call_command('rebuild_dashboard_stats', stdout=StringIO())
+        self.assertEqual(self.dashboards(), maintained)
+
+
+class HotQueryPlanTests(TestCase):
+    """EXPLAIN every hot marketplace query and require an index, never a full table scan."""
+
+    def setUp(self):
+        self.farmer = make_farmer()
+        self.fpo = make_fpo()
+        self.retailer = make_retailer()
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        plan = queryset.explain()
+        table = queryset.model._meta.db_table
+        for line in plan.splitlines():
+            if f'SCAN {table}' in line:
+                self.assertIn('INDEX', line, f"full scan of {table}:\n{plan}")
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_open_quote_feeds(self):
+        self.assertUsesIndex(FarmerQuote.objects.filter(status='open').order_by('-created_at', '-id')[:50],
+                             'farmerquote_open_idx')
+        self.assertUsesIndex(FPOQuote.objects.filter(status='open').order_by('-created_at', '-id')[:50],
+                             'fpoquote_open_idx')
+
+    def test_owner_quote_lists(self):
+        self.assertUsesIndex(FarmerQuote.objects.filter(farmer=self.farmer).order_by('-created_at', '-id'),
+                             'farmerquote_owner_created_idx')
+        self.assertUsesIndex(FPOQuote.objects.filter(fpo=self.fpo).order_by('-created_at', '-id'),
+                             'fpoquote_owner_created_idx')
+
+    def test_my_bids(self):
+        self.assertUsesIndex(RetailerBid.objects.filter(retailer=self.retailer).order_by('-submitted_at', '-id'),
+                             'retailerbid_owner_submit_idx')
+
+    def test_duplicate_bid_probe(self):
+        quote = make_farmer_quote(self.farmer)
+        self.assertUsesIndex(FPOBid.objects.filter(quote=quote, fpo=self.fpo))
+        fpo_quote = make_fpo_quote(self.fpo)
+        self.assertUsesIndex(RetailerBid.objects.filter(quote=fpo_quote, retailer=self.retailer))
+
+    def test_pending_registrations(self):
+        for model, prefix in ((Farmer, 'farmer'), (FPO, 'fpo'), (Retailer, 'retailer')):
+            self.assertUsesIndex(model.objects.filter(approval_status='pending').order_by('created_at'),
+                                 f'{prefix}_pending_idx')
+
+
+    def test_expiry_sweep(self):
+        self.assertUsesIndex(FarmerQuote.objects.filter(status='open', deadline__lt=date.today())
+                             .order_by('deadline', 'id')[:500], 'farmerquote_open_deadline_idx')
+        self.assertUsesIndex(FPOQuote.objects.filter(status='open', deadline__lt=date.today())
+                             .order_by('deadline', 'id')[:500], 'fpoquote_open_deadline_idx')
+
+
+class DuplicateBidTests(TestCase):
+    def test_second_bid_is_rejected_by_constraint(self):
+        fpo = make_fpo()
+        client = APIClient()
+        client.force_authenticate(principal(fpo, 'fpo'))
+        quote = make_farmer_quote(make_farmer())
+        url = f'/api/fpo/quotes/farmer/{quote.id}/bids/'
+        self.assertEqual(client.post(url, {'bid_amount': '10.00', 'delivery_time_days': 3}, format='json').status_code, 201)
+        response = client.post(url, {'bid_amount': '11.00', 'delivery_time_days': 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(FPOBid.objects.filter(quote=quote).count(), 1)
+
+
+class QuoteExpiryTests(TestCase):
+    def setUp(self):
+        self.farmer = make_farmer()
+        yesterday = date.today() - timedelta(days=1)
+        self.expired = [make_farmer_quote(self.farmer, deadline=yesterday) for _ in range(5)]
+        self.live = make_farmer_quote(self.farmer)
+        self.accepted = make_farmer_quote(self.farmer, deadline=yesterday, status='accepted')
+        call_command('rebuild_dashboard_stats', stdout=StringIO())
+        metrics.reset()
+
+    def test_closes_expired_open_quotes_in_chunks(self):
+        closed = expire_quotes(FarmerQuote, 'farmer', 'farmer', chunk_size=2)
+
+        self.assertEqual(closed, 5)
+        self.assertEqual(set(FarmerQuote.objects.filter(status='closed')), set(self.expired))
+        self.assertEqual(FarmerQuote.objects.get(pk=self.live.pk).status, 'open')
+        self.assertEqual(FarmerQuote.objects.get(pk=self.accepted.pk).status, 'accepted')
+        self.assertEqual(DashboardStats.objects.get(key=f'farmer:{self.farmer.id}').open_quotes, 1)
+        self.assertEqual(DashboardStats.objects.get(key='market:farmer').open_quotes, 1)
+        self.assertEqual(metrics.get('quote_expiry.batches'), 3)
+        self.assertEqual(metrics.get('quote_expiry.closed'), 5)
+
+    def test_checkpoint_skips_finished_sweep(self):
+        expire_quotes(FarmerQuote, 'farmer', 'farmer')
+        state = Checkpoint.objects.get(name='expire:farmerquote').state
+        self.assertEqual(state['swept_through'], date.today().isoformat())
+        self.assertEqual(state['closed_total'], 5)
+
+        make_farmer_quote(self.farmer, deadline=date.today() - timedelta(days=3))
+        with self.assertNumQueries(1):
+            self.assertEqual(expire_quotes(FarmerQuote, 'farmer', 'farmer'), 0)
+        self.assertEqual(expire_quotes(FarmerQuote, 'farmer', 'farmer', today=date.today() + timedelta(days=1)), 1)
+
+    def test_command_covers_both_quote_tables(self):
+        fpo_quote = make_fpo_quote(make_fpo(), deadline=date.today() - timedelta(days=1))
+        out = StringIO()
+        call_command('close_expired_quotes', pause=0, stdout=out)
+        self.assertIn('Closed 5 expired', out.getvalue())
+        fpo_quote.refresh_from_db()
+        self.assertEqual(fpo_quote.status, 'closed')
+
+
+class QuoteSearchTests(TestCase):
+    def setUp(self):
+        self.fpo = make_fpo()
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.fpo, 'fpo'))
+        self.pune = make_farmer()
+        self.delhi = make_farmer(city='Delhi', state='Delhi')
+        self.wheat = make_farmer_quote(self.pune, product_name='Organic wheat', price_per_unit='25.00')
+        self.flour = make_farmer_quote(self.delhi, product_name='Rice', description='Wheat flour blend',
+                                       price_per_unit='40.00')
+        self.onion = make_farmer_quote(self.pune, product_name='Red onion', category='Vegetables',
+                                       description='Nashik onions')
+
+    def search(self, query):
+        response = self.client.get(f'/api/fpo/quotes/farmer/search/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_prefix_match_ranks_product_name_first(self):
+        self.assertEqual(self.search('q=whe'), [self.wheat.id, self.flour.id])
+        self.assertEqual(self.search('q=org+whe'), [self.wheat.id])
+        self.assertEqual(self.search('q=vegetables'), [self.onion.id])
+
+    def test_filters_combine_with_match(self):
+        self.assertEqual(self.search('q=wheat&state=delhi'), [self.flour.id])
+        self.assertEqual(self.search('q=wheat&max_price=30'), [self.wheat.id])
+        FarmerQuote.objects.filter(pk=self.wheat.pk).update(status='closed')
+        self.assertEqual(self.search('q=wheat'), [self.flour.id])
+        self.assertEqual(self.search('q=wheat&status=closed'), [self.wheat.id])
+
+    def test_triggers_follow_edits_and_deletes(self):
+        self.onion.product_name = 'White garlic'
+        self.onion.save()
+        self.assertEqual(self.search('q=garlic'), [self.onion.id])
+        self.assertEqual(self.search('q=red'), [])
+        self.flour.delete()
+        self.assertEqual(self.search('q=wheat'), [self.wheat.id])
+
+    def test_keyset_pages_by_rank(self):
+        extra = [make_farmer_quote(self.pune, description=f'wheat lot {n}') for n in range(4)]
+        seen, url = [], '/api/fpo/quotes/farmer/search/?q=wheat&page_size=2'
+        while url:
+            body = self.client.get(url).json()
+            seen += [row['id'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(sorted(seen), sorted([self.wheat.id, self.flour.id] + [q.id for q in extra]))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_requires_terms_and_rebuild_restores_index(self):
+        response = self.client.get('/api/fpo/quotes/farmer/search/?q=%20*')
+        self.assertEqual(response.status_code, 400)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('q=onion'), [self.onion.id])
+
+    def test_retailer_searches_fpo_quotes(self):
+        quote = make_fpo_quote(self.fpo, product_name='Wheat flour')
+        client = APIClient()
+        client.force_authenticate(principal(make_retailer(), 'retailer'))
+        response = client.get('/api/retailer/quotes/fpo/search/?q=flour')
+        self.assertEqual([row['id'] for row in response.json()['results']], [quote.id])
+
+
+class RegionFeedTests(TestCase):
+    def setUp(self):
+        self.fpo = make_fpo(city='Pune', state='Maharashtra')
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.fpo, 'fpo'))
+        self.pune = make_farmer_quote(make_farmer(city='Pune', state='Maharashtra'))
+        self.nashik = make_farmer_quote(make_farmer(city='Nashik', state='Maharashtra'))
+        self.nagpur = make_farmer_quote(make_farmer(city='Nagpur', state='Maharashtra'))
+        self.delhi = make_farmer_quote(make_farmer(city='Delhi', state='Delhi'))
+        self.nowhere = make_farmer_quote(make_farmer(city='Atlantis', state='Unknown'))
+
+    def feed(self, query):
+        response = self.client.get(f'/api/fpo/quotes/farmer/open/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_quotes_are_located_from_owner(self):
+        self.assertEqual(self.pune.geo_cell, geo.cell_id(18.5204, 73.8567))
+        self.assertIsNone(self.nowhere.geo_cell)
+        # Unknown city, known state: the state's centroid
+        self.assertIsNotNone(make_farmer_quote(make_farmer(city='Lonavala', state='Maharashtra')).latitude)
+
+    def test_state_filter_and_radius(self):
+        self.assertEqual(set(self.feed('state=maharashtra')), {self.pune.id, self.nashik.id, self.nagpur.id})
+        self.assertEqual(set(self.feed('radius_km=250')), {self.pune.id, self.nashik.id})
+        self.assertEqual(self.client.get('/api/fpo/quotes/farmer/open/?radius_km=5000').status_code, 400)
+
+    def test_nearby_ordering_pages_by_distance(self):
+        expected = [self.pune.id, self.nashik.id, self.nagpur.id, self.delhi.id, self.nowhere.id]
+        self.assertEqual(self.feed('order=nearby'), expected)
+        seen, url = [], '/api/fpo/quotes/farmer/open/?order=nearby&page_size=2'
+        while url:
+            body = self.client.get(url).json()
+            seen += [row['id'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(seen, expected)
+
+    def test_radius_query_reads_only_nearby_cells(self):
+        cells = geo.cells_within(18.5204, 73.8567, 100)
+        self.assertLess(len(cells), 30)
+        plan = FarmerQuote.objects.filter(status='open', geo_cell__in=cells).order_by('-created_at').explain()
+        self.assertIn('farmerquote_open_cell_idx', plan)
+
+    def test_bulk_upload_and_owner_move_keep_locations(self):
+        farmer = make_farmer(city='Delhi', state='Delhi')
+        client = APIClient()
+        client.force_authenticate(principal(farmer, 'farmer'))
+        row = {'product_name': 'Rice', 'category': 'Grains', 'description': 'x', 'quantity': '5',
+               'unit': 'kg', 'deadline': str(date.today() + timedelta(days=3))}
+        client.post('/api/farmer/quotes/bulk/', [row], format='json')
+        self.assertEqual(farmer.quotes.get().geo_cell, geo.cell_id(*geo.locate('Delhi', 'Delhi')))
+
+        client.patch(f'/api/farmer/{farmer.id}/', {'city': 'Pune', 'state': 'Maharashtra'}, format='json')
+        self.assertEqual(farmer.quotes.get().geo_cell, self.pune.geo_cell)
+
+
+class BidAcceptanceRaceTests(TransactionTestCase):
+    THREADS = 12
+
+    def race(self, view, user, role, bids):
+        # Views are called directly: the test client's exception capture is not thread-safe
+        barrier = threading.Barrier(len(bids))
+        statuses = []
+
+        def accept(bid):
+            request = APIRequestFactory().post('/')
+            force_authenticate(request, principal(user, role))
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        statuses.append(view(request, bid_pk=bid.pk).status_code)
+                        return
+                    except OperationalError:
+                        # Shared-cache test database: "table is locked", retry like a client would
+                        time.sleep(0.001)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=accept, args=(bid,)) for bid in bids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses)
+
+    def test_one_fpo_bid_wins(self):
+        farmer = make_farmer()
+        quote = make_farmer_quote(farmer)
+        bids = [make_fpo_bid(make_fpo(), quote) for _ in range(self.THREADS)]
+        call_command('rebuild_dashboard_stats', stdout=StringIO())
+
+        statuses = self.race(accept_fpo_bid, farmer, 'farmer', bids)
+
+        self.assertEqual(statuses, [200] + [400] * (self.THREADS - 1))
+        quote.refresh_from_db()
+        self.assertEqual(quote.status, 'accepted')
+        self.assertEqual(list(FPOBid.objects.filter(status='accepted')), [quote.accepted_bid])
+        self.assertEqual(FPOBid.objects.filter(status='rejected').count(), self.THREADS - 1)
+        self.assertEqual(DashboardStats.objects.get(key=f'farmer:{farmer.id}').open_quotes, 0)
+        self.assertEqual(sum(DashboardStats.objects.filter(key__startswith='fpo:')
+                             .values_list('bids_accepted', flat=True)), 1)
+
+    def test_one_retailer_bid_wins(self):
+        fpo = make_fpo()
+        quote = make_fpo_quote(fpo)
+        bids = [make_retailer_bid(make_retailer(), quote) for _ in range(self.THREADS)]
+
+        statuses = self.race(accept_retailer_bid, fpo, 'fpo', bids)
+
+        self.assertEqual(statuses, [200] + [400] * (self.THREADS - 1))
+        quote.refresh_from_db()
+        self.assertEqual(quote.status, 'awarded')
+        self.assertEqual(list(RetailerBid.objects.filter(status='accepted')), [quote.accepted_bid])
+        self.assertEqual(RetailerBid.objects.filter(status='rejected').count(), self.THREADS - 1)
+
+
+class AuctionTests(TestCase):
+    def setUp(self):
+        auction_engine.clear()
+        self.farmer = make_farmer()
+        self.owner = APIClient()
+        self.owner.force_authenticate(principal(self.farmer, 'farmer'))
+        self.quote = make_farmer_quote(self.farmer, auction_enabled=True)
+        self.fpos = [make_fpo() for _ in range(4)]
+        # (amount, days): scores 100-5=95, 120-10=110, 110-2=109, 120-10=110 (later, loses the tie)
+        self.bids = [self.bid(fpo, amount, days)
+                     for fpo, (amount, days) in zip(self.fpos, [(100, 10), (120, 20), (110, 4), (120, 20)])]
+        call_command('rebuild_dashboard_stats', stdout=StringIO())
+
+    def bid(self, fpo, amount, days):
+        client = APIClient()
+        client.force_authenticate(principal(fpo, 'fpo'))
+        response = client.post(f'/api/fpo/quotes/farmer/{self.quote.id}/bids/',
+                               {'bid_amount': amount, 'delivery_time_days': days}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return FPOBid.objects.get(fpo=fpo, quote=self.quote)
+
+    def order_book(self):
+        response = self.owner.get(f'/api/farmer/quotes/{self.quote.id}/order-book/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_order_book_keeps_best_k(self):
+        book = OrderBook(capacity=3)
+        for n, bid in enumerate(FPOBid(pk=n + 1, bid_amount=amount, delivery_time_days=1)
+                                for n, amount in enumerate([5, 50, 7, 90, 50, 1, 60])):
+            book.push(bid, f'fpo{n}')
+        self.assertEqual([row['bid_id'] for row in book.top()], [4, 7, 2])
+        self.assertEqual(book.bid_count, 7)
+        self.assertEqual(book.best_bid_id(), 4)
+
+    def test_owner_sees_ranking_bidders_see_sealed_quote(self):
+        ranked = [row['bid_id'] for row in self.order_book()['top_bids']]
+        self.assertEqual(ranked, [self.bids[1].id, self.bids[3].id, self.bids[2].id, self.bids[0].id])
+
+        # Survives a restart: the book is rebuilt from the database
+        auction_engine.clear()
+        self.assertEqual([row['bid_id'] for row in self.order_book()['top_bids']], ranked)
+
+        bidder = APIClient()
+        bidder.force_authenticate(principal(make_fpo(), 'fpo'))
+        feed = bidder.get('/api/fpo/quotes/farmer/open/').json()['results']
+        self.assertEqual(feed[0]['bids'], [])
+        self.assertEqual(len(self.owner.get(f'/api/farmer/quotes/{self.quote.id}/').json()['bids']), 4)
+
+        outsider = APIClient()
+        outsider.force_authenticate(principal(make_farmer(), 'farmer'))
+        self.assertEqual(outsider.get(f'/api/farmer/quotes/{self.quote.id}/order-book/').status_code, 403)
+
+    def test_award_at_deadline(self):
+        self.assertEqual(auction_engine.award_due(), 0)  # not due yet
+
+        awarded = auction_engine.award_due(today=self.quote.deadline + timedelta(days=1))
+
+        self.assertEqual(awarded, 1)
+        self.quote.refresh_from_db()
+        self.assertEqual((self.quote.status, self.quote.accepted_bid_id), ('accepted', self.bids[1].id))
+        self.assertEqual(FPOBid.objects.filter(quote=self.quote, status='rejected').count(), 3)
+        self.assertEqual(DashboardStats.objects.get(key=f'fpo:{self.fpos[1].id}').bids_accepted, 1)
+
+    def test_owner_cannot_hand_pick_or_unseal(self):
+        response = self.owner.post(f'/api/farmer/bids/fpo/{self.bids[0].id}/accept/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(FarmerQuote.objects.get(pk=self.quote.pk).status, 'open')
+
+        url = f'/api/farmer/quotes/{self.quote.id}/'
+        response = self.owner.patch(url, {'auction_enabled': False}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('auction_enabled', response.json())
+        self.assertEqual(self.owner.patch(url, {'auction_enabled': True, 'description': 'Dry'}, format='json').status_code, 200)
+
+        fpo = make_fpo()
+        retailer_bid = make_retailer_bid(make_retailer(), make_fpo_quote(fpo, auction_enabled=True))
+        client = APIClient()
+        client.force_authenticate(principal(fpo, 'fpo'))
+        self.assertEqual(client.post(f'/api/fpo/bids/retailer/{retailer_bid.id}/accept/').status_code, 400)
+
+    def test_sweep_awards_before_closing(self):
+        empty = make_farmer_quote(self.farmer, auction_enabled=True)
+        FarmerQuote.objects.filter(pk__in=[self.quote.pk, empty.pk]).update(
+            deadline=date.today() - timedelta(days=1))
+
+        out = StringIO()
+        call_command('close_expired_quotes', pause=0, stdout=out)
+
+        self.assertIn('Awarded 1 auctions.', out.getvalue())
+        self.assertEqual(FarmerQuote.objects.get(pk=self.quote.pk).status, 'accepted')
+        self.assertEqual(FarmerQuote.objects.get(pk=empty.pk).status, 'closed')
+
+
+class MatchingTests(TestCase):
+    def setUp(self):
+        profile_cache.clear()
+        # A Pune grains buyer (history: 1 ton wheat at ~20/kg) and a Kolkata vegetables buyer
+        self.grains = make_fpo(city='Pune', state='Maharashtra')
+        self.veg = make_fpo(city='Kolkata', state='West Bengal')
+        past = make_farmer_quote(make_farmer(), status='closed', quantity='10', unit='quintal', price_per_unit='2000')
+        make_fpo_bid(self.grains, past, bid_amount='2000')
+        make_fpo_bid(self.veg, make_farmer_quote(make_farmer(), status='closed', category='Vegetables'))
+
+        self.near = make_farmer_quote(make_farmer(city='Pune'), quantity='1', unit='ton', price_per_unit='20')
+        self.far = make_farmer_quote(make_farmer(city='Kolkata', state='West Bengal'), category='Vegetables')
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.grains, 'fpo'))
+
+    def ranked(self, fpo):
+        return [entry['quote_id'] for entry in Recommendation.objects.get(key=f'fpo:{fpo.id}').quotes]
+
+    def test_ranks_by_category_quantity_price_and_region(self):
+        self.assertEqual(UNIT_TO_KG['quintal'], 100)
+        self.assertEqual(run_matching('fpo'), 2)
+        self.assertEqual(self.ranked(self.grains), [self.near.id, self.far.id])
+        self.assertEqual(self.ranked(self.veg), [self.far.id, self.near.id])
+
+        response = self.client.get('/api/fpo/quotes/farmer/recommended/?limit=1')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([row['id'] for row in results], [self.near.id])
+        self.assertGreater(results[0]['score'], 0.9)
+
+    def test_incremental_run_scores_only_new_quotes(self):
+        run_matching('fpo')
+        self.assertEqual(run_matching('fpo'), 0)
+
+        newer = make_farmer_quote(make_farmer(city='Pune'), quantity='900', unit='kg', price_per_unit='0.02')
+        FarmerQuote.objects.filter(pk=self.far.pk).update(status='closed')
+        self.assertEqual(run_matching('fpo'), 1)
+        self.assertEqual(Checkpoint.objects.get(name='matching:fpo').state['last_quote_id'], newer.id)
+        # Closed quotes drop out; the new one is merged in by score
+        self.assertEqual(set(self.ranked(self.grains)), {self.near.id, newer.id})
+
+        # Recommendation row, quotes, and their prefetched bids
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/fpo/quotes/farmer/recommended/')
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_newly_approved_buyer_is_scored_against_open_quotes(self):
+        pending = make_fpo(city='Pune', state='Maharashtra', approval_status='pending')
+        make_fpo_bid(pending, make_farmer_quote(make_farmer(), status='closed', category='Vegetables'))
+        run_matching('fpo')
+        self.assertFalse(Recommendation.objects.filter(key=f'fpo:{pending.id}').exists())
+
+        FPO.objects.filter(pk=pending.pk).update(approval_status='approved')
+        self.assertEqual(run_matching('fpo'), 2)
+        self.assertEqual(self.ranked(pending), [self.far.id, self.near.id])
+        # Buyers scored earlier keep their lists; nothing is left to do afterwards
+        self.assertEqual(self.ranked(self.grains), [self.near.id, self.far.id])
+        self.assertEqual(run_matching('fpo'), 0)
+
+    def test_profiles_are_updated_in_place(self):
+        side = match_sides()['fpo']
+        profiles = buyer_profiles(side)
+        self.assertEqual(profiles.counts.sum(), 2)
+
+        make_fpo_bid(self.grains, make_farmer_quote(make_farmer(), status='closed', category='Vegetables'))
+        make_fpo_bid(make_fpo(approval_status='pending'), self.near)
+        # Approved buyers, then their new bids; unapproved bidders are filtered in SQL
+        with self.assertNumQueries(2):
+            self.assertIs(buyer_profiles(side), profiles)
+        self.assertEqual(profiles.counts.sum(), 3)
+        self.assertEqual(profiles.arrays().has_history.tolist(), [True, True])
+
+        FPO.objects.filter(pk=self.veg.pk).update(approval_status='rejected')
+        rebuilt = buyer_profiles(side)
+        self.assertIsNot(rebuilt, profiles)
+        self.assertEqual(rebuilt.ids.tolist(), [self.grains.id])
+
+    def test_buyer_without_recommendations(self):
+        client = APIClient()
+        client.force_authenticate(principal(make_retailer(), 'retailer'))
+        response = client.get('/api/retailer/quotes/fpo/recommended/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'updated_at': None, 'results': []})
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.retailer = make_retailer()
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.retailer, 'retailer'))
+        self.url = f'/api/retailer/quotes/fpo/{make_fpo_quote(make_fpo()).id}/bids/'
+
+    def bid(self, key, amount='150.00'):
+        return self.client.post(self.url, {'bid_amount': amount, 'delivery_time_days': 5}, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self):
+        first = self.bid('retry-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):  # one indexed read of the stored response
+            retry = self.bid('retry-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(RetailerBid.objects.filter(retailer=self.retailer).count(), 1)
+
+        self.assertEqual(self.bid('retry-1', amount='160.00').status_code, 422)
+
+    def test_failed_requests_are_not_recorded(self):
+        self.assertEqual(self.bid('retry-2', amount='0').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.bid('retry-2').status_code, 201)
+
+    def test_error_responses_are_not_recorded(self):
+        client = APIClient()
+        client.force_authenticate(principal(make_farmer(), 'farmer'))
+        response = client.post('/api/negotiation/start/', {'content_type': 'fpo.fpoquote', 'object_id': 1},
+                               format='json', HTTP_IDEMPOTENCY_KEY='bad-type')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_create_commits_with_its_response(self):
+        save = IdempotencyKey.save
+
+        def save_response_fails(record, *args, **kwargs):
+            if kwargs.get('update_fields'):
+                raise DatabaseError('disk full')
+            return save(record, *args, **kwargs)
+
+        with mock.patch.object(IdempotencyKey, 'save', save_response_fails):
+            with self.assertRaises(DatabaseError):
+                self.bid('crash')
+        # The bid was rolled back with the response, so the retry creates it once
+        self.assertFalse(RetailerBid.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.bid('crash').status_code, 201)
+        self.assertEqual(RetailerBid.objects.count(), 1)
+
+    def test_in_progress_key_conflicts(self):
+        self.assertEqual(self.bid('busy').status_code, 201)
+        # As if the first request were still running
+        IdempotencyKey.objects.filter(key='busy').update(status_code=None, response_body=None)
+        response = self.bid('busy')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(RetailerBid.objects.count(), 1)
+
+    def test_keys_are_per_principal(self):
+        farmer = make_farmer()
+        client = APIClient()
+        client.force_authenticate(principal(farmer, 'farmer'))
+        payload = {'product_name': 'Rice', 'category': 'Grains', 'description': 'Sona masuri', 'quantity': '10',
+                   'unit': 'quintal', 'deadline': str(date.today() + timedelta(days=5))}
+        for _ in range(3):
+            self.assertEqual(client.post('/api/farmer/quotes/', payload, format='json',
+                                         HTTP_IDEMPOTENCY_KEY='same').status_code, 201)
+        self.assertEqual(FarmerQuote.objects.filter(farmer=farmer).count(), 1)
+        self.assertEqual(self.bid('same').status_code, 201)
@@ -0,0 +1,88 @@
+"""
+Response cache for the public contract details page (get_contract_details).
+
+Entries hold the rendered JSON body plus a strong ETag and Last-Modified, so
+hits skip the DB and the serializer entirely. Anything that changes a
+quote with a contract, or a profile shown on it, must invalidate it. Use a
+shared CACHES backend when running several workers, otherwise each worker
+only sees its own invalidations.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from common import metrics
+from common.singleflight import SingleFlight
+
+CACHE_TIMEOUT = 60 * 60
+
+_flights = SingleFlight()
+
+
+def cache_key(contract_address):
+    return f"contract-details:{contract_address}"
+
+
+def _generation_key(contract_address):
+    return f"contract-details-generation:{contract_address}"
+
+
+def _generation(contract_address):
+    return cache.get(_generation_key(contract_address), 0)
+
+
+def _bump_generation(contract_address):
+    # Kept in the cache backend, expiring like the entries it guards: an
+    # expired generation only costs a load that isn't stored
+    key = _generation_key(contract_address)
+    cache.add(key, 0, CACHE_TIMEOUT)
+    try:
+        cache.incr(key)
+    except ValueError:  # expired between add() and incr()
+        cache.set(key, 1, CACHE_TIMEOUT)
+
+
+def get_contract_details_entry(contract_address, build):
+    """
+    Return {'body', 'etag', 'last_modified'} for the address. `build()` returns
+    the response data and runs at most once per key at a time in this process.
+    """
+    key = cache_key(contract_address)
+    entry = cache.get(key)
+    if entry is not None:
+        metrics.incr('contract_cache.hits')
+        return entry
+
+    def load():
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        metrics.incr('contract_cache.misses')
+        generation = _generation(contract_address)
+        body = JSONRenderer().render(build())
+        fresh = {
+            'body': body,
+            'etag': '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+            'last_modified': int(time.time()),
+        }
+        # Don't store if the quote changed while we were reading it
+        if generation == _generation(contract_address):
+            cache.set(key, fresh, CACHE_TIMEOUT)
+        return fresh
+
+    return _flights.do(key, load)
+
+
+def invalidate_contract_details(*contract_addresses):
+    for contract_address in contract_addresses:
+        if not contract_address:
+            continue
+        _bump_generation(contract_address)
+        cache.delete(cache_key(contract_address))
+
+
+def contract_addresses(quotes):
+    """The contract addresses among `quotes`, e.g. to invalidate after a profile they show changed."""
+    return list(quotes.exclude(contract_address=None).values_list('contract_address', flat=True).distinct())
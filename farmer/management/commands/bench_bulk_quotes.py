@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from common.bench import scratch_database, timed
+from common.testing import make_farmer, auth_header
+
+
+class Command(BaseCommand):
+    help = ("Compare quote ingestion throughput: one POST per quote versus the bulk "
+            "endpoint with JSON and CSV bodies. Uses a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = self.rows(options['rows'])
+        with scratch_database():
+            client = Client()
+            headers = auth_header(make_farmer(), 'farmer')
+
+            with timed() as elapsed:
+                for row in rows:
+                    client.post('/api/farmer/quotes/', row, content_type='application/json', **headers)
+            single = self.report('one POST per quote', len(rows), elapsed())
+
+            with timed() as elapsed:
+                response = client.post('/api/farmer/quotes/bulk/', json.dumps(rows),
+                                       content_type='application/json', **headers)
+            assert response.status_code == 201, response.content
+            bulk_json = self.report('bulk JSON', len(rows), elapsed())
+
+            with timed() as elapsed:
+                response = client.post('/api/farmer/quotes/bulk/', self.as_csv(rows),
+                                       content_type='text/csv', **headers)
+            assert response.status_code == 201, response.content
+            bulk_csv = self.report('bulk CSV', len(rows), elapsed())
+
+        self.stdout.write(f"speedup: JSON {bulk_json / single:.1f}x, CSV {bulk_csv / single:.1f}x")
+
+    def report(self, label, count, seconds):
+        rate = count / seconds
+        self.stdout.write(f"{label:>20}: {count} rows in {seconds:.2f}s ({rate:,.0f} rows/s)")
+        return rate
+
+    @staticmethod
+    def rows(count):
+        deadline = (date.today() + timedelta(days=30)).isoformat()
+        return [
+            {'product_name': f'Wheat lot {n}', 'category': 'Grains', 'description': 'Bench', 'quantity': '100.00',
+             'unit': 'kg', 'price_per_unit': '21.50', 'deadline': deadline}
+            for n in range(count)
+        ]
+
+    @staticmethod
+    def as_csv(rows):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        return out.getvalue()
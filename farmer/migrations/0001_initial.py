@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FarmerQuote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(max_length=200)),
+                ('category', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('unit', models.CharField(help_text='e.g., kg, quintal, ton', max_length=20)),
+                ('price_per_unit', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('closed', 'Closed'), ('awarded', 'Awarded'), ('accepted', 'Accepted'), ('contract_created', 'Contract Created')], default='open', max_length=20)),
+                ('deadline', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contract_address', models.CharField(blank=True, max_length=42, null=True)),
+                ('contract_created_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Farmer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('password', models.CharField(max_length=128)),
+                ('aadhaar_number', models.CharField(max_length=12, unique=True)),
+                ('wallet_address', models.CharField(max_length=100, unique=True)),
+                ('city', models.CharField(max_length=50)),
+                ('state', models.CharField(max_length=50)),
+                ('approval_status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('farmer', '0001_initial'),
+        ('fpo', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farmerquote',
+            name='accepted_bid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='accepted_for_farmer_quote', to='fpo.fpobid'),
+        ),
+        migrations.AddField(
+            model_name='farmerquote',
+            name='farmer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quotes', to='farmer.farmer'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:52
+
+from django.db import migrations, models
+
+from common.search import create_search_index, drop_search_index
+
+
+def recreate_search_index(apps, schema_editor):
+    # Adding a NOT NULL column rebuilds the table on SQLite, dropping the FTS triggers
+    model = apps.get_model('farmer', 'FarmerQuote')
+    drop_search_index(schema_editor, model)
+    create_search_index(schema_editor, model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmer', '0005_farmerquote_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farmerquote',
+            name='auction_enabled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmer', '0006_farmerquote_auction_enabled'),
+        ('fpo', '0006_fpoquote_auction_enabled'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='farmer',
+            index=models.Index(fields=['created_at', 'id'], name='farmer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='farmer',
+            index=models.Index(condition=models.Q(('approval_status', 'pending')), fields=['created_at'], name='farmer_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='farmerquote',
+            index=models.Index(fields=['farmer', 'created_at', 'id'], name='farmerquote_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='farmerquote',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['created_at', 'id'], name='farmerquote_open_idx'),
+        ),
+    ]
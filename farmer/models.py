@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
 
+from common.geo import location_fields, owner_location
+
 class Farmer(models.Model):
     APPROVAL_STATUS = [
         ('pending', 'Pending'),
@@ -18,6 +20,13 @@ class Farmer(models.Model):
     approval_status = models.CharField(max_length=10, choices=APPROVAL_STATUS, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='farmer_created_idx'),
+            # Admin "pending registrations" queue
+            models.Index(fields=['created_at'], condition=models.Q(approval_status='pending'), name='farmer_pending_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -46,6 +55,8 @@ class FarmerQuote(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')  # Increased max_length
     deadline = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Sealed-bid auction: awarded to the best bid at the deadline (common/auction.py)
+    auction_enabled = models.BooleanField(default=False)
     
     accepted_bid = models.ForeignKey(
         'fpo.FPOBid', 
@@ -58,6 +69,28 @@ class FarmerQuote(models.Model):
     # Add contract fields
     contract_address = models.CharField(max_length=42, blank=True, null=True)  # Ethereum address length
     contract_created_at = models.DateTimeField(null=True, blank=True)
+
+    # Owner's location at quote time, for region filters (common/geo.py)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of "my quotes" and of the (partial) open feed
+            models.Index(fields=['farmer', 'created_at', 'id'], name='farmerquote_owner_created_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(status='open'), name='farmerquote_open_idx'),
+            # Deadline expiry sweep (common/expiry.py)
+            models.Index(fields=['deadline', 'id'], condition=models.Q(status='open'), name='farmerquote_open_deadline_idx'),
+            # Radius queries on the open feed read only nearby cells
+            models.Index(fields=['geo_cell', 'created_at', 'id'], condition=models.Q(status='open'), name='farmerquote_open_cell_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.product_name} quote from {self.farmer.name}"
\ No newline at end of file
+        return f"{self.product_name} quote from {self.farmer.name}"
+
+    def save(self, *args, **kwargs):
+        if self.latitude is None and self.farmer_id:
+            for field, value in location_fields(owner_location(self.farmer)).items():
+                setattr(self, field, value)
+        super().save(*args, **kwargs)
\ No newline at end of file
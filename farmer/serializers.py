@@ -1,26 +1,43 @@
 from rest_framework import serializers
+from users.models import identifier_taken
+from users.password_pool import hash_password
+from django.db.models import Prefetch
 from .models import Farmer, FarmerQuote
+from fpo.models import FPOBid
+from common.serializers import DynamicFieldsMixin
 
-class FarmerSerializer(serializers.ModelSerializer):
+class FarmerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Farmer
         fields = '__all__'
         extra_kwargs = {'password': {'write_only': True}}
 
+    def validate_email(self, value):
+        if identifier_taken(value, 'farmer', getattr(self.instance, 'pk', None)):
+            raise serializers.ValidationError("Farmer with this email already exists.")
+        return value
+
 class FarmerRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Farmer
         fields = ['name', 'email', 'password', 'aadhaar_number', 'wallet_address', 'city', 'state']
-        extra_kwargs = {'password': {'write_only': True}}
+        # Uniqueness is checked against the credential index in validate_email
+        extra_kwargs = {'password': {'write_only': True}, 'email': {'validators': []}}
+
+    def validate_email(self, value):
+        if identifier_taken(value, 'farmer'):
+            raise serializers.ValidationError("Farmer with this email already exists.")
+        return value
 
     def create(self, validated_data):
         password = validated_data.pop('password')
-        farmer = Farmer.objects.create(**validated_data)
-        farmer.set_password(password)
+        farmer = Farmer(**validated_data)
+        # Hash off-thread and insert once, instead of INSERT then UPDATE
+        farmer.password = hash_password(password)
         farmer.save()
         return farmer
 
-class FarmerQuoteSerializer(serializers.ModelSerializer):
+class FarmerQuoteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     farmer_name = serializers.CharField(source='farmer.name', read_only=True)
     farmer_email = serializers.CharField(source='farmer.email', read_only=True)
     bids = serializers.SerializerMethodField()
@@ -31,15 +48,32 @@ class FarmerQuoteSerializer(serializers.ModelSerializer):
             'id', 'farmer', 'product_name', 'category', 'description', 
             'quantity', 'unit', 'price_per_unit', 'status', 'deadline', 
             'created_at', 'accepted_bid', 'farmer_name', 'farmer_email',
-            'bids', 'contract_address'
+            'bids', 'contract_address', 'auction_enabled'
         ]
         read_only_fields = ('farmer', 'status', 'created_at', 'accepted_bid')
 
+    def validate_auction_enabled(self, value):
+        # Switching after bids exist would unseal them or change how the quote is won
+        if self.instance is not None and value != self.instance.auction_enabled:
+            raise serializers.ValidationError("Auctions can only be enabled when the quote is created.")
+        return value
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything the serializer reads: the farmer and the bids with their FPO."""
+        return queryset.select_related('farmer').prefetch_related(
+            Prefetch('bids', queryset=FPOBid.objects.select_related('fpo').order_by('id'))
+        )
+
     def get_bids(self, obj):
         """
         Custom method to get and serialize the bids for this quote.
         This avoids the circular import issue at startup.
+        Reads from the prefetch cache when the queryset went through setup_eager_loading.
         """
+        if obj.auction_enabled and obj.status == 'open' and not self._is_owner(obj):
+            return []  # sealed until the auction is decided
+
         # Use a simple serializer to avoid circular imports
         bids_data = []
         for bid in obj.bids.all():
@@ -53,6 +87,10 @@ class FarmerQuoteSerializer(serializers.ModelSerializer):
             })
         return bids_data
 
+    def _is_owner(self, obj):
+        user = getattr(self.context.get('request'), 'user', None)
+        return getattr(user, 'role', None) == 'farmer' and user.id == obj.farmer_id
+
     def validate_quantity(self, value):
         if value <= 0:
             raise serializers.ValidationError("Quantity must be greater than zero.")
@@ -60,6 +98,8 @@ class FarmerQuoteSerializer(serializers.ModelSerializer):
 
     def validate_deadline(self, value):
         from django.utils import timezone
-        if value <= timezone.now().date():
+        # Bulk uploads put a single "today" in the context
+        today = self.context.get('today') or timezone.now().date()
+        if value <= today:
             raise serializers.ValidationError("Deadline must be in the future.")
         return value
\ No newline at end of file
@@ -1,3 +1,237 @@
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from common.singleflight import SingleFlight
+from common.testing import make_farmer, make_fpo, make_farmer_quote, make_fpo_bid, principal
+from farmer import contract_cache
+from farmer.models import FarmerQuote
+
+
+class FarmerQuoteQueryBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.farmer = make_farmer()
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.farmer, 'farmer'))
+        self.fpos = [make_fpo() for _ in range(3)]
+
+    def add_quotes(self, count):
+        for _ in range(count):
+            quote = make_farmer_quote(self.farmer)
+            for fpo in self.fpos:
+                make_fpo_bid(fpo, quote)
+
+    def test_quote_list_budget_is_independent_of_size(self):
+        for count in (1, 10):
+            self.add_quotes(count)
+            with self.assertNumQueries(2):  # quotes + farmer, bids + fpo
+                response = self.client.get('/api/farmer/quotes/')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results'][0]['bids']), 3)
+
+    def test_quote_detail_budget(self):
+        self.add_quotes(1)
+        quote = self.farmer.quotes.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/farmer/quotes/{quote.id}/')
+        self.assertEqual(response.json()['farmer_name'], self.farmer.name)
+
+    def test_contract_details_budget(self):
+        self.add_quotes(1)
+        quote = self.farmer.quotes.get()
+        quote.accepted_bid = quote.bids.first()
+        quote.contract_address = '0x' + 'a' * 40
+        quote.save()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/farmer/contract/{quote.contract_address}/')
+        self.assertEqual(response.json()['fpo_info']['name'], quote.accepted_bid.fpo.name)
+
+
+
+class ContractDetailsCacheTests(TestCase):
+    address = '0x' + 'b' * 40
+
+    def setUp(self):
+        cache.clear()
+        self.farmer = make_farmer()
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.farmer, 'farmer'))
+        self.quote = make_farmer_quote(self.farmer)
+        self.bid = make_fpo_bid(make_fpo(), self.quote)
+        self.url = f'/api/farmer/contract/{self.address}/'
+
+    def set_contract(self):
+        response = self.client.post(f'/api/farmer/quotes/{self.quote.id}/update-contract/',
+                                    {'contract_address': self.address}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_hit_skips_database_and_conditional_get_returns_304(self):
+        self.set_contract()
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            since = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(since.status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_unknown_address_is_404_and_not_cached(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.set_contract()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_bid_acceptance_and_address_change_invalidate(self):
+        self.set_contract()
+        etag = self.client.get(self.url)['ETag']
+
+        FarmerQuote.objects.filter(pk=self.quote.pk).update(status='open')
+        response = self.client.post(f'/api/farmer/bids/fpo/{self.bid.pk}/accept/')
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['fpo_info']['name'], self.bid.fpo.name)
+
+        self.address, old_url = '0x' + 'c' * 40, self.url
+        self.set_contract()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+
+    def test_profile_edits_invalidate(self):
+        self.set_contract()
+        FarmerQuote.objects.filter(pk=self.quote.pk).update(accepted_bid=self.bid)
+        contract_cache.invalidate_contract_details(self.address)
+        self.client.get(self.url)
+
+        response = self.client.patch(f'/api/farmer/{self.farmer.id}/', {'name': 'Renamed Farmer'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.url).json()['farmer_info']['name'], 'Renamed Farmer')
+
+        fpo_client = APIClient()
+        fpo_client.force_authenticate(principal(self.bid.fpo, 'fpo'))
+        response = fpo_client.patch(f'/api/fpo/{self.bid.fpo_id}/', {'name': 'Renamed FPO'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.url).json()['fpo_info']['name'], 'Renamed FPO')
+
+    def test_generations_live_in_the_cache_backend(self):
+        contract_cache.invalidate_contract_details('0xgone', '0xgone')
+        self.assertEqual(cache.get(contract_cache._generation_key('0xgone')), 2)
+        cache.clear()
+        self.assertEqual(contract_cache._generation('0xgone'), 0)
+
+    def test_concurrent_misses_share_one_build(self):
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def build():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'ok': True}
+
+        def fetch():
+            results.append(contract_cache.get_contract_details_entry('0xshared', build))
+
+        with mock.patch.object(contract_cache, '_flights', flights):
+            leader = threading.Thread(target=fetch)
+            leader.start()
+            started.wait(5)
+            followers = [threading.Thread(target=fetch) for _ in range(4)]
+            for thread in followers:
+                thread.start()
+            time.sleep(0.1)  # let the followers reach the flight
+            release.set()
+            for thread in [leader, *followers]:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({entry['etag'] for entry in results}, {results[0]['etag']})
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.farmer = make_farmer()
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.farmer, 'farmer'))
+        self.quotes = [make_farmer_quote(self.farmer) for _ in range(7)]
+
+    def test_walks_every_row_once_newest_first(self):
+        seen = []
+        url = '/api/farmer/quotes/?page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            seen += [quote['id'] for quote in page['results']]
+            url = page['next']
+        self.assertEqual(seen, sorted((q.id for q in self.quotes), reverse=True))
+
+    def test_previous_link_returns_to_prior_page(self):
+        first = self.client.get('/api/farmer/quotes/?page_size=3').json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_page_size_is_capped_and_bad_cursor_rejected(self):
+        response = self.client.get('/api/farmer/quotes/?page_size=100000')
+        self.assertEqual(len(response.json()['results']), 7)
+        self.assertEqual(self.client.get('/api/farmer/quotes/?cursor=garbage').status_code, 404)
+
+
+class BulkQuoteCreateTests(TestCase):
+    def setUp(self):
+        self.farmer = make_farmer()
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.farmer, 'farmer'))
+        self.deadline = (date.today() + timedelta(days=10)).isoformat()
+
+    def row(self, **kwargs):
+        row = {'product_name': 'Rice', 'category': 'Grains', 'description': 'Basmati',
+               'quantity': '50.00', 'unit': 'kg', 'deadline': self.deadline}
+        row.update(kwargs)
+        return row
+
+    def test_valid_rows_inserted_and_errors_reported_per_row(self):
+        rows = [self.row(), self.row(quantity='0'), self.row(), self.row(deadline='2000-01-01')]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/farmer/quotes/bulk/', rows, format='json')
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "farmer_farmerquote"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['created'], 2)
+        self.assertEqual([error['row'] for error in body['errors']], [1, 3])
+        self.assertIn('quantity', body['errors'][0]['errors'])
+        self.assertEqual(set(self.farmer.quotes.values_list('id', flat=True)), set(body['ids']))
+        self.assertEqual(self.client.get('/api/farmer/dashboard/').json()['active_quotes'], 2)
+
+    def test_csv_upload(self):
+        csv_body = ("product_name,category,description,quantity,unit,price_per_unit,deadline\n"
+                    f"Onion,Vegetables,Red,100,kg,,{self.deadline}\n"
+                    f"Garlic,Vegetables,,20,kg,80.5,{self.deadline}\n")
+        response = self.client.post('/api/farmer/quotes/bulk/', csv_body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertIn('description', response.json()['errors'][0]['errors'])
+        self.assertIsNone(self.farmer.quotes.get().price_per_unit)
 
-# Create your tests here.
+    def test_rejects_empty_oversized_and_all_invalid(self):
+        url = '/api/farmer/quotes/bulk/'
+        self.assertEqual(self.client.post(url, [], format='json').status_code, 400)
+        with mock.patch('common.bulk.BulkQuoteCreateView.max_rows', 2):
+            self.assertEqual(self.client.post(url, [self.row()] * 3, format='json').status_code, 400)
+        response = self.client.post(url, [self.row(unit='')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.farmer.quotes.exists())
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     FarmerRegistrationView, FarmerListView, FarmerDetailView, farmer_login_check,
-    farmer_dashboard, FarmerQuoteListCreateView, FarmerQuoteDetailView, accept_fpo_bid, update_contract_address, get_contract_details
+    farmer_dashboard, FarmerQuoteListCreateView, FarmerQuoteBulkCreateView, FarmerQuoteDetailView, farmer_quote_order_book, accept_fpo_bid, update_contract_address, get_contract_details
 )
 
 urlpatterns = [
@@ -11,7 +11,9 @@ urlpatterns = [
     path('<int:pk>/', FarmerDetailView.as_view(), name='farmer-detail'),
     path('dashboard/', farmer_dashboard, name='farmer-dashboard'),
     path('quotes/', FarmerQuoteListCreateView.as_view(), name='farmer-quote-list'),
+    path('quotes/bulk/', FarmerQuoteBulkCreateView.as_view(), name='farmer-quote-bulk-create'),
     path('quotes/<int:pk>/', FarmerQuoteDetailView.as_view(), name='farmer-quote-detail'),
+    path('quotes/<int:pk>/order-book/', farmer_quote_order_book, name='farmer-quote-order-book'),
     path('bids/fpo/<int:bid_pk>/accept/', accept_fpo_bid, name='farmer-accept-fpo-bid'),
     path('quotes/<int:quote_id>/update-contract/', update_contract_address, name='update-contract-address'),# he don aahet ha ani hecha khalcha
     path('contract/<str:contract_address>/', get_contract_details, name='contract-details'),  # Public contract view
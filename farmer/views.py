@@ -2,11 +2,24 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
+from django.http import HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.db import transaction
 from .models import Farmer, FarmerQuote
 from django.utils import timezone
 from .serializers import FarmerSerializer, FarmerRegistrationSerializer, FarmerQuoteSerializer
+from .contract_cache import get_contract_details_entry, contract_addresses, invalidate_contract_details
+from common.acceptance import accept_bid
+from common.auction import order_book_payload
+from common.bulk import BulkQuoteCreateView
+from common.geo import location_fields, owner_location
+from common.idempotency import IdempotentCreateMixin
 from common.permissions import IsFarmer
+from common.stats import read_stats, stats_key, quotes_created, quote_status_changed
+from users.principal_cache import invalidate_principal
+from users.revocation import revoke_principal
+from users.views import login_status_response
 from fpo.models import FPOBid
 from fpo.serializers import FPOBidSerializer
 
@@ -30,34 +43,7 @@ class FarmerRegistrationView(generics.CreateAPIView):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def farmer_login_check(request):
-    email = request.data.get('email')
-    
-    try:
-        farmer = Farmer.objects.get(email=email)
-        if farmer.approval_status == 'pending':
-            return Response({
-                'message': 'Your account is pending admin approval. Please wait for approval to login.',
-                'approved': False,
-                'status': 'pending'
-            }, status=status.HTTP_200_OK)
-        elif farmer.approval_status == 'rejected':
-            return Response({
-                'message': 'Your account has been rejected by admin. Please contact support.',
-                'approved': False,
-                'status': 'rejected'
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'message': 'Account is approved. You can proceed to login.',
-                'approved': True,
-                'status': 'approved'
-            }, status=status.HTTP_200_OK)
-    except Farmer.DoesNotExist:
-        return Response({
-            'message': 'Farmer not found with this email.',
-            'approved': False,
-            'status': 'not_found'
-        }, status=status.HTTP_404_NOT_FOUND)
+    return login_status_response(request.data.get('email'), 'farmer', 'Farmer not found with this email.')
 
 class FarmerListView(generics.ListAPIView):
     queryset = Farmer.objects.all()
@@ -69,63 +55,104 @@ class FarmerDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = FarmerSerializer
     permission_classes = [IsAuthenticated, IsFarmer]
 
+    def perform_update(self, serializer):
+        farmer = serializer.save()
+        invalidate_principal('farmer', farmer.id)
+        invalidate_contract_details(*contract_addresses(farmer.quotes.all()))
+        if {'city', 'state'} & serializer.validated_data.keys():
+            farmer.quotes.update(**location_fields(owner_location(farmer)))
+        if farmer.approval_status != 'approved':
+            revoke_principal('farmer', farmer.id)
+
+    def perform_destroy(self, instance):
+        farmer_id = instance.id
+        contracts = contract_addresses(instance.quotes.all())
+        instance.delete()
+        invalidate_contract_details(*contracts)
+        invalidate_principal('farmer', farmer_id)
+        revoke_principal('farmer', farmer_id)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsFarmer])
 def farmer_dashboard(request):
     farmer = request.user.user_obj
-    
-    my_quotes = FarmerQuote.objects.filter(farmer=farmer)
-    bids_received = FPOBid.objects.filter(quote__in=my_quotes)
+
+    # Maintained counters: one primary-key read instead of four COUNT(*)s
+    stats, = read_stats(stats_key('farmer', farmer.id))
 
     data = {
-        "my_quotes_count": my_quotes.count(),
-        "bids_received_count": bids_received.count(),
-        "active_quotes": my_quotes.filter(status='open').count(),
-        "awarded_quotes": my_quotes.filter(status='awarded').count(),
+        "my_quotes_count": stats.quotes,
+        "bids_received_count": stats.bids_received,
+        "active_quotes": stats.open_quotes,
+        "awarded_quotes": stats.awarded_quotes,
     }
     return Response(data)
 
-class FarmerQuoteListCreateView(generics.ListCreateAPIView):
+class FarmerQuoteListCreateView(IdempotentCreateMixin, generics.ListCreateAPIView):
     serializer_class = FarmerQuoteSerializer
     permission_classes = [IsAuthenticated, IsFarmer]
 
     def get_queryset(self):
-        return FarmerQuote.objects.filter(farmer=self.request.user.user_obj)
+        queryset = FarmerQuote.objects.filter(farmer=self.request.user.user_obj)
+        return self.get_serializer_class().setup_eager_loading(queryset)
 
     def perform_create(self, serializer):
-        serializer.save(farmer=self.request.user.user_obj)
+        with transaction.atomic():
+            quote = serializer.save(farmer=self.request.user.user_obj)
+            quotes_created('farmer', quote.farmer_id)
+
+class FarmerQuoteBulkCreateView(BulkQuoteCreateView):
+    serializer_class = FarmerQuoteSerializer
+    permission_classes = [IsAuthenticated, IsFarmer]
+    owner_field = 'farmer'
+    owner_role = 'farmer'
 
 class FarmerQuoteDetailView(generics.RetrieveUpdateAPIView):
     serializer_class = FarmerQuoteSerializer
     permission_classes = [IsAuthenticated, IsFarmer]
-    queryset = FarmerQuote.objects.all()
+    queryset = FarmerQuoteSerializer.setup_eager_loading(FarmerQuote.objects.all())
+
+    def perform_update(self, serializer):
+        old_address = serializer.instance.contract_address
+        quote = serializer.save()
+        invalidate_contract_details(old_address, quote.contract_address)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsFarmer])
+def farmer_quote_order_book(request, pk):
+    """Ranked top bids of an auctioned quote, for its owner"""
+    quote = get_object_or_404(FarmerQuote, pk=pk)
+    if quote.farmer_id != request.user.user_obj.id:
+        return Response({"error": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
+    return Response(order_book_payload('farmer', quote))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsFarmer])
 def accept_fpo_bid(request, bid_pk):
-    bid = get_object_or_404(FPOBid, pk=bid_pk)
+    bid = get_object_or_404(FPOBid.objects.select_related('quote'), pk=bid_pk)
     quote = bid.quote
 
-    if quote.farmer != request.user.user_obj:
+    if quote.farmer_id != request.user.user_obj.id:
         return Response({"error": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
     
-    if quote.status != 'open':
+    # Sealed auctions go to the best bid at the deadline, not to a hand-picked one
+    if quote.auction_enabled and quote.status == 'open':
+        return Response({"error": "Auctioned quotes are awarded to the best bid at the deadline."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    # Accept this bid and reject the rest, only if the quote is still open
+    # (contract will be created in frontend)
+    if quote.status != 'open' or not accept_bid(
+        bid, 'accepted', owner_role='farmer', owner_id=quote.farmer_id, bidder_role='fpo', bidder_id=bid.fpo_id
+    ):
         return Response({"error": "Quote is not open for bidding."}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Accept this bid
-    bid.status = 'accepted'
-    bid.save()
-
-    # Update quote status to 'accepted' (contract will be created in frontend)
-    quote.status = 'accepted'
-    quote.accepted_bid = bid
-    quote.save()
+    invalidate_contract_details(quote.contract_address)
     
     return Response({
         "message": "Bid accepted successfully. You can now create the smart contract.",
         "bid_id": bid.pk,
         "quote_id": quote.id,
-        "quote_status": quote.status,
+        "quote_status": 'accepted',
         "next_step": "create_smart_contract"  # Indicate next step
     })
 
@@ -148,10 +175,15 @@ def update_contract_address(request, quote_id):
     if not contract_address.startswith('0x') or len(contract_address) != 42:
         return Response({"error": "Invalid contract address format"}, status=status.HTTP_400_BAD_REQUEST)
     
-    quote.contract_address = contract_address
-    quote.status = 'contract_created'
-    quote.contract_created_at = timezone.now()
-    quote.save()
+    old_address = quote.contract_address
+    with transaction.atomic():
+        old_status = quote.status
+        quote.contract_address = contract_address
+        quote.status = 'contract_created'
+        quote.contract_created_at = timezone.now()
+        quote.save()
+        quote_status_changed('farmer', quote.farmer_id, old_status, quote.status)
+    invalidate_contract_details(old_address, contract_address)
     
     return Response({
         "message": "Contract address updated successfully",
@@ -160,11 +192,11 @@ def update_contract_address(request, quote_id):
     })
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])  # Public access
-def get_contract_details(request, contract_address):
-    """Get contract details for public viewing"""
-    quote = get_object_or_404(FarmerQuote, contract_address=contract_address)
+def build_contract_details(contract_address):
+    quote = get_object_or_404(
+        FarmerQuoteSerializer.setup_eager_loading(FarmerQuote.objects.select_related('accepted_bid__fpo')),
+        contract_address=contract_address
+    )
     
     serializer = FarmerQuoteSerializer(quote)
     
@@ -187,4 +219,24 @@ def get_contract_details(request, contract_address):
             'email': quote.accepted_bid.fpo.email
         }
     
-    return Response(response_data)
\ No newline at end of file
+    return response_data
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])  # Public access
+def get_contract_details(request, contract_address):
+    """Get contract details for public viewing (cached, supports conditional GET)"""
+    entry = get_contract_details_entry(contract_address, lambda: build_contract_details(contract_address))
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        not_modified = if_none_match.strip() == '*' or entry['etag'] in parse_etags(if_none_match)
+    else:
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        not_modified = since is not None and entry['last_modified'] <= since
+
+    response = HttpResponseNotModified() if not_modified else HttpResponse(entry['body'], content_type='application/json')
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    response['Cache-Control'] = 'public, no-cache'
+    return response
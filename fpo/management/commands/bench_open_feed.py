@@ -0,0 +1,79 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from common.bench import scratch_database
+from common.testing import make_farmer, make_fpo
+from farmer.models import FarmerQuote
+from fpo.models import FPOBid
+from fpo.views import open_farmer_quotes_without_bid
+
+BIDS_PER_QUOTE = 5
+OPEN_SHARE = 0.1
+HEAVY_BIDDER_SHARE = 0.3
+
+
+class Command(BaseCommand):
+    help = ("Time the FPO open-quote feed (first page) as bid history grows, "
+            "comparing the old exclude() form with the NOT EXISTS anti-join. Uses a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help="Comma-separated total bid counts to measure at")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        rng = random.Random(options['seed'])
+
+        with scratch_database():
+            farmers = [make_farmer() for _ in range(50)]
+            fpos = [make_fpo() for _ in range(200)]
+            bidder = fpos[0]
+            seeded = 0
+            for size in sizes:
+                self.seed(rng, farmers, fpos, bidder, size - seeded)
+                seeded = size
+                old = self.time(lambda: FarmerQuote.objects.filter(status='open').exclude(bids__fpo=bidder),
+                                options['repeat'])
+                new = self.time(lambda: open_farmer_quotes_without_bid(bidder), options['repeat'])
+                self.stdout.write(f"bids={size:>9,}  exclude(): {old:7.2f}ms  NOT EXISTS: {new:7.2f}ms")
+
+    def seed(self, rng, farmers, fpos, bidder, bid_count):
+        deadline = date.today() + timedelta(days=30)
+        quote_count = bid_count // BIDS_PER_QUOTE
+        with transaction.atomic():
+            quotes = FarmerQuote.objects.bulk_create([
+                FarmerQuote(
+                    farmer=rng.choice(farmers), product_name='Wheat', category='Grains', description='Bench',
+                    quantity=100, unit='kg', deadline=deadline,
+                    status='open' if rng.random() < OPEN_SHARE else 'closed',
+                )
+                for _ in range(quote_count)
+            ], batch_size=5000)
+
+            bids = []
+            for quote in quotes:
+                # The measured FPO is a heavy bidder: its history is what used to hurt
+                bidders = rng.sample(fpos[1:], BIDS_PER_QUOTE - 1)
+                bidders.append(bidder if rng.random() < HEAVY_BIDDER_SHARE else rng.choice(
+                    [fpo for fpo in fpos[1:] if fpo not in bidders]))
+                bids.extend(FPOBid(fpo=fpo, quote=quote, bid_amount=10, delivery_time_days=5) for fpo in bidders)
+                if len(bids) >= 50000:
+                    FPOBid.objects.bulk_create(bids, batch_size=5000)
+                    bids = []
+            FPOBid.objects.bulk_create(bids, batch_size=5000)
+
+    @staticmethod
+    def time(build_queryset, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(build_queryset().order_by('-created_at', '-id')[:51])
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
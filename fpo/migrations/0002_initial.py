@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('fpo', '0001_initial'),
+        ('retailer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fpoquote',
+            name='accepted_bid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='accepted_for_fpo_quote', to='retailer.retailerbid'),
+        ),
+        migrations.AddField(
+            model_name='fpoquote',
+            name='fpo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quotes', to='fpo.fpo'),
+        ),
+    ]
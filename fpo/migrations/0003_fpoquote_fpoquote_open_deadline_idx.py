@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fpo', '0002_initial'),
+        ('retailer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fpoquote',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['deadline', 'id'], name='fpoquote_open_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from common.search import create_search_index, drop_search_index
+
+
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor, apps.get_model('fpo', 'FPOQuote'))
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor, apps.get_model('fpo', 'FPOQuote'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fpo', '0003_fpoquote_fpoquote_open_deadline_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
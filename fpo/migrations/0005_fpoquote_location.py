@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+from common.geo import locate, location_fields
+
+
+def backfill_locations(apps, schema_editor):
+    Quote = apps.get_model('fpo', 'FPOQuote')
+    Owner = apps.get_model('fpo', 'FPO')
+    owners = Owner.objects.filter(quotes__isnull=False).distinct().values_list('id', 'city', 'state')
+    for owner_id, city, state in owners.iterator():
+        Quote.objects.filter(fpo_id=owner_id).update(**location_fields(locate(city, state)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fpo', '0004_fpoquote_search'),
+        ('retailer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fpoquote',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='fpoquote',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='fpoquote',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='fpoquote',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['geo_cell', 'created_at', 'id'], name='fpoquote_open_cell_idx'),
+        ),
+        migrations.RunPython(backfill_locations, migrations.RunPython.noop),
+    ]
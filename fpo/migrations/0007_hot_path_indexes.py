@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_bids(apps, schema_editor):
+    """
+    Databases created before this migration may hold several bids by one
+    fpo on one quote. Keep one per (quote, fpo), the accepted bid if
+    there is one, else the latest, so the unique constraint can be added.
+    """
+    FPOBid = apps.get_model('fpo', 'FPOBid')
+    duplicates = list(FPOBid.objects.values('quote_id', 'fpo_id').annotate(n=Count('id')).filter(n__gt=1))
+    for pair in duplicates:
+        bids = FPOBid.objects.filter(quote_id=pair['quote_id'], fpo_id=pair['fpo_id'])
+        keep = bids.filter(status='accepted').order_by('-id').first() or bids.order_by('-id').first()
+        bids.exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmer', '0007_hot_path_indexes'),
+        ('fpo', '0006_fpoquote_auction_enabled'),
+        ('retailer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fpo',
+            index=models.Index(fields=['created_at', 'id'], name='fpo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fpo',
+            index=models.Index(condition=models.Q(('approval_status', 'pending')), fields=['created_at'], name='fpo_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fpoquote',
+            index=models.Index(fields=['fpo', 'created_at', 'id'], name='fpoquote_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fpoquote',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['created_at', 'id'], name='fpoquote_open_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_bids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='fpobid',
+            constraint=models.UniqueConstraint(fields=('quote', 'fpo'), name='unique_fpo_bid_per_quote'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
 
+from common.geo import location_fields, owner_location
+
 class FPO(models.Model):
     APPROVAL_STATUS = [('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')]
     
@@ -14,6 +16,13 @@ class FPO(models.Model):
     approval_status = models.CharField(max_length=10, choices=APPROVAL_STATUS, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='fpo_created_idx'),
+            # Admin "pending registrations" queue
+            models.Index(fields=['created_at'], condition=models.Q(approval_status='pending'), name='fpo_pending_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -37,6 +46,12 @@ class FPOBid(models.Model):
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default='pending')
     transaction_hash = models.CharField(max_length=66, blank=True, null=True)
 
+    class Meta:
+        constraints = [
+            # One bid per FPO per quote; also the index behind "have I bid on this?"
+            models.UniqueConstraint(fields=['quote', 'fpo'], name='unique_fpo_bid_per_quote'),
+        ]
+
     def __str__(self):
         return f"Bid from {self.fpo.name} for {self.quote.product_name}"
 
@@ -53,6 +68,8 @@ class FPOQuote(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
     deadline = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Sealed-bid auction: awarded to the best bid at the deadline (common/auction.py)
+    auction_enabled = models.BooleanField(default=False)
     
     accepted_bid = models.ForeignKey(
         'retailer.RetailerBid', 
@@ -61,6 +78,28 @@ class FPOQuote(models.Model):
         blank=True,
         related_name='accepted_for_fpo_quote'
     )
+
+    # Owner's location at quote time, for region filters (common/geo.py)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of "my quotes" and of the (partial) open feed
+            models.Index(fields=['fpo', 'created_at', 'id'], name='fpoquote_owner_created_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(status='open'), name='fpoquote_open_idx'),
+            # Deadline expiry sweep (common/expiry.py)
+            models.Index(fields=['deadline', 'id'], condition=models.Q(status='open'), name='fpoquote_open_deadline_idx'),
+            # Radius queries on the open feed read only nearby cells
+            models.Index(fields=['geo_cell', 'created_at', 'id'], condition=models.Q(status='open'), name='fpoquote_open_cell_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.product_name} quote by {self.fpo.name}"
\ No newline at end of file
+        return f"{self.product_name} quote by {self.fpo.name}"
+
+    def save(self, *args, **kwargs):
+        if self.latitude is None and self.fpo_id:
+            for field, value in location_fields(owner_location(self.fpo)).items():
+                setattr(self, field, value)
+        super().save(*args, **kwargs)
\ No newline at end of file
@@ -1,26 +1,43 @@
 from rest_framework import serializers
+from users.models import identifier_taken
+from users.password_pool import hash_password
+from django.db.models import Prefetch
 from .models import FPO, FPOBid, FPOQuote
+from retailer.models import RetailerBid
+from common.serializers import DynamicFieldsMixin
 
-class FPOSerializer(serializers.ModelSerializer):
+class FPOSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = FPO
         fields = '__all__'
         extra_kwargs = {'password': {'write_only': True}}
 
+    def validate_email(self, value):
+        if identifier_taken(value, 'fpo', getattr(self.instance, 'pk', None)):
+            raise serializers.ValidationError("FPO with this email already exists.")
+        return value
+
 class FPORegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = FPO
         fields = ['name', 'email', 'password', 'corporate_identification_number', 'wallet_address', 'city', 'state']
-        extra_kwargs = {'password': {'write_only': True}}
+        # Uniqueness is checked against the credential index in validate_email
+        extra_kwargs = {'password': {'write_only': True}, 'email': {'validators': []}}
+
+    def validate_email(self, value):
+        if identifier_taken(value, 'fpo'):
+            raise serializers.ValidationError("FPO with this email already exists.")
+        return value
 
     def create(self, validated_data):
         password = validated_data.pop('password')
-        fpo = FPO.objects.create(**validated_data)
-        fpo.set_password(password)
+        fpo = FPO(**validated_data)
+        # Hash off-thread and insert once, instead of INSERT then UPDATE
+        fpo.password = hash_password(password)
         fpo.save()
         return fpo
 
-class FPOBidSerializer(serializers.ModelSerializer):
+class FPOBidSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     fpo_name = serializers.CharField(source='fpo.name', read_only=True)
     fpo_email = serializers.CharField(source='fpo.email', read_only=True)
     quote_product_name = serializers.CharField(source='quote.product_name', read_only=True)
@@ -48,7 +65,7 @@ class FPOBidSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Delivery time must be greater than zero.")
         return value
 
-class FPOQuoteSerializer(serializers.ModelSerializer):
+class FPOQuoteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     fpo_name = serializers.CharField(source='fpo.name', read_only=True)
     fpo_email = serializers.CharField(source='fpo.email', read_only=True)
     bids = serializers.SerializerMethodField()
@@ -59,14 +76,31 @@ class FPOQuoteSerializer(serializers.ModelSerializer):
             'id', 'fpo', 'product_name', 'category', 'description', 
             'quantity', 'unit', 'price_per_unit', 'status', 'deadline', 
             'created_at', 'accepted_bid', 'fpo_name', 'fpo_email',
-            'bids'
+            'bids', 'auction_enabled'
         ]
         read_only_fields = ('fpo', 'status', 'created_at', 'accepted_bid')
     
+    def validate_auction_enabled(self, value):
+        # Switching after bids exist would unseal them or change how the quote is won
+        if self.instance is not None and value != self.instance.auction_enabled:
+            raise serializers.ValidationError("Auctions can only be enabled when the quote is created.")
+        return value
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything the serializer reads: the FPO and the bids with their retailer."""
+        return queryset.select_related('fpo').prefetch_related(
+            Prefetch('bids', queryset=RetailerBid.objects.select_related('retailer').order_by('id'))
+        )
+
     def get_bids(self, obj):
         """
         Custom method to get and serialize the bids for this quote.
+        Reads from the prefetch cache when the queryset went through setup_eager_loading.
         """
+        if obj.auction_enabled and obj.status == 'open' and not self._is_owner(obj):
+            return []  # sealed until the auction is decided
+
         bids_data = []
         for bid in obj.bids.all():
             bids_data.append({
@@ -79,6 +113,10 @@ class FPOQuoteSerializer(serializers.ModelSerializer):
             })
         return bids_data
 
+    def _is_owner(self, obj):
+        user = getattr(self.context.get('request'), 'user', None)
+        return getattr(user, 'role', None) == 'fpo' and user.id == obj.fpo_id
+
     def validate_quantity(self, value):
         if value <= 0:
             raise serializers.ValidationError("Quantity must be greater than zero.")
@@ -86,6 +124,8 @@ class FPOQuoteSerializer(serializers.ModelSerializer):
 
     def validate_deadline(self, value):
         from django.utils import timezone
-        if value <= timezone.now().date():
+        # Bulk uploads put a single "today" in the context
+        today = self.context.get('today') or timezone.now().date()
+        if value <= today:
             raise serializers.ValidationError("Deadline must be in the future.")
         return value
\ No newline at end of file
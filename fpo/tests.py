@@ -1,3 +1,61 @@
+from datetime import date, timedelta
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from common.testing import (
+    make_farmer, make_fpo, make_retailer, make_farmer_quote, make_fpo_quote,
+    make_fpo_bid, make_retailer_bid, principal,
+)
+
+
+class FPOQuoteQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.fpo = make_fpo()
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.fpo, 'fpo'))
+
+    def test_open_farmer_quote_feed_budget(self):
+        other_fpos = [make_fpo() for _ in range(3)]
+        for count in (1, 10):
+            for _ in range(count):
+                quote = make_farmer_quote(make_farmer())
+                for fpo in other_fpos:
+                    make_fpo_bid(fpo, quote)
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/fpo/quotes/farmer/open/')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results'][0]['bids']), 3)
+
+    def test_own_quote_list_budget(self):
+        retailers = [make_retailer() for _ in range(3)]
+        for _ in range(5):
+            quote = make_fpo_quote(self.fpo)
+            for retailer in retailers:
+                make_retailer_bid(retailer, quote)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/fpo/quotes/')
+        self.assertEqual(len(response.json()['results']), 5)
+
+    def test_open_feed_skips_quotes_already_bid_on(self):
+        farmer = make_farmer()
+        bid_on, fresh = make_farmer_quote(farmer), make_farmer_quote(farmer)
+        make_farmer_quote(farmer, status='closed')
+        make_fpo_bid(self.fpo, bid_on)
+        make_fpo_bid(make_fpo(), fresh)
+        response = self.client.get('/api/fpo/quotes/farmer/open/')
+        self.assertEqual([quote['id'] for quote in response.json()['results']], [fresh.id])
+
 
-# Create your tests here.
+class FPOBulkQuoteCreateTests(TestCase):
+    def test_fpo_bulk_upload_creates_owned_quotes(self):
+        fpo = make_fpo()
+        client = APIClient()
+        client.force_authenticate(principal(fpo, 'fpo'))
+        deadline = (date.today() + timedelta(days=5)).isoformat()
+        rows = [{'product_name': f'Flour {n}', 'category': 'Processed', 'description': '5kg bags',
+                 'quantity': '10.00', 'unit': 'bags', 'deadline': deadline} for n in range(3)]
+        response = client.post('/api/fpo/quotes/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(fpo.quotes.count(), 3)
+        self.assertEqual(client.get('/api/fpo/dashboard/').json()['my_quotes_count'], 3)
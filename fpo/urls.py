@@ -1,8 +1,8 @@
 from django.urls import path
 from .views import (
     FPORegistrationView, FPOListView, FPODetailView, fpo_login_check,
-    fpo_dashboard, FarmerOpenQuoteListView, FPOBidCreateView, 
-    FPOQuoteListCreateView, accept_retailer_bid
+    fpo_dashboard, FarmerOpenQuoteListView, FarmerQuoteSearchView, FarmerQuoteRecommendationView, FPOBidCreateView, 
+    FPOQuoteListCreateView, FPOQuoteBulkCreateView, fpo_quote_order_book, accept_retailer_bid
 )
 
 urlpatterns = [
@@ -12,7 +12,11 @@ urlpatterns = [
     path('<int:pk>/', FPODetailView.as_view(), name='fpo-detail'),
     path('dashboard/', fpo_dashboard, name='fpo-dashboard'),
     path('quotes/farmer/open/', FarmerOpenQuoteListView.as_view(), name='fpo-farmer-open-quotes'),
+    path('quotes/farmer/search/', FarmerQuoteSearchView.as_view(), name='fpo-farmer-quote-search'),
+    path('quotes/farmer/recommended/', FarmerQuoteRecommendationView.as_view(), name='fpo-farmer-quote-recommendations'),
     path('quotes/farmer/<int:quote_pk>/bids/', FPOBidCreateView.as_view(), name='fpo-create-bid-on-farmer-quote'),
     path('quotes/', FPOQuoteListCreateView.as_view(), name='fpo-quote-list'),
+    path('quotes/bulk/', FPOQuoteBulkCreateView.as_view(), name='fpo-quote-bulk-create'),
+    path('quotes/<int:pk>/order-book/', fpo_quote_order_book, name='fpo-quote-order-book'),
     path('bids/retailer/<int:bid_pk>/accept/', accept_retailer_bid, name='fpo-accept-retailer-bid'),
 ]
\ No newline at end of file
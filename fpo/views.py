@@ -1,11 +1,27 @@
-from rest_framework import generics, status
+from rest_framework import generics, serializers, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
 from .models import FPO, FPOBid, FPOQuote
 from .serializers import FPOSerializer, FPORegistrationSerializer, FPOBidSerializer, FPOQuoteSerializer
+from common.acceptance import accept_bid
+from common.auction import auction_engine, order_book_payload
+from common.bulk import BulkQuoteCreateView
+from common.geo import RegionFilterMixin, location_fields, owner_location
+from common.idempotency import IdempotentCreateMixin
+from common.matching import RecommendationListView
 from common.permissions import IsFPO
+from common.search import QuoteSearchView
+from common.stats import (
+    read_stats, stats_key, market_key, quotes_created, bid_created
+)
+from users.principal_cache import invalidate_principal
+from users.revocation import revoke_principal
+from users.views import login_status_response
+from farmer.contract_cache import contract_addresses, invalidate_contract_details
 from farmer.models import FarmerQuote
 from farmer.serializers import FarmerQuoteSerializer
 from retailer.models import RetailerBid
@@ -30,34 +46,7 @@ class FPORegistrationView(generics.CreateAPIView):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def fpo_login_check(request):
-    email = request.data.get('email')
-    
-    try:
-        fpo = FPO.objects.get(email=email)
-        if fpo.approval_status == 'pending':
-            return Response({
-                'message': 'Your account is pending admin approval. Please wait for approval to login.',
-                'approved': False,
-                'status': 'pending'
-            }, status=status.HTTP_200_OK)
-        elif fpo.approval_status == 'rejected':
-            return Response({
-                'message': 'Your account has been rejected by admin. Please contact support.',
-                'approved': False,
-                'status': 'rejected'
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'message': 'Account is approved. You can proceed to login.',
-                'approved': True,
-                'status': 'approved'
-            }, status=status.HTTP_200_OK)
-    except FPO.DoesNotExist:
-        return Response({
-            'message': 'FPO not found with this email.',
-            'approved': False,
-            'status': 'not_found'
-        }, status=status.HTTP_404_NOT_FOUND)
+    return login_status_response(request.data.get('email'), 'fpo', 'FPO not found with this email.')
 
 class FPOListView(generics.ListAPIView):
     queryset = FPO.objects.all()
@@ -69,34 +58,74 @@ class FPODetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = FPOSerializer
     permission_classes = [IsAuthenticated, IsFPO]
 
+    def perform_update(self, serializer):
+        fpo = serializer.save()
+        invalidate_principal('fpo', fpo.id)
+        # Contract pages show the accepted bid's FPO and every bid on the quote
+        invalidate_contract_details(*contract_addresses(FarmerQuote.objects.filter(bids__fpo=fpo)))
+        if {'city', 'state'} & serializer.validated_data.keys():
+            fpo.quotes.update(**location_fields(owner_location(fpo)))
+        if fpo.approval_status != 'approved':
+            revoke_principal('fpo', fpo.id)
+
+    def perform_destroy(self, instance):
+        fpo_id = instance.id
+        contracts = contract_addresses(FarmerQuote.objects.filter(bids__fpo=instance))
+        instance.delete()
+        invalidate_contract_details(*contracts)
+        invalidate_principal('fpo', fpo_id)
+        revoke_principal('fpo', fpo_id)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsFPO])
 def fpo_dashboard(request):
     fpo = request.user.user_obj
 
-    farmer_quotes = FarmerQuote.objects.filter(status='open')
-    my_bids = FPOBid.objects.filter(fpo=fpo)
-    my_quotes = FPOQuote.objects.filter(fpo=fpo)
-    retailer_bids = RetailerBid.objects.filter(quote__in=my_quotes)
-    
+    # Maintained counters: one primary-key read instead of four COUNT(*)s
+    stats, market = read_stats(stats_key('fpo', fpo.id), market_key('farmer'))
+
     data = {
-        "available_farmer_quotes_count": farmer_quotes.count(),
-        "my_bids_count": my_bids.count(),
-        "my_quotes_count": my_quotes.count(),
-        "retailer_bids_count": retailer_bids.count(),
+        "available_farmer_quotes_count": market.open_quotes,
+        "my_bids_count": stats.bids_placed,
+        "my_quotes_count": stats.quotes,
+        "retailer_bids_count": stats.bids_received,
     }
     return Response(data)
 
-class FarmerOpenQuoteListView(generics.ListAPIView):
+def open_farmer_quotes_without_bid(fpo):
+    """
+    Open farmer quotes this FPO hasn't bid on, as an anti-join: walking the
+    partial open-quote index, each row costs one probe of the unique
+    (quote, fpo) index. Cost tracks the page size, not the bid history.
+    """
+    already_bid = FPOBid.objects.filter(quote=OuterRef('pk'), fpo=fpo)
+    return FarmerQuote.objects.filter(status='open').filter(~Exists(already_bid))
+
+class FarmerOpenQuoteListView(RegionFilterMixin, generics.ListAPIView):
     serializer_class = FarmerQuoteSerializer
     permission_classes = [IsAuthenticated, IsFPO]
+    owner_field = 'farmer'
 
     def get_queryset(self):
         fpo = self.request.user.user_obj
         # Exclude quotes where FPO has already bid
-        return FarmerQuote.objects.filter(status='open').exclude(bids__fpo=fpo)
+        queryset = self.filter_region(open_farmer_quotes_without_bid(fpo))
+        return self.get_serializer_class().setup_eager_loading(queryset)
+
+class FarmerQuoteSearchView(QuoteSearchView):
+    serializer_class = FarmerQuoteSerializer
+    permission_classes = [IsAuthenticated, IsFPO]
+    owner_field = 'farmer'
+
+    def get_base_queryset(self):
+        return FarmerQuote.objects.all()
+
+class FarmerQuoteRecommendationView(RecommendationListView):
+    serializer_class = FarmerQuoteSerializer
+    permission_classes = [IsAuthenticated, IsFPO]
+    side_role = 'fpo'
 
-class FPOBidCreateView(generics.CreateAPIView):
+class FPOBidCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = FPOBidSerializer
     permission_classes = [IsAuthenticated, IsFPO]
 
@@ -105,41 +134,63 @@ class FPOBidCreateView(generics.CreateAPIView):
         if quote.status != 'open':
             raise serializers.ValidationError("This quote is no longer open for bidding.")
         
-        # Additional check to prevent duplicate bids
+        # Duplicate bids are caught by the unique (quote, fpo) constraint: one index probe, no race
         fpo = self.request.user.user_obj
-        if quote.bids.filter(fpo=fpo).exists():
+        try:
+            with transaction.atomic():
+                bid = serializer.save(fpo=fpo, quote=quote)
+                bid_created('fpo', fpo.id, 'farmer', quote.farmer_id)
+        except IntegrityError:
             raise serializers.ValidationError("You have already placed a bid on this quote.")
-            
-        serializer.save(fpo=self.request.user.user_obj, quote=quote)
+        if quote.auction_enabled:
+            auction_engine.bid_placed('farmer', bid, fpo.name)
 
-class FPOQuoteListCreateView(generics.ListCreateAPIView):
+class FPOQuoteListCreateView(IdempotentCreateMixin, generics.ListCreateAPIView):
     serializer_class = FPOQuoteSerializer
     permission_classes = [IsAuthenticated, IsFPO]
 
     def get_queryset(self):
-        return FPOQuote.objects.filter(fpo=self.request.user.user_obj)
+        queryset = FPOQuote.objects.filter(fpo=self.request.user.user_obj)
+        return self.get_serializer_class().setup_eager_loading(queryset)
 
     def perform_create(self, serializer):
-        serializer.save(fpo=self.request.user.user_obj)
+        with transaction.atomic():
+            quote = serializer.save(fpo=self.request.user.user_obj)
+            quotes_created('fpo', quote.fpo_id)
+
+class FPOQuoteBulkCreateView(BulkQuoteCreateView):
+    serializer_class = FPOQuoteSerializer
+    permission_classes = [IsAuthenticated, IsFPO]
+    owner_field = 'fpo'
+    owner_role = 'fpo'
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsFPO])
+def fpo_quote_order_book(request, pk):
+    """Ranked top bids of an auctioned quote, for its owner"""
+    quote = get_object_or_404(FPOQuote, pk=pk)
+    if quote.fpo_id != request.user.user_obj.id:
+        return Response({"error": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
+    return Response(order_book_payload('fpo', quote))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsFPO])
 def accept_retailer_bid(request, bid_pk):
-    bid = get_object_or_404(RetailerBid, pk=bid_pk)
+    bid = get_object_or_404(RetailerBid.objects.select_related('quote'), pk=bid_pk)
     quote = bid.quote
 
-    if quote.fpo != request.user.user_obj:
+    if quote.fpo_id != request.user.user_obj.id:
         return Response({"error": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
     
-    if quote.status != 'open':
+    # Sealed auctions go to the best bid at the deadline, not to a hand-picked one
+    if quote.auction_enabled and quote.status == 'open':
+        return Response({"error": "Auctioned quotes are awarded to the best bid at the deadline."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if quote.status != 'open' or not accept_bid(
+        bid, 'awarded', owner_role='fpo', owner_id=quote.fpo_id, bidder_role='retailer', bidder_id=bid.retailer_id
+    ):
         return Response({"error": "Quote is not open."}, status=status.HTTP_400_BAD_REQUEST)
-
-    bid.status = 'accepted'
-    bid.save()
-    quote.bids.exclude(pk=bid.pk).update(status='rejected')
-    quote.status = 'awarded'
-    quote.accepted_bid = bid
-    quote.save()
     
     return Response({
         "message": "Retailer bid accepted successfully.",
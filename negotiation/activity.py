@@ -0,0 +1,108 @@
+"""
+Writes to a negotiation thread. Every message goes through add_message so
+the inbox columns on Negotiation (latest message, counts, last counter
+terms, read cursors and unread counts) stay in step with the thread.
+accept_negotiation/reject_negotiation close it.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from common.acceptance import accept_bid
+from .models import Negotiation, NegotiationMessage
+from .registry import bid_registry
+from .stream import publish_message
+
+OTHER_SIDE = {'owner': 'bidder', 'bidder': 'owner'}
+
+
+def add_message(negotiation, role, sender, **fields):
+    """Create a message from `sender` (a participant) and update the inbox columns."""
+    side = negotiation.side_of(role, sender.id)
+    with transaction.atomic():
+        message = NegotiationMessage.objects.create(
+            negotiation=negotiation, sender_role=role, sender_id=sender.id, sender_name=sender.name, **fields
+        )
+        # The sender has read the thread up to their own message; the other side has one more unread
+        Negotiation.objects.filter(pk=negotiation.pk).update(message_count=F('message_count') + 1, **({
+            f'{side}_read_id': Greatest(F(f'{side}_read_id'), message.id),
+            f'{side}_unread': 0,
+            f'{OTHER_SIDE[side]}_unread': F(f'{OTHER_SIDE[side]}_unread') + 1,
+        } if side else {}))
+        latest = {'last_message': message, 'last_activity_at': message.created_at}
+        if message.counter_amount is not None:
+            latest.update(last_counter_amount=message.counter_amount,
+                          last_counter_delivery_time_days=message.counter_delivery_time_days)
+        # Concurrent posts: only the newest message becomes the latest
+        Negotiation.objects.filter(Q(last_message__isnull=True) | Q(last_message_id__lt=message.id),
+                                   pk=negotiation.pk).update(**latest)
+        publish_message(message)
+    return message
+
+
+def mark_read(negotiation, side, through_id=None):
+    """
+    Move `side`'s read cursor to `through_id` (default: the latest message)
+    and recount its unread. The cursor never passes the latest message, so
+    an id from the future can't pre-read messages not yet sent.
+    """
+    latest = negotiation.last_message_id or 0
+    through_id = latest if through_id is None else min(through_id, latest)
+    with transaction.atomic():
+        Negotiation.objects.filter(pk=negotiation.pk).update(**{f'{side}_read_id': Greatest(F(f'{side}_read_id'), through_id)})
+        read_id = Negotiation.objects.values_list(f'{side}_read_id', flat=True).get(pk=negotiation.pk)
+        unread = NegotiationMessage.objects.filter(negotiation=negotiation, id__gt=read_id).exclude(
+            sender_role=getattr(negotiation, f'{side}_role'), sender_id=getattr(negotiation, f'{side}_id')
+        ).count()
+        Negotiation.objects.filter(pk=negotiation.pk).update(**{f'{side}_unread': unread})
+    return read_id, unread
+
+
+def latest_counter(negotiation):
+    """The most recent counter-offer in the thread, or None."""
+    return negotiation.messages.filter(counter_amount__isnull=False).order_by('-id').first()
+
+
+def accept_negotiation(negotiation, bid, counter, role, user):
+    """
+    Close `negotiation` as accepted, give `bid` the terms of `counter` (None:
+    the bid as submitted) and award it its quote, all or nothing. Each UPDATE
+    is conditional: the negotiation must still be active with `counter`'s
+    terms as its latest, and the quote still open (accept_bid). Returns
+    False, with nothing written, if either moved underneath.
+    """
+    bid_type = bid_registry.for_model(type(bid))
+    terms = {'bid_amount': counter.counter_amount, 'delivery_time_days': counter.counter_delivery_time_days} if counter else {}
+    with transaction.atomic():
+        closed = Negotiation.objects.filter(
+            pk=negotiation.pk, status='active',
+            last_counter_amount=terms.get('bid_amount'),
+            last_counter_delivery_time_days=terms.get('delivery_time_days'),
+        ).update(status='accepted')
+        if not closed:
+            return False
+        if terms:
+            bid_type.model.objects.filter(pk=bid.pk).update(**terms)
+        if not accept_bid(bid, bid_type.award_status, owner_role=negotiation.owner_role, owner_id=negotiation.owner_id,
+                          bidder_role=negotiation.bidder_role, bidder_id=negotiation.bidder_id):
+            transaction.set_rollback(True)
+            return False
+        # accept_bid rejected the quote's other bids; their negotiations end with them
+        Negotiation.objects.filter(content_type_id=bid_type.content_type_id, quote_id=bid.quote_id,
+                                   status='active').update(status='rejected')
+        negotiation.status = 'accepted'
+        for field, value in terms.items():
+            setattr(bid, field, value)
+        add_message(negotiation, role, user, message=(
+            f"Accepted: {bid.bid_amount} per unit, delivery in {bid.delivery_time_days} days."))
+    return True
+
+
+def reject_negotiation(negotiation, role, user):
+    """Close `negotiation` as rejected; the bid keeps its terms. False if it was already closed."""
+    with transaction.atomic():
+        if not Negotiation.objects.filter(pk=negotiation.pk, status='active').update(status='rejected'):
+            return False
+        negotiation.status = 'rejected'
+        add_message(negotiation, role, user, message="Negotiation rejected.")
+    return True
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class NegotiationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'negotiation'
+
+    def ready(self):
+        from negotiation.registry import bid_registry
+        bid_registry.build()
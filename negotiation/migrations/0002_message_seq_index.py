@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('negotiation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='negotiationmessage',
+            index=models.Index(fields=['negotiation', 'id'], name='negotiation_message_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations, models
+
+# bid model -> (bidder role, quote owner role)
+BID_PARTIES = {
+    ('fpo', 'fpobid'): ('fpo', 'farmer'),
+    ('retailer', 'retailerbid'): ('retailer', 'fpo'),
+}
+
+
+def backfill_participants(apps, schema_editor):
+    Negotiation = apps.get_model('negotiation', 'Negotiation')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    for (app_label, model_name), (bidder_role, owner_role) in BID_PARTIES.items():
+        content_type = ContentType.objects.filter(app_label=app_label, model=model_name).first()
+        if content_type is None:
+            continue
+        bid_model = apps.get_model(app_label, model_name)
+        negotiations = list(Negotiation.objects.filter(content_type=content_type))
+        bids = bid_model.objects.filter(pk__in=[n.object_id for n in negotiations]).values(
+            'id', 'quote_id', f'{bidder_role}_id', f'quote__{owner_role}_id')
+        by_id = {bid['id']: bid for bid in bids}
+        for negotiation in negotiations:
+            bid = by_id.get(negotiation.object_id)
+            if bid is None:
+                continue  # bid deleted; nobody can reach this negotiation
+            negotiation.quote_id = bid['quote_id']
+            negotiation.owner_role, negotiation.owner_id = owner_role, bid[f'quote__{owner_role}_id']
+            negotiation.bidder_role, negotiation.bidder_id = bidder_role, bid[f'{bidder_role}_id']
+        Negotiation.objects.bulk_update(
+            negotiations, ['quote_id', 'owner_role', 'owner_id', 'bidder_role', 'bidder_id'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('fpo', '0006_fpoquote_auction_enabled'),
+        ('retailer', '0001_initial'),
+        ('farmer', '0006_farmerquote_auction_enabled'),
+        ('negotiation', '0002_message_seq_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='negotiation',
+            name='quote_id',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='owner_role',
+            field=models.CharField(default='', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='owner_id',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='bidder_role',
+            field=models.CharField(default='', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='bidder_id',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_participants, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='negotiation',
+            index=models.Index(fields=['owner_role', 'owner_id', 'id'], name='negotiation_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='negotiation',
+            index=models.Index(fields=['bidder_role', 'bidder_id', 'id'], name='negotiation_bidder_idx'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_inbox(apps, schema_editor):
+    """Latest message, counts and unread totals (nothing has been read yet) from the existing threads."""
+    Negotiation = apps.get_model('negotiation', 'Negotiation')
+    NegotiationMessage = apps.get_model('negotiation', 'NegotiationMessage')
+
+    negotiations = list(Negotiation.objects.all())
+    for negotiation in negotiations:
+        messages = list(NegotiationMessage.objects.filter(negotiation=negotiation).order_by('id'))
+        counters = [message for message in messages if message.counter_amount is not None]
+        negotiation.message_count = len(messages)
+        negotiation.last_message = messages[-1] if messages else None
+        negotiation.last_activity_at = messages[-1].created_at if messages else negotiation.created_at
+        if counters:
+            negotiation.last_counter_amount = counters[-1].counter_amount
+            negotiation.last_counter_delivery_time_days = counters[-1].counter_delivery_time_days
+        negotiation.owner_unread = sum(
+            (m.sender_role, m.sender_id) != (negotiation.owner_role, negotiation.owner_id) for m in messages)
+        negotiation.bidder_unread = sum(
+            (m.sender_role, m.sender_id) != (negotiation.bidder_role, negotiation.bidder_id) for m in messages)
+    Negotiation.objects.bulk_update(negotiations, [
+        'message_count', 'last_message', 'last_activity_at', 'last_counter_amount',
+        'last_counter_delivery_time_days', 'owner_unread', 'bidder_unread',
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('negotiation', '0003_negotiation_participants'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='negotiation',
+            name='negotiation_owner_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='negotiation',
+            name='negotiation_bidder_idx',
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='bidder_read_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='bidder_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='last_counter_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='last_counter_delivery_time_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='negotiation.negotiationmessage'),
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='owner_read_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='negotiation',
+            name='owner_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='negotiation',
+            index=models.Index(fields=['owner_role', 'owner_id', 'last_activity_at', 'id'], name='negotiation_owner_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='negotiation',
+            index=models.Index(fields=['bidder_role', 'bidder_id', 'last_activity_at', 'id'], name='negotiation_bidder_inbox_idx'),
+        ),
+    ]
@@ -1,7 +1,17 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
+from .registry import bid_registry
+
+
+class NegotiationQuerySet(models.QuerySet):
+    def for_principal(self, role, user_id):
+        """Negotiations the principal takes part in, as quote owner or bidder."""
+        return self.filter(models.Q(owner_role=role, owner_id=user_id) | models.Q(bidder_role=role, bidder_id=user_id))
+
+
 class Negotiation(models.Model):
     STATUS_CHOICES = [('active', 'Active'), ('accepted', 'Accepted'), ('rejected', 'Rejected')]
     
@@ -12,6 +22,59 @@ class Negotiation(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Copied from the bid at creation so permission checks and "my
+    # negotiations" are one indexed predicate, without resolving `bid`
+    quote_id = models.PositiveIntegerField()
+    owner_role = models.CharField(max_length=20)
+    owner_id = models.PositiveIntegerField()
+    bidder_role = models.CharField(max_length=20)
+    bidder_id = models.PositiveIntegerField()
+
+    # Inbox columns, maintained with each message by negotiation.activity.add_message
+    last_message = models.ForeignKey('NegotiationMessage', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    message_count = models.PositiveIntegerField(default=0)
+    last_counter_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    last_counter_delivery_time_days = models.PositiveIntegerField(null=True, blank=True)
+    # Read cursor (last message id seen) and unread count per participant
+    owner_read_id = models.PositiveIntegerField(default=0)
+    owner_unread = models.PositiveIntegerField(default=0)
+    bidder_read_id = models.PositiveIntegerField(default=0)
+    bidder_unread = models.PositiveIntegerField(default=0)
+
+    objects = NegotiationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Inbox: one side's negotiations by last activity
+            models.Index(fields=['owner_role', 'owner_id', 'last_activity_at', 'id'], name='negotiation_owner_inbox_idx'),
+            models.Index(fields=['bidder_role', 'bidder_id', 'last_activity_at', 'id'], name='negotiation_bidder_inbox_idx'),
+        ]
+
+    @staticmethod
+    def participants_for(bid):
+        """quote_id and owner/bidder (role, id) of an FPOBid or RetailerBid."""
+        bid_type = bid_registry.for_model(type(bid))
+        bidder_role, owner_role = bid_type.bidder_role, bid_type.owner_role
+        return {
+            'quote_id': bid.quote_id,
+            'owner_role': owner_role,
+            'owner_id': getattr(bid.quote, f'{owner_role}_id'),
+            'bidder_role': bidder_role,
+            'bidder_id': getattr(bid, f'{bidder_role}_id'),
+        }
+
+    def is_participant(self, role, user_id):
+        return self.side_of(role, user_id) is not None
+
+    def side_of(self, role, user_id):
+        """'owner', 'bidder', or None for outsiders."""
+        if (role, user_id) == (self.owner_role, self.owner_id):
+            return 'owner'
+        if (role, user_id) == (self.bidder_role, self.bidder_id):
+            return 'bidder'
+        return None
+
 class NegotiationMessage(models.Model):
     negotiation = models.ForeignKey(Negotiation, related_name='messages', on_delete=models.CASCADE)
     
@@ -23,4 +86,10 @@ class NegotiationMessage(models.Model):
     message = models.TextField()
     counter_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     counter_delivery_time_days = models.PositiveIntegerField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Thread reads: history pages and "messages after id N" deltas
+            models.Index(fields=['negotiation', 'id'], name='negotiation_message_seq_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+The bid models a negotiation can be attached to, keyed by their
+"app_label.model" label. Built once in NegotiationConfig.ready() from the
+app registry, so resolving a label, rejecting an unknown one, or naming the
+bid type of a negotiation needs no query. Content type ids come from
+Django's ContentType cache: one query per model per process, then free
+(and cleared by Django when the contenttypes table is rebuilt).
+"""
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+
+# label -> (bidder role, quote owner role, quote status once a bid is accepted)
+BID_TYPES = {
+    'fpo.fpobid': ('fpo', 'farmer', 'accepted'),
+    'retailer.retailerbid': ('retailer', 'fpo', 'awarded'),
+}
+
+
+class BidType:
+    __slots__ = ('label', 'model', 'bidder_role', 'owner_role', 'award_status')
+
+    def __init__(self, label, model, bidder_role, owner_role, award_status):
+        self.label, self.model = label, model
+        self.bidder_role, self.owner_role = bidder_role, owner_role
+        self.award_status = award_status
+
+    @property
+    def name(self):
+        return self.model._meta.model_name
+
+    @property
+    def content_type_id(self):
+        return ContentType.objects.get_for_model(self.model).id
+
+
+class BidRegistry:
+    def __init__(self):
+        self._by_label = {}
+        self._by_model = {}
+
+    def build(self):
+        for label, parties in BID_TYPES.items():
+            bid_type = BidType(label, apps.get_model(label), *parties)
+            self._by_label[label] = bid_type
+            self._by_model[bid_type.model] = bid_type
+
+    def get(self, label):
+        """The BidType for "app_label.model", or None if it isn't a bid model."""
+        return self._by_label.get(label) if isinstance(label, str) else None
+
+    def for_model(self, model):
+        return self._by_model[model]
+
+    def for_content_type_id(self, content_type_id):
+        for bid_type in self._by_label.values():
+            if bid_type.content_type_id == content_type_id:
+                return bid_type
+        return None
+
+
+bid_registry = BidRegistry()
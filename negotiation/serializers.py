@@ -1,24 +1,56 @@
 from rest_framework import serializers
 from .models import Negotiation, NegotiationMessage
+from common.serializers import DynamicFieldsMixin
+from .registry import bid_registry
 
-class NegotiationMessageSerializer(serializers.ModelSerializer):
+class NegotiationMessageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = NegotiationMessage
         fields = '__all__'
 
 # --- THIS IS THE CORRECTED SERIALIZER ---
-class NegotiationSerializer(serializers.ModelSerializer):
-    messages = NegotiationMessageSerializer(many=True, read_only=True)
+class NegotiationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Negotiation state only; the thread is read incrementally from
+    /messages/ (or inlined with ?expand=messages).
+    """
     # Explicitly define fields to represent the GenericForeignKey
     bid_id = serializers.IntegerField(source='object_id', read_only=True)
-    bid_type = serializers.CharField(source='content_type.model', read_only=True)
+    bid_type = serializers.SerializerMethodField()
 
     class Meta:
         model = Negotiation
         # Replace the problematic 'bid' field with our explicit ones
-        fields = ('id', 'bid_id', 'bid_type', 'status', 'created_at', 'messages')
+        fields = ('id', 'bid_id', 'bid_type', 'status', 'created_at')
+        expandable_fields = {'messages': (NegotiationMessageSerializer, {'many': True, 'read_only': True})}
+
+    def get_bid_type(self, obj):
+        return bid_registry.for_content_type_id(obj.content_type_id).name
 # --- END OF CORRECTION ---
 
+class InboxSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Inbox row; unread_count is the requesting participant's."""
+    bid_id = serializers.IntegerField(source='object_id', read_only=True)
+    last_message = NegotiationMessageSerializer(read_only=True)
+    unread_count = serializers.SerializerMethodField()
+    counterpart_role = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Negotiation
+        fields = ('id', 'bid_id', 'quote_id', 'status', 'created_at', 'last_activity_at', 'message_count',
+                  'last_counter_amount', 'last_counter_delivery_time_days', 'last_message', 'unread_count',
+                  'counterpart_role')
+
+    def _side(self, obj):
+        user = self.context['request'].user
+        return obj.side_of(user.role, user.id)
+
+    def get_unread_count(self, obj):
+        return getattr(obj, f'{self._side(obj)}_unread')
+
+    def get_counterpart_role(self, obj):
+        return obj.bidder_role if self._side(obj) == 'owner' else obj.owner_role
+
 class CounterOfferSerializer(serializers.Serializer):
     message = serializers.CharField(required=False, allow_blank=True)
     counter_amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=True)
@@ -0,0 +1,163 @@
+"""
+Server-Sent Events push of new negotiation messages.
+
+Writers call publish_message(), which fans the message out after commit to
+every stream subscribed to that negotiation in this process. Each stream
+also re-reads the table (id > last sent) whenever it has been idle for
+KEEPALIVE seconds, which picks up messages written by other workers and
+anything dropped from a full queue, so one process per host needs no
+external broker. Clients reconnect with Last-Event-ID and get what they
+missed from the database first.
+
+Streams need ASGI: each one is an async generator (one coroutine per
+connection). Under WSGI a stream would hold a sync worker for MAX_SECONDS,
+so WSGI requests get a 204, which tells EventSource not to reconnect, and a
+Link to the messages delta endpoint to poll instead.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from rest_framework.renderers import BaseRenderer
+
+from common import metrics
+from .models import NegotiationMessage
+from .serializers import NegotiationMessageSerializer
+
+
+class _AsyncSubscriber:
+    def __init__(self, size):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=size)
+
+    def deliver(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            metrics.incr('negotiation_stream.dropped')  # recovered by the idle re-read
+
+
+class NegotiationBroker:
+    """In-process fan-out: negotiation id -> subscribed streams."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, negotiation_id, subscriber):
+        with self._lock:
+            self._subscribers[negotiation_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, negotiation_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(negotiation_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[negotiation_id]
+
+    def subscriber_count(self, negotiation_id):
+        with self._lock:
+            return len(self._subscribers.get(negotiation_id, ()))
+
+    def publish(self, negotiation_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(negotiation_id, ()))
+        for subscriber in subscribers:
+            subscriber.deliver(event)
+        metrics.incr('negotiation_stream.published')
+
+
+broker = NegotiationBroker()
+
+
+def message_event(message):
+    return {'id': message.id, 'event': 'message', 'data': NegotiationMessageSerializer(message).data}
+
+
+def publish_message(message):
+    """Push a just-created message to live streams once the transaction commits."""
+    event = message_event(message)
+    transaction.on_commit(lambda: broker.publish(message.negotiation_id, event))
+
+
+def messages_after(negotiation_id, after_id):
+    return [message_event(message) for message in
+            NegotiationMessage.objects.filter(negotiation_id=negotiation_id, id__gt=after_id).order_by('id')]
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+class _Cursor:
+    """Last event id sent on one stream, so queue and re-read never repeat a message."""
+
+    def __init__(self, after_id):
+        self.after_id = after_id
+
+    def fresh(self, events):
+        for event in events:
+            if event['id'] > self.after_id:
+                self.after_id = event['id']
+                yield format_event(event)
+
+
+async def async_event_stream(negotiation_id, after_id):
+    config = settings.NEGOTIATION_STREAM
+    cursor, deadline = _Cursor(after_id), time.monotonic() + config['MAX_SECONDS']
+    subscriber = broker.subscribe(negotiation_id, _AsyncSubscriber(config['QUEUE_SIZE']))
+    try:
+        yield f"retry: {config['RETRY_MS']}\n\n"
+        for chunk in cursor.fresh(await sync_to_async(messages_after)(negotiation_id, cursor.after_id)):
+            yield chunk
+        while time.monotonic() < deadline:
+            try:
+                events = [await asyncio.wait_for(subscriber.queue.get(), config['KEEPALIVE'])]
+            except asyncio.TimeoutError:
+                events = await sync_to_async(messages_after)(negotiation_id, cursor.after_id)
+                if not events:
+                    yield ": keepalive\n\n"
+            for chunk in cursor.fresh(events):
+                yield chunk
+    finally:
+        broker.unsubscribe(negotiation_id, subscriber)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF accept `Accept: text/event-stream`; only error bodies go through it."""
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+def stream_response(request, negotiation_id):
+    """text/event-stream of the negotiation's messages after Last-Event-ID (or ?after=)."""
+    try:
+        after_id = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or 0)
+    except ValueError:
+        after_id = 0
+    if not isinstance(getattr(request, '_request', request), ASGIRequest):
+        metrics.incr('negotiation_stream.refused')
+        response = HttpResponse(status=204)
+        response['Link'] = f'<{reverse("negotiation-messages", args=[negotiation_id])}?after={after_id}>; rel="alternate"'
+        return response
+    response = StreamingHttpResponse(async_event_stream(negotiation_id, after_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+    metrics.incr('negotiation_stream.opened')
+    return response
@@ -1,3 +1,397 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from common.testing import (
+    access_token, make_farmer, make_farmer_quote, make_fpo, make_fpo_bid, make_fpo_quote, make_retailer, make_retailer_bid, principal
+)
+from farmer.models import FarmerQuote
+from fpo.models import FPOBid
+from retailer.models import RetailerBid
+from .activity import add_message
+from .models import Negotiation, NegotiationMessage
+from .registry import bid_registry
+from .views import AcceptNegotiationView
+from .stream import async_event_stream, broker
+
+
+def client_for(user, role):
+    client = APIClient()
+    client.force_authenticate(principal(user, role))
+    return client
+
+
+def sse_events(chunks):
+    """Parsed `event: message` payloads from raw SSE chunks."""
+    events = []
+    for chunk in chunks:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines() if not line.startswith(':'))
+        if fields.get('event') == 'message':
+            events.append((int(fields['id']), json.loads(fields['data'])))
+    return events
+
+
+class NegotiationTestCase(TestCase):
+    def setUp(self):
+        self.farmer, self.fpo = make_farmer(), make_fpo()
+        self.bid = make_fpo_bid(self.fpo, make_farmer_quote(self.farmer))
+        self.farmer_client = client_for(self.farmer, 'farmer')
+        self.fpo_client = client_for(self.fpo, 'fpo')
+        response = self.farmer_client.post('/api/negotiation/start/',
+                                           {'content_type': 'fpo.fpobid', 'object_id': self.bid.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.negotiation_id = response.json()['id']
+
+    def counter(self, client, amount, days=5):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/api/negotiation/{self.negotiation_id}/',
+                                   {'message': 'How about this?', 'counter_amount': amount,
+                                    'counter_delivery_time_days': days}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response
+
+
+@override_settings(NEGOTIATION_STREAM={**settings.NEGOTIATION_STREAM, 'KEEPALIVE': 0.05, 'MAX_SECONDS': 5})
+class NegotiationStreamTests(NegotiationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/negotiation/{self.negotiation_id}/stream/'
+        self.tokens = {'farmer': access_token(self.farmer, 'farmer'), 'fpo': access_token(self.fpo, 'fpo')}
+
+    def stream(self, role, **headers):
+        """Open the stream through the ASGI handler."""
+        return self.async_client.get(self.url, headers={
+            'Accept': 'text/event-stream', 'Authorization': f'Bearer {self.tokens[role]}', **headers})
+
+    async def test_stream_replays_backlog_then_pushes_new_messages(self):
+        response = await self.stream('farmer')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry: '))
+        [(first_id, started)] = sse_events([await anext(chunks)])
+        self.assertIn('Negotiation started', started['message'])
+
+        await sync_to_async(self.counter)(self.fpo_client, '18.50')
+        [(message_id, pushed)] = sse_events([await anext(chunks)])
+        self.assertGreater(message_id, first_id)
+        self.assertEqual(pushed['counter_amount'], '18.50')
+        await chunks.aclose()
+
+    async def test_reconnect_resumes_after_last_event_id(self):
+        await sync_to_async(self.counter)(self.fpo_client, '18.50')
+        await sync_to_async(self.counter)(self.farmer_client, '19.00')
+        started = await NegotiationMessage.objects.filter(negotiation_id=self.negotiation_id).aearliest('id')
+        response = await self.stream('fpo', **{'Last-Event-ID': str(started.id)})
+        chunks = aiter(response.streaming_content)
+        events = sse_events([await anext(chunks), await anext(chunks), await anext(chunks)])
+        self.assertEqual([data['counter_amount'] for _, data in events], ['18.50', '19.00'])
+        await chunks.aclose()
+
+    def test_wsgi_request_is_told_to_poll(self):
+        response = self.farmer_client.get(self.url, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID='7')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['Link'], f'</api/negotiation/{self.negotiation_id}/messages/?after=7>; rel="alternate"')
+
+    def test_outsider_is_refused(self):
+        response = client_for(make_fpo(), 'fpo').get(f'/api/negotiation/{self.negotiation_id}/stream/',
+                                                     HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 403)
+
+    def test_async_stream_receives_published_events(self):
+        async def first_pushed_event():
+            stream = async_event_stream(self.negotiation_id, after_id=10 ** 9)
+            try:
+                await anext(stream)  # retry hint; subscribed from here on
+                broker.publish(self.negotiation_id, {'id': 10 ** 9 + 1, 'event': 'message', 'data': {'x': 1}})
+                return await anext(stream)
+            finally:
+                await stream.aclose()
+
+        self.assertEqual(sse_events([async_to_sync(first_pushed_event)()]), [(10 ** 9 + 1, {'x': 1})])
+        self.assertEqual(broker.subscriber_count(self.negotiation_id), 0)
+
+
+class NegotiationMessageSyncTests(NegotiationTestCase):
+    def messages_url(self, query=''):
+        return f'/api/negotiation/{self.negotiation_id}/messages/{query}'
+
+    def test_post_returns_new_message_and_state(self):
+        body = self.counter(self.fpo_client, '18.50').json()
+        self.assertEqual(set(body), {'message', 'negotiation'})
+        self.assertEqual(body['message']['counter_amount'], '18.50')
+        self.assertEqual(body['negotiation']['status'], 'active')
+        self.assertNotIn('messages', body['negotiation'])
+
+    def test_delta_returns_only_newer_messages(self):
+        last_seen = self.counter(self.fpo_client, '18.50').json()['message']['id']
+        self.counter(self.farmer_client, '19.00')
+        self.counter(self.fpo_client, '18.75')
+
+        response = self.farmer_client.get(self.messages_url(f'?after={last_seen}'))
+        self.assertEqual([row['counter_amount'] for row in response.json()['results']], ['19.00', '18.75'])
+        newest = response.json()['results'][-1]['id']
+        self.assertEqual(self.farmer_client.get(self.messages_url(f'?after={newest}')).json()['results'], [])
+        self.assertEqual(self.farmer_client.get(self.messages_url('?after=x')).status_code, 400)
+
+    def test_history_pages_newest_first(self):
+        for amount in range(10, 15):
+            self.counter(self.fpo_client, str(amount))
+        page = self.farmer_client.get(self.messages_url('?page_size=4')).json()
+        self.assertEqual([row['counter_amount'] for row in page['results']], ['14.00', '13.00', '12.00', '11.00'])
+        older = self.farmer_client.get(page['next']).json()
+        self.assertEqual(len(older['results']), 2)  # 10.00 and the opening message
+        self.assertIsNone(older['next'])
+
+        thread = self.farmer_client.get(f'/api/negotiation/{self.negotiation_id}/?expand=messages').json()
+        self.assertEqual(len(thread['messages']), 6)
+        self.assertNotIn('messages', self.farmer_client.get(f'/api/negotiation/{self.negotiation_id}/').json())
+
+    def test_outsider_cannot_read_messages(self):
+        response = client_for(make_fpo(), 'fpo').get(self.messages_url())
+        self.assertEqual(response.status_code, 403)
+
+
+class NegotiationParticipantTests(NegotiationTestCase):
+    def test_participants_are_stored_at_creation(self):
+        negotiation = Negotiation.objects.get(pk=self.negotiation_id)
+        self.assertEqual(
+            (negotiation.quote_id, negotiation.owner_role, negotiation.owner_id, negotiation.bidder_role, negotiation.bidder_id),
+            (self.bid.quote_id, 'farmer', self.farmer.id, 'fpo', self.fpo.id))
+        self.assertEqual(list(Negotiation.objects.for_principal('fpo', self.fpo.id)), [negotiation])
+        self.assertEqual(list(Negotiation.objects.for_principal('farmer', self.fpo.id + 1000)), [])
+
+    def test_permission_check_needs_no_bid_lookup(self):
+        with self.assertNumQueries(1):
+            response = self.fpo_client.get(f'/api/negotiation/{self.negotiation_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bid_type'], 'fpobid')
+
+        # Same id, different role: not a participant
+        impostor = make_retailer()
+        impostor.id = self.fpo.id
+        self.assertEqual(client_for(impostor, 'retailer').get(f'/api/negotiation/{self.negotiation_id}/').status_code, 403)
+
+
+class BidRegistryTests(NegotiationTestCase):
+    def content_type_queries(self, queries):
+        return [q['sql'] for q in queries if 'django_content_type' in q['sql']]
+
+    def test_start_and_serialize_without_content_type_queries(self):
+        bid = make_fpo_bid(self.fpo, make_farmer_quote(self.farmer))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.farmer_client.post('/api/negotiation/start/',
+                                               {'content_type': 'fpo.fpobid', 'object_id': bid.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['bid_type'], 'fpobid')
+        self.assertEqual(self.content_type_queries(queries), [])
+        self.assertEqual(Negotiation.objects.get(pk=response.json()['id']).bid, bid)
+
+    def test_other_types_are_rejected_without_queries(self):
+        for label in ('users.credential', 'fpo.fpoquote', 'fpobid', None, ['fpo.fpobid']):
+            with self.assertNumQueries(0):
+                response = self.farmer_client.post('/api/negotiation/start/',
+                                                   {'content_type': label, 'object_id': self.bid.id}, format='json')
+            self.assertEqual(response.status_code, 400)
+
+
+class InboxTests(NegotiationTestCase):
+    def inbox(self, client):
+        response = client.get('/api/negotiation/inbox/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_inbox_rows_track_latest_message_and_unread(self):
+        other_bid = make_fpo_bid(self.fpo, make_farmer_quote(make_farmer()))
+        other_owner = Negotiation.objects.create(content_type=Negotiation.objects.get().content_type,
+                                                 object_id=other_bid.id, **Negotiation.participants_for(other_bid))
+        self.counter(self.fpo_client, '18.50', days=4)
+        self.counter(self.fpo_client, '18.25', days=4)
+
+        # The second negotiation is another farmer's
+        with self.assertNumQueries(1):
+            rows = self.inbox(self.farmer_client)
+        [row] = rows
+        self.assertEqual((row['id'], row['message_count'], row['unread_count']), (self.negotiation_id, 3, 2))
+        self.assertEqual((row['last_counter_amount'], row['last_counter_delivery_time_days']), ('18.25', 4))
+        self.assertEqual(row['last_message']['counter_amount'], '18.25')
+        self.assertEqual(row['counterpart_role'], 'fpo')
+
+        # The FPO bids in both: newest activity first
+        fpo_rows = self.inbox(self.fpo_client)
+        self.assertEqual([r['id'] for r in fpo_rows], [self.negotiation_id, other_owner.id])
+        self.assertEqual(fpo_rows[0]['unread_count'], 0)  # replying read the opening message
+
+    def test_mark_read(self):
+        first = self.counter(self.fpo_client, '18.50').json()['message']['id']
+        self.counter(self.fpo_client, '18.25')
+
+        url = f'/api/negotiation/{self.negotiation_id}/read/'
+        self.assertEqual(self.farmer_client.post(url, {'message_id': first}, format='json').json(),
+                         {'read_id': first, 'unread_count': 1})
+        self.assertEqual(self.farmer_client.post(url, {}, format='json').json()['unread_count'], 0)
+        self.assertEqual(self.inbox(self.farmer_client)[0]['unread_count'], 0)
+
+        # Replying marks the thread read for the sender, unread count included
+        self.counter(self.farmer_client, '19.00')
+        self.assertEqual(self.inbox(self.fpo_client)[0]['unread_count'], 1)
+        self.counter(self.fpo_client, '18.75')
+        self.assertEqual(self.inbox(self.fpo_client)[0]['unread_count'], 0)
+        self.counter(self.farmer_client, '19.00')
+        self.assertEqual(self.inbox(self.farmer_client)[0]['unread_count'], 0)
+        self.assertEqual(self.inbox(self.fpo_client)[0]['unread_count'], 1)
+        self.assertEqual(client_for(make_fpo(), 'fpo').post(url, {}, format='json').status_code, 403)
+
+    def test_mark_read_stops_at_the_latest_message(self):
+        url = f'/api/negotiation/{self.negotiation_id}/read/'
+        latest = Negotiation.objects.get(pk=self.negotiation_id).last_message_id
+        response = self.fpo_client.post(url, {'message_id': latest + 1000}, format='json')
+        self.assertEqual(response.json(), {'read_id': latest, 'unread_count': 0})
+        # Messages sent afterwards still count as unread
+        self.counter(self.farmer_client, '19.00')
+        self.assertEqual(self.inbox(self.fpo_client)[0]['unread_count'], 1)
+
+
+class AcceptRejectTests(NegotiationTestCase):
+    def url(self, action, negotiation_id=None):
+        return f'/api/negotiation/{negotiation_id or self.negotiation_id}/{action}/'
+
+    def test_accepting_a_counter_applies_its_terms_to_the_bid(self):
+        rival = make_fpo_bid(make_fpo(), self.bid.quote)
+        rival_negotiation = Negotiation.objects.create(content_type_id=bid_registry.get('fpo.fpobid').content_type_id,
+                                                       object_id=rival.id, **Negotiation.participants_for(rival))
+        self.counter(self.farmer_client, '19.00', days=3)
+        self.counter(self.fpo_client, '18.50', days=4)
+
+        self.assertEqual(self.fpo_client.post(self.url('accept')).status_code, 400)  # its own offer
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.farmer_client.post(self.url('accept'))
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['bid_amount'], body['delivery_time_days'], body['quote_status']), ('18.50', 4, 'accepted'))
+        self.assertEqual(body['negotiation']['status'], 'accepted')
+
+        self.bid.refresh_from_db()
+        self.assertEqual((self.bid.bid_amount, self.bid.delivery_time_days, self.bid.status), (Decimal('18.50'), 4, 'accepted'))
+        self.assertEqual(FarmerQuote.objects.get(pk=self.bid.quote_id).accepted_bid_id, self.bid.id)
+        rival_negotiation.refresh_from_db()
+        self.assertEqual(rival_negotiation.status, 'rejected')
+        self.assertIn('Accepted: 18.50', Negotiation.objects.get(pk=self.negotiation_id).last_message.message)
+
+        # Closed for good
+        self.assertEqual(self.farmer_client.post(self.url('accept')).status_code, 400)
+        self.assertEqual(self.fpo_client.post(self.url('reject')).status_code, 400)
+        response = self.fpo_client.post(f'/api/negotiation/{self.negotiation_id}/',
+                                        {'counter_amount': '18', 'counter_delivery_time_days': 4}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_without_counters_only_the_owner_accepts_the_bid_as_submitted(self):
+        self.assertEqual(self.fpo_client.post(self.url('accept')).status_code, 400)
+        self.assertEqual(client_for(make_fpo(), 'fpo').post(self.url('accept')).status_code, 403)
+        response = self.farmer_client.post(self.url('accept'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bid_amount'], str(self.bid.bid_amount))
+
+    def test_auctioned_quote_cannot_be_won_by_negotiation(self):
+        FarmerQuote.objects.filter(pk=self.bid.quote_id).update(auction_enabled=True)
+        self.counter(self.fpo_client, '30.00')
+        self.assertEqual(self.farmer_client.post(self.url('accept')).status_code, 400)
+        self.bid.refresh_from_db()
+        self.assertEqual(self.bid.status, 'submitted')
+        self.assertEqual(FarmerQuote.objects.get(pk=self.bid.quote_id).status, 'open')
+
+    def test_reject_keeps_the_bid(self):
+        self.bid.refresh_from_db()
+        terms = (self.bid.bid_amount, self.bid.delivery_time_days)
+        self.counter(self.farmer_client, '19.00', days=3)
+        response = self.fpo_client.post(self.url('reject'))
+        self.assertEqual(response.json()['negotiation']['status'], 'rejected')
+        self.bid.refresh_from_db()
+        self.assertEqual((self.bid.status, self.bid.bid_amount, self.bid.delivery_time_days), ('submitted', *terms))
+        self.assertEqual(self.farmer_client.post(self.url('accept')).status_code, 400)
+
+
+class NegotiationAcceptanceRaceTests(TransactionTestCase):
+    QUOTES = 6
+    BIDS_PER_QUOTE = 4
+
+    def negotiate(self, bid, bidder, amount):
+        negotiation = Negotiation.objects.create(content_type_id=bid_registry.for_model(type(bid)).content_type_id,
+                                                 object_id=bid.id, **Negotiation.participants_for(bid))
+        add_message(negotiation, negotiation.bidder_role, bidder, message='Counter',
+                    counter_amount=amount, counter_delivery_time_days=bid.delivery_time_days + 1)
+        return negotiation
+
+    def accept_all(self, owners_and_negotiations):
+        # Views are called directly: the test client's exception capture is not thread-safe
+        view = AcceptNegotiationView.as_view()
+        barrier = threading.Barrier(len(owners_and_negotiations))
+        results = {}
+
+        def accept(owner, role, negotiation):
+            request = APIRequestFactory().post('/')
+            force_authenticate(request, principal(owner, role))
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        results[negotiation.pk] = view(request, pk=negotiation.pk).status_code
+                        return
+                    except OperationalError:
+                        time.sleep(0.001)  # "table is locked": retry like a client would
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=accept, args=args) for args in owners_and_negotiations]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_negotiation_wins_each_quote(self):
+        # Farmer quotes with FPO bids and FPO quotes with retailer bids, all negotiated and accepted at once
+        jobs, by_quote = [], {}
+        for i in range(self.QUOTES):
+            if i % 2:
+                owner, role = make_fpo(), 'fpo'
+                quote = make_fpo_quote(owner)
+                bids = [make_retailer_bid(make_retailer(), quote) for _ in range(self.BIDS_PER_QUOTE)]
+                bidders = [bid.retailer for bid in bids]
+            else:
+                owner, role = make_farmer(), 'farmer'
+                quote = make_farmer_quote(owner)
+                bids = [make_fpo_bid(make_fpo(), quote) for _ in range(self.BIDS_PER_QUOTE)]
+                bidders = [bid.fpo for bid in bids]
+            negotiations = [self.negotiate(bid, bidder, Decimal(10 + n))
+                            for n, (bid, bidder) in enumerate(zip(bids, bidders))]
+            by_quote[quote] = negotiations
+            jobs += [(owner, role, negotiation) for negotiation in negotiations]
+
+        results = self.accept_all(jobs)
+
+        for quote, negotiations in by_quote.items():
+            statuses = sorted(results[n.pk] for n in negotiations)
+            self.assertEqual(statuses[0], 200)
+            self.assertTrue(all(code in (400, 409) for code in statuses[1:]), statuses)
+
+            quote.refresh_from_db()
+            [winner] = [n for n in negotiations if results[n.pk] == 200]
+            self.assertEqual(quote.status, 'awarded' if isinstance(quote.accepted_bid, RetailerBid) else 'accepted')
+            self.assertEqual(quote.accepted_bid.id, winner.object_id)
+            self.assertEqual(quote.accepted_bid.status, 'accepted')
+            self.assertEqual(quote.accepted_bid.bid_amount, Negotiation.objects.get(pk=winner.pk).last_counter_amount)
+            closed = dict(Negotiation.objects.filter(pk__in=[n.pk for n in negotiations]).values_list('pk', 'status'))
+            self.assertEqual(sorted(closed.values()), ['accepted'] + ['rejected'] * (self.BIDS_PER_QUOTE - 1))
+
+        self.assertEqual(FPOBid.objects.filter(status='accepted').count()
+                         + RetailerBid.objects.filter(status='accepted').count(), self.QUOTES)
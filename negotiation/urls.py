@@ -1,8 +1,16 @@
 from django.urls import path
-from .views import StartNegotiationView, NegotiationDetailView
+from .views import (
+    StartNegotiationView, NegotiationDetailView, NegotiationMessageListView, NegotiationStreamView, InboxView,
+    MarkReadView, AcceptNegotiationView, RejectNegotiationView
+)
 
 urlpatterns = [
     path('start/', StartNegotiationView.as_view(), name='start-negotiation'),
+    path('inbox/', InboxView.as_view(), name='negotiation-inbox'),
     path('<int:pk>/', NegotiationDetailView.as_view(), name='negotiation-detail'),
-    # You would add accept/reject views here as well, similar to the bid acceptance logic
+    path('<int:pk>/messages/', NegotiationMessageListView.as_view(), name='negotiation-messages'),
+    path('<int:pk>/read/', MarkReadView.as_view(), name='negotiation-mark-read'),
+    path('<int:pk>/stream/', NegotiationStreamView.as_view(), name='negotiation-stream'),
+    path('<int:pk>/accept/', AcceptNegotiationView.as_view(), name='negotiation-accept'),
+    path('<int:pk>/reject/', RejectNegotiationView.as_view(), name='negotiation-reject'),
 ]
\ No newline at end of file
@@ -1,43 +1,40 @@
 from rest_framework import generics, status
 from rest_framework.views import APIView
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
-from django.contrib.contenttypes.models import ContentType
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
+from common.idempotency import idempotent
+from common.serializers import query_list
+from farmer.contract_cache import invalidate_contract_details
+from .activity import accept_negotiation, add_message, latest_counter, mark_read, reject_negotiation
 from .models import Negotiation, NegotiationMessage
-from .serializers import NegotiationSerializer, CounterOfferSerializer
+from .serializers import NegotiationSerializer, NegotiationMessageSerializer, InboxSerializer, CounterOfferSerializer
+from .registry import bid_registry
+from .stream import EventStreamRenderer, stream_response
 from rest_framework import serializers  # Add this import
 
 def get_bid_model_instance(content_type_str, object_id):
     """Helper to get a bid object instance from its content type string and ID."""
+    bid_type = bid_registry.get(content_type_str)
+    if bid_type is None:
+        return None
     try:
-        app_label, model = content_type_str.split('.')
-        content_type = ContentType.objects.get(app_label=app_label, model=model)
-        ModelClass = content_type.model_class()
-        bid = get_object_or_404(ModelClass, pk=object_id)
-        return bid
-    except (ContentType.DoesNotExist, ValueError):
+        return get_object_or_404(bid_type.model.objects.select_related('quote'), pk=object_id)
+    except (TypeError, ValueError):
         return None
 
 def check_negotiation_permission(user, negotiation):
     """Checks if a user is part of a negotiation (either bidder or quote owner)."""
-    bid = negotiation.bid
-    quote = bid.quote
-    
-    current_user_obj = user.user_obj
-    
-    # Identify the bidder (FPO or Retailer)
-    bidder = getattr(bid, 'fpo', None) or getattr(bid, 'retailer', None)
-    
-    # Identify the quote owner (Farmer or FPO)
-    quote_owner = getattr(quote, 'farmer', None) or getattr(quote, 'fpo', None)
-
-    return current_user_obj == bidder or current_user_obj == quote_owner
+    return negotiation.is_participant(user.role, user.id)
 
 
 class StartNegotiationView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @idempotent
     def post(self, request, *args, **kwargs):
         content_type_str = request.data.get('content_type') # e.g., 'retailer.retailerbid'
         object_id = request.data.get('object_id')
@@ -47,19 +44,16 @@ class StartNegotiationView(APIView):
             return Response({"error": "Invalid bid type or ID."}, status=status.HTTP_400_BAD_REQUEST)
 
         # Correctly identify the owner of the quote the bid was placed on
-        quote = bid.quote
-        quote_owner = getattr(quote, 'farmer', None) or getattr(quote, 'fpo', None)
-
-        if not quote_owner:
-            return Response({"error": "Could not determine the quote owner."}, status=status.HTTP_400_BAD_REQUEST)
+        participants = Negotiation.participants_for(bid)
 
         # Check permissions: only the quote owner can start a negotiation.
-        if quote_owner.id != request.user.user_obj.id:
+        if (participants['owner_role'], participants['owner_id']) != (request.user.role, request.user.user_obj.id):
             return Response({"error": "Only the quote creator can start a negotiation."}, status=status.HTTP_403_FORBIDDEN)
             
         negotiation, created = Negotiation.objects.get_or_create(
-            content_type=ContentType.objects.get_for_model(bid),
-            object_id=bid.id
+            content_type_id=bid_registry.for_model(type(bid)).content_type_id,
+            object_id=bid.id,
+            defaults=participants
         )
 
         if not created:
@@ -68,13 +62,8 @@ class StartNegotiationView(APIView):
             
         # Create initial message
         sender_user = request.user.user_obj
-        NegotiationMessage.objects.create(
-            negotiation=negotiation,
-            sender_role=request.user.role,
-            sender_id=sender_user.id,
-            sender_name=sender_user.name,
-            message=f"Negotiation started for bid on '{bid.quote.product_name}'."
-        )
+        add_message(negotiation, request.user.role, sender_user,
+                    message=f"Negotiation started for bid on '{bid.quote.product_name}'.")
 
         serializer = NegotiationSerializer(negotiation)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -83,29 +72,174 @@ class NegotiationDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        negotiation = get_object_or_404(Negotiation, pk=pk)
+        queryset = Negotiation.objects.all()
+        if 'messages' in query_list(request, 'expand'):
+            queryset = queryset.prefetch_related(Prefetch('messages', queryset=NegotiationMessage.objects.order_by('id')))
+        negotiation = get_object_or_404(queryset, pk=pk)
         
         if not check_negotiation_permission(request.user, negotiation):
             return Response({"error": "You do not have permission to view this negotiation."}, status=status.HTTP_403_FORBIDDEN)
             
-        serializer = NegotiationSerializer(negotiation)
+        serializer = NegotiationSerializer(negotiation, context={'request': request})
         return Response(serializer.data)
 
+    @idempotent
     def post(self, request, pk):
         negotiation = get_object_or_404(Negotiation, pk=pk)
         
         if not check_negotiation_permission(request.user, negotiation):
             return Response({"error": "You do not have permission to post in this negotiation."}, status=status.HTTP_403_FORBIDDEN)
+        if negotiation.status != 'active':
+            return Response({"error": "This negotiation is closed."}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = CounterOfferSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         sender_user = request.user.user_obj
-        NegotiationMessage.objects.create(
-            negotiation=negotiation,
-            sender_role=request.user.role,
-            sender_id=sender_user.id,
-            sender_name=sender_user.name,
-            **serializer.validated_data
-        )
-        return Response(NegotiationSerializer(negotiation).data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        message = add_message(negotiation, request.user.role, sender_user, **serializer.validated_data)
+        # Just the new message and the negotiation state; the client already has the rest of the thread
+        return Response({
+            "message": NegotiationMessageSerializer(message).data,
+            "negotiation": NegotiationSerializer(negotiation).data,
+        }, status=status.HTTP_201_CREATED)
+
+class NegotiationMessageListView(generics.ListAPIView):
+    """
+    Thread history, newest first, keyset-paginated on id. With ?after=<id>
+    it is a delta instead: messages posted after that one, oldest first, so
+    a client that has the thread fetches only what is new.
+    """
+    serializer_class = NegotiationMessageSerializer
+    permission_classes = [IsAuthenticated]
+
+    @property
+    def keyset_ordering(self):
+        return ('id',) if 'after' in self.request.query_params else ('-id',)
+
+    def get_queryset(self):
+        negotiation = get_object_or_404(Negotiation, pk=self.kwargs['pk'])
+        if not check_negotiation_permission(self.request.user, negotiation):
+            raise PermissionDenied("You do not have permission to view this negotiation.")
+
+        queryset = NegotiationMessage.objects.filter(negotiation=negotiation)
+        after = self.request.query_params.get('after')
+        if after is not None:
+            try:
+                queryset = queryset.filter(id__gt=int(after))
+            except ValueError:
+                raise serializers.ValidationError({'after': 'A valid message id is required.'})
+        return queryset
+
+class NegotiationStreamView(APIView):
+    """
+    Server-Sent Events: new messages of a negotiation as they are posted,
+    replacing polling of NegotiationDetailView. Reconnects resume from the
+    Last-Event-ID header. Authenticate with the access_token cookie
+    (EventSource can't set headers). ASGI only; under WSGI it answers 204
+    and clients poll /messages/?after= instead.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request, pk):
+        negotiation = get_object_or_404(Negotiation, pk=pk)
+
+        if not check_negotiation_permission(request.user, negotiation):
+            return Response({"error": "You do not have permission to view this negotiation."}, status=status.HTTP_403_FORBIDDEN)
+
+        return stream_response(request, negotiation.pk)
+
+
+class InboxView(generics.ListAPIView):
+    """
+    Negotiations the caller takes part in, most recent activity first, each
+    with its latest message, latest counter terms and the caller's unread
+    count, all read from columns on the negotiation row (no per-row subqueries).
+    """
+    serializer_class = InboxSerializer
+    permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-last_activity_at', '-id')
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Negotiation.objects.for_principal(user.role, user.id).select_related('last_message')
+        if self.request.query_params.get('status'):
+            queryset = queryset.filter(status=self.request.query_params['status'])
+        return queryset
+
+class MarkReadView(APIView):
+    """POST {"message_id": N} (default: the latest) marks the thread read up to that message."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        negotiation = get_object_or_404(Negotiation, pk=pk)
+        side = negotiation.side_of(request.user.role, request.user.id)
+        if side is None:
+            return Response({"error": "You do not have permission to view this negotiation."}, status=status.HTTP_403_FORBIDDEN)
+
+        message_id = request.data.get('message_id')
+        if message_id is not None:
+            try:
+                message_id = int(message_id)
+            except (TypeError, ValueError):
+                return Response({"error": "message_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        read_id, unread = mark_read(negotiation, side, message_id)
+        return Response({"read_id": read_id, "unread_count": unread})
+
+class AcceptNegotiationView(APIView):
+    """
+    Accept the other side's latest counter-offer (with none yet, only the
+    quote owner can accept, taking the bid as submitted). The bid takes
+    those terms and wins its quote. Not available on auctioned quotes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        negotiation = get_object_or_404(Negotiation, pk=pk)
+        side = negotiation.side_of(request.user.role, request.user.id)
+        if side is None:
+            return Response({"error": "You do not have permission to act on this negotiation."}, status=status.HTTP_403_FORBIDDEN)
+        if negotiation.status != 'active':
+            return Response({"error": "This negotiation is closed."}, status=status.HTTP_400_BAD_REQUEST)
+
+        counter = latest_counter(negotiation)
+        # Without counters the standing offer is the bid itself, i.e. the bidder's
+        proposer = negotiation.side_of(counter.sender_role, counter.sender_id) if counter else 'bidder'
+        if proposer == side:
+            return Response({"error": "You cannot accept your own offer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        bid_type = bid_registry.for_content_type_id(negotiation.content_type_id)
+        bid = get_object_or_404(bid_type.model.objects.select_related('quote'), pk=negotiation.object_id)
+        if bid.quote.status != 'open':
+            return Response({"error": "Quote is not open."}, status=status.HTTP_400_BAD_REQUEST)
+        # Sealed auctions go to the best bid at the deadline, not to a negotiated one
+        if bid.quote.auction_enabled:
+            return Response({"error": "Auctioned quotes are awarded to the best bid at the deadline."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not accept_negotiation(negotiation, bid, counter, request.user.role, request.user.user_obj):
+            return Response({"error": "The negotiation or its quote changed; reload and try again."},
+                            status=status.HTTP_409_CONFLICT)
+        invalidate_contract_details(getattr(bid.quote, 'contract_address', None))
+
+        return Response({
+            "negotiation": NegotiationSerializer(negotiation).data,
+            "bid_id": bid.pk,
+            "bid_amount": str(bid.bid_amount),
+            "delivery_time_days": bid.delivery_time_days,
+            "quote_id": bid.quote_id,
+            "quote_status": bid_type.award_status,
+        })
+
+class RejectNegotiationView(APIView):
+    """Either participant ends the negotiation; the bid keeps its original terms."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        negotiation = get_object_or_404(Negotiation, pk=pk)
+        if not check_negotiation_permission(request.user, negotiation):
+            return Response({"error": "You do not have permission to act on this negotiation."}, status=status.HTTP_403_FORBIDDEN)
+
+        if not reject_negotiation(negotiation, request.user.role, request.user.user_obj):
+            return Response({"error": "This negotiation is closed."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"negotiation": NegotiationSerializer(negotiation).data})
@@ -0,0 +1,67 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from common.bench import scratch_database
+from common.testing import make_fpo, make_retailer, principal
+from fpo.models import FPOQuote
+from retailer.models import RetailerBid
+
+VARIANTS = [
+    ('full quote (?expand=quote)', '?expand=quote'),
+    ('compact default', ''),
+    ('?fields=id,bid_amount,status', '?fields=id,bid_amount,status'),
+]
+
+
+class Command(BaseCommand):
+    help = ("Compare payload size, query count and latency of one page of /api/retailer/bids/my/ "
+            "for the full nested quote, the compact default and a sparse fieldset. Uses a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=500, help="Bids placed by the measured retailer")
+        parser.add_argument('--competitors', type=int, default=20, help="Other bids on each of those quotes")
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            retailer = self.seed(options['bids'], options['competitors'])
+            client = APIClient()
+            client.force_authenticate(principal(retailer, 'retailer'))
+
+            for label, query in VARIANTS:
+                url = f"/api/retailer/bids/my/{query}{'&' if query else '?'}page_size={options['page_size']}"
+                samples = []
+                for _ in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        response = client.get(url)
+                        samples.append((time.perf_counter() - start) * 1000)
+                self.stdout.write(f"{label:>30}: {len(response.content):>9,} bytes  "
+                                  f"{len(queries):>2} queries  {statistics.median(samples):7.2f}ms")
+
+    @staticmethod
+    def seed(bid_count, competitor_count):
+        retailer = make_retailer()
+        competitors = [make_retailer() for _ in range(competitor_count)]
+        fpos = [make_fpo() for _ in range(20)]
+        deadline = date.today() + timedelta(days=30)
+        with transaction.atomic():
+            quotes = FPOQuote.objects.bulk_create([
+                FPOQuote(fpo=fpos[n % len(fpos)], product_name='Wheat flour', category='Processed Grains',
+                         description='10kg bags of stone-ground wheat flour', quantity=200, unit='bags',
+                         price_per_unit=450, deadline=deadline)
+                for n in range(bid_count)
+            ])
+            RetailerBid.objects.bulk_create([
+                RetailerBid(retailer=bidder, quote=quote, bid_amount=440, delivery_time_days=7,
+                            comments='Can collect from the warehouse')
+                for quote in quotes for bidder in [retailer, *competitors]
+            ], batch_size=5000)
+        return retailer
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_bids(apps, schema_editor):
+    """
+    Databases created before this migration may hold several bids by one
+    retailer on one quote. Keep one per (quote, retailer), the accepted bid if
+    there is one, else the latest, so the unique constraint can be added.
+    """
+    RetailerBid = apps.get_model('retailer', 'RetailerBid')
+    duplicates = list(RetailerBid.objects.values('quote_id', 'retailer_id').annotate(n=Count('id')).filter(n__gt=1))
+    for pair in duplicates:
+        bids = RetailerBid.objects.filter(quote_id=pair['quote_id'], retailer_id=pair['retailer_id'])
+        keep = bids.filter(status='accepted').order_by('-id').first() or bids.order_by('-id').first()
+        bids.exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fpo', '0007_hot_path_indexes'),
+        ('retailer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='retailer',
+            index=models.Index(fields=['created_at', 'id'], name='retailer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retailer',
+            index=models.Index(condition=models.Q(('approval_status', 'pending')), fields=['created_at'], name='retailer_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retailerbid',
+            index=models.Index(fields=['retailer', 'submitted_at', 'id'], name='retailerbid_owner_submit_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_bids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='retailerbid',
+            constraint=models.UniqueConstraint(fields=('quote', 'retailer'), name='unique_retailer_bid_per_quote'),
+        ),
+    ]
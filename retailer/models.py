@@ -18,6 +18,13 @@ class Retailer(models.Model):
     approval_status = models.CharField(max_length=10, choices=APPROVAL_STATUS, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='retailer_created_idx'),
+            # Admin "pending registrations" queue
+            models.Index(fields=['created_at'], condition=models.Q(approval_status='pending'), name='retailer_pending_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -41,5 +48,15 @@ class RetailerBid(models.Model):
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default='pending')
     transaction_hash = models.CharField(max_length=66, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of "my bids"
+            models.Index(fields=['retailer', 'submitted_at', 'id'], name='retailerbid_owner_submit_idx'),
+        ]
+        constraints = [
+            # One bid per retailer per quote; also the index behind "have I bid on this?"
+            models.UniqueConstraint(fields=['quote', 'retailer'], name='unique_retailer_bid_per_quote'),
+        ]
+
     def __str__(self):
         return f"Bid from {self.retailer.name} for {self.quote.product_name}"
\ No newline at end of file
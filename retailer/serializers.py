@@ -1,39 +1,73 @@
 from rest_framework import serializers
+from users.models import identifier_taken
+from users.password_pool import hash_password
+from django.db.models import Prefetch
 from .models import Retailer, RetailerBid
+from common.serializers import DynamicFieldsMixin
 from fpo.serializers import FPOQuoteSerializer
 
-class RetailerSerializer(serializers.ModelSerializer):
+class RetailerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Retailer
         fields = '__all__'
         extra_kwargs = {'password': {'write_only': True}}
 
+    def validate_email(self, value):
+        if identifier_taken(value, 'retailer', getattr(self.instance, 'pk', None)):
+            raise serializers.ValidationError("Retailer with this email already exists.")
+        return value
+
 class RetailerRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Retailer
         fields = ['name', 'email', 'password', 'gstin', 'wallet_address', 'city', 'state']
-        extra_kwargs = {'password': {'write_only': True}}
+        # Uniqueness is checked against the credential index in validate_email
+        extra_kwargs = {'password': {'write_only': True}, 'email': {'validators': []}}
+
+    def validate_email(self, value):
+        if identifier_taken(value, 'retailer'):
+            raise serializers.ValidationError("Retailer with this email already exists.")
+        return value
 
     def create(self, validated_data):
         password = validated_data.pop('password')
-        retailer = Retailer.objects.create(**validated_data)
-        retailer.set_password(password)
+        retailer = Retailer(**validated_data)
+        # Hash off-thread and insert once, instead of INSERT then UPDATE
+        retailer.password = hash_password(password)
         retailer.save()
         return retailer
 
-class MyBidSerializer(serializers.ModelSerializer):
-    quote = FPOQuoteSerializer(read_only=True)  # include all quote details
-    retailer_name = serializers.CharField(source='retailer.name', read_only=True)
-    retailer_email = serializers.CharField(source='retailer.email', read_only=True)
+class MyBidSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact bid rows for the retailer's own list: quote summary columns
+    only. ?expand=quote nests the full quote with its competing bids.
+    """
+    quote_product_name = serializers.CharField(source='quote.product_name', read_only=True)
+    quote_quantity = serializers.DecimalField(source='quote.quantity', read_only=True, max_digits=10, decimal_places=2)
+    quote_unit = serializers.CharField(source='quote.unit', read_only=True)
+    quote_status = serializers.CharField(source='quote.status', read_only=True)
+    quote_deadline = serializers.DateField(source='quote.deadline', read_only=True)
+    fpo_name = serializers.CharField(source='quote.fpo.name', read_only=True)
 
     class Meta:
         model = RetailerBid
         fields = [
-            'id', 'bid_amount', 'delivery_time_days', 'status', 'submitted_at',
-            'retailer_name', 'retailer_email', 'quote'
+            'id', 'bid_amount', 'delivery_time_days', 'status', 'submitted_at', 'payment_status',
+            'quote', 'quote_product_name', 'quote_quantity', 'quote_unit', 'quote_status', 'quote_deadline',
+            'fpo_name'
         ]
-        
-class RetailerBidSerializer(serializers.ModelSerializer):
+        expandable_fields = {'quote': (FPOQuoteSerializer, {'read_only': True})}
+
+    def load_for_list(self, queryset, extra=()):
+        """`queryset` projected to the requested fields, with the expanded quote prefetched."""
+        queryset = self.project(queryset, extra)
+        if self.expanded('quote'):
+            queryset = queryset.select_related('quote__fpo').prefetch_related(
+                Prefetch('quote__bids', queryset=RetailerBid.objects.select_related('retailer').order_by('id'))
+            )
+        return queryset
+
+class RetailerBidSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     retailer_name = serializers.CharField(source='retailer.name', read_only=True)
     retailer_email = serializers.CharField(source='retailer.email', read_only=True)
     quote_product_name = serializers.CharField(source='quote.product_name', read_only=True)
@@ -1,3 +1,50 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from common.testing import make_fpo, make_retailer, make_fpo_quote, make_retailer_bid, principal
+
+
+class RetailerQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.retailer = make_retailer()
+        self.client = APIClient()
+        self.client.force_authenticate(principal(self.retailer, 'retailer'))
+        self.competitors = [make_retailer() for _ in range(3)]
+
+    def add_quotes(self, count, bid=False):
+        for _ in range(count):
+            quote = make_fpo_quote(make_fpo())
+            for retailer in self.competitors:
+                make_retailer_bid(retailer, quote)
+            if bid:
+                make_retailer_bid(self.retailer, quote)
+
+    def test_open_fpo_quote_feed_budget(self):
+        self.add_quotes(10)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/retailer/quotes/fpo/open/')
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_my_bids_budget(self):
+        self.add_quotes(10, bid=True)
+        with self.assertNumQueries(1):  # bids joined to quote + fpo, selected columns only
+            response = self.client.get('/api/retailer/bids/my/')
+        rows = response.json()['results']
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]['quote_unit'], 'bags')
+        self.assertNotIn('bids', rows[0])
+
+        with self.assertNumQueries(2):  # + competing bids with their retailer
+            response = self.client.get('/api/retailer/bids/my/?expand=quote')
+        self.assertEqual(len(response.json()['results'][0]['quote']['bids']), 4)
+
+    def test_my_bids_sparse_fields(self):
+        self.add_quotes(3, bid=True)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/retailer/bids/my/?fields=id,bid_amount,fpo_name,bogus')
+        rows = response.json()['results']
+        self.assertEqual(set(rows[0]), {'id', 'bid_amount', 'fpo_name'})
+
+        self.add_quotes(1)
+        feed = self.client.get('/api/retailer/quotes/fpo/open/?fields=id,product_name').json()['results']
+        self.assertEqual(set(feed[0]), {'id', 'product_name'})
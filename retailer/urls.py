@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     RetailerRegistrationView, RetailerListView, RetailerDetailView,MyBidsListView, retailer_login_check,
-    retailer_dashboard, FPOOpenQuoteListView, RetailerBidCreateView
+    retailer_dashboard, FPOOpenQuoteListView, FPOQuoteSearchView, FPOQuoteRecommendationView, RetailerBidCreateView
 )
 
 urlpatterns = [
@@ -11,6 +11,8 @@ urlpatterns = [
     path('<int:pk>/', RetailerDetailView.as_view(), name='retailer-detail'),
     path('dashboard/', retailer_dashboard, name='retailer-dashboard'),
     path('quotes/fpo/open/', FPOOpenQuoteListView.as_view(), name='retailer-fpo-open-quotes'),
+    path('quotes/fpo/search/', FPOQuoteSearchView.as_view(), name='retailer-fpo-quote-search'),
+    path('quotes/fpo/recommended/', FPOQuoteRecommendationView.as_view(), name='retailer-fpo-quote-recommendations'),
     path('quotes/fpo/<int:quote_pk>/bids/', RetailerBidCreateView.as_view(), name='retailer-create-bid-on-fpo-quote'),
     path('bids/my/', MyBidsListView.as_view(), name='retailer-my-bids'),
 ]
\ No newline at end of file
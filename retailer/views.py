@@ -1,11 +1,22 @@
-from rest_framework import generics, status
+from rest_framework import generics, serializers, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
 from .models import Retailer, RetailerBid
 from .serializers import RetailerSerializer, RetailerRegistrationSerializer, RetailerBidSerializer
+from common.auction import auction_engine
+from common.geo import RegionFilterMixin
+from common.idempotency import IdempotentCreateMixin
+from common.matching import RecommendationListView
 from common.permissions import IsRetailer
+from common.search import QuoteSearchView
+from common.stats import read_stats, stats_key, market_key, bid_created
+from users.principal_cache import invalidate_principal
+from users.revocation import revoke_principal
+from users.views import login_status_response
 from fpo.models import FPOQuote
 from fpo.serializers import FPOQuoteSerializer
 from .serializers import MyBidSerializer
@@ -29,34 +40,7 @@ class RetailerRegistrationView(generics.CreateAPIView):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def retailer_login_check(request):
-    email = request.data.get('email')
-    
-    try:
-        retailer = Retailer.objects.get(email=email)
-        if retailer.approval_status == 'pending':
-            return Response({
-                'message': 'Your account is pending admin approval. Please wait for approval to login.',
-                'approved': False,
-                'status': 'pending'
-            }, status=status.HTTP_200_OK)
-        elif retailer.approval_status == 'rejected':
-            return Response({
-                'message': 'Your account has been rejected by admin. Please contact support.',
-                'approved': False,
-                'status': 'rejected'
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'message': 'Account is approved. You can proceed to login.',
-                'approved': True,
-                'status': 'approved'
-            }, status=status.HTTP_200_OK)
-    except Retailer.DoesNotExist:
-        return Response({
-            'message': 'Retailer not found with this email.',
-            'approved': False,
-            'status': 'not_found'
-        }, status=status.HTTP_404_NOT_FOUND)
+    return login_status_response(request.data.get('email'), 'retailer', 'Retailer not found with this email.')
 
 class RetailerListView(generics.ListAPIView):
     queryset = Retailer.objects.all()
@@ -68,30 +52,65 @@ class RetailerDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RetailerSerializer
     permission_classes = [IsAuthenticated, IsRetailer]
 
+    def perform_update(self, serializer):
+        retailer = serializer.save()
+        invalidate_principal('retailer', retailer.id)
+        if retailer.approval_status != 'approved':
+            revoke_principal('retailer', retailer.id)
+
+    def perform_destroy(self, instance):
+        retailer_id = instance.id
+        instance.delete()
+        invalidate_principal('retailer', retailer_id)
+        revoke_principal('retailer', retailer_id)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsRetailer])
 def retailer_dashboard(request):
     retailer = request.user.user_obj
 
-    fpo_quotes = FPOQuote.objects.filter(status='open')
-    my_bids = RetailerBid.objects.filter(retailer=retailer)
-    
+    # Maintained counters: one primary-key read instead of three COUNT(*)s
+    stats, market = read_stats(stats_key('retailer', retailer.id), market_key('fpo'))
+
     data = {
-        "available_fpo_quotes_count": fpo_quotes.count(),
-        "my_bids_count": my_bids.count(),
-        "accepted_bids_count": my_bids.filter(status='accepted').count(),
+        "available_fpo_quotes_count": market.open_quotes,
+        "my_bids_count": stats.bids_placed,
+        "accepted_bids_count": stats.bids_accepted,
     }
     return Response(data)
 
-class FPOOpenQuoteListView(generics.ListAPIView):
+def open_fpo_quotes_without_bid(retailer):
+    """
+    Open FPO quotes this retailer hasn't bid on, as an anti-join probing the
+    unique (quote, retailer) index once per open row walked.
+    """
+    already_bid = RetailerBid.objects.filter(quote=OuterRef('pk'), retailer=retailer)
+    return FPOQuote.objects.filter(status='open').filter(~Exists(already_bid))
+
+class FPOOpenQuoteListView(RegionFilterMixin, generics.ListAPIView):
     serializer_class = FPOQuoteSerializer
     permission_classes = [IsAuthenticated, IsRetailer]
+    owner_field = 'fpo'
 
     def get_queryset(self):
         retailer = self.request.user.user_obj
-        return FPOQuote.objects.filter(status='open').exclude(bids__retailer=retailer)
+        queryset = self.filter_region(open_fpo_quotes_without_bid(retailer))
+        return self.get_serializer_class().setup_eager_loading(queryset)
+
+class FPOQuoteSearchView(QuoteSearchView):
+    serializer_class = FPOQuoteSerializer
+    permission_classes = [IsAuthenticated, IsRetailer]
+    owner_field = 'fpo'
+
+    def get_base_queryset(self):
+        return FPOQuote.objects.all()
+
+class FPOQuoteRecommendationView(RecommendationListView):
+    serializer_class = FPOQuoteSerializer
+    permission_classes = [IsAuthenticated, IsRetailer]
+    side_role = 'retailer'
 
-class RetailerBidCreateView(generics.CreateAPIView):
+class RetailerBidCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = RetailerBidSerializer
     permission_classes = [IsAuthenticated, IsRetailer]
 
@@ -99,12 +118,22 @@ class RetailerBidCreateView(generics.CreateAPIView):
         quote = get_object_or_404(FPOQuote, pk=self.kwargs['quote_pk'])
         if quote.status != 'open':
             raise serializers.ValidationError("This quote is no longer open for bidding.")
-        serializer.save(retailer=self.request.user.user_obj, quote=quote)
+        try:
+            with transaction.atomic():
+                bid = serializer.save(retailer=self.request.user.user_obj, quote=quote)
+                bid_created('retailer', bid.retailer_id, 'fpo', quote.fpo_id)
+        except IntegrityError:
+            # unique (quote, retailer) constraint
+            raise serializers.ValidationError("You have already placed a bid on this quote.")
+        if quote.auction_enabled:
+            auction_engine.bid_placed('fpo', bid, self.request.user.user_obj.name)
 
 class MyBidsListView(generics.ListAPIView):
     serializer_class = MyBidSerializer
     permission_classes = [IsAuthenticated, IsRetailer]
+    keyset_ordering = ('-submitted_at', '-id')
 
     def get_queryset(self):
         retailer = self.request.user.user_obj
-        return RetailerBid.objects.filter(retailer=retailer).order_by('-submitted_at')
\ No newline at end of file
+        queryset = RetailerBid.objects.filter(retailer=retailer)
+        return self.get_serializer().load_for_list(queryset, extra=('submitted_at',))
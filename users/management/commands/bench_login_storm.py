@@ -0,0 +1,85 @@
+import multiprocessing
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+
+from common.bench import post_loop_worker, scratch_database, summarize
+from common.testing import make_farmer, auth_header
+from users.password_pool import hash_password, password_pool
+
+
+class Command(BaseCommand):
+    help = ("Measure dashboard latency while a login storm from several worker processes hammers "
+            "/api/token/, with hashing inline and in the password pool. Uses a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--login-workers', type=int, default=8,
+                            help="Processes posting logins, each standing in for a sync web worker.")
+        parser.add_argument('--read-threads', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        with scratch_database() as database:
+            storm_farmer = make_farmer(email='storm@bench.local')
+            storm_farmer.set_password('password123')
+            storm_farmer.save()
+            reader_headers = auth_header(make_farmer(), 'farmer')
+
+            pool_settings = settings.PASSWORD_POOL
+            for label, workers in (('inline', 0), ('pool', max(pool_settings['WORKERS'], 1))):
+                config = {**pool_settings, 'WORKERS': workers}
+                with override_settings(PASSWORD_POOL=config):
+                    password_pool.shutdown()
+                    hash_password('warm-up')
+                    latencies, statuses = self.storm(database, config, storm_farmer.email, reader_headers, options)
+                self.stdout.write(summarize(f"[{label}] dashboard", latencies))
+                self.stdout.write(f"[{label}] login responses: {dict(statuses)}")
+            password_pool.shutdown()
+
+    def storm(self, database, pool_settings, email, reader_headers, options):
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        # Workers need a moment to start Django; give each the full storm after that
+        startup = 3.0
+        body = {'username': email, 'password': 'password123', 'role': 'farmer'}
+        overrides = {'PASSWORD_POOL': pool_settings, 'ALLOWED_HOSTS': ['*']}
+        workers = [context.Process(target=post_loop_worker, args=(database, overrides, '/api/token/', body,
+                                                                  options['seconds'] + startup, results))
+                   for _ in range(options['login_workers'])]
+        for worker in workers:
+            worker.start()
+        time.sleep(startup)
+
+        stop = threading.Event()
+        latencies = []
+        lock = threading.Lock()
+
+        def read_loop():
+            client = Client()
+            while not stop.is_set():
+                start = time.perf_counter()
+                client.get('/api/farmer/dashboard/', **reader_headers)
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+            connection.close()
+
+        threads = [threading.Thread(target=read_loop) for _ in range(options['read_threads'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        statuses = Counter()
+        for _ in workers:
+            statuses.update(results.get(timeout=options['seconds'] + 60))
+        for worker in workers:
+            worker.join()
+        return latencies, statuses
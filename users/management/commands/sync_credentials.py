@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.models import Credential
+from users.signals import ROLE_BY_MODEL, credential_fields
+
+
+class Command(BaseCommand):
+    help = "Rebuild the users.Credential index from the Farmer/FPO/Retailer/Admin tables."
+
+    def handle(self, *args, **options):
+        credentials = {}
+        for model, role in ROLE_BY_MODEL.items():
+            for instance in model.objects.order_by('pk').iterator():
+                fields = credential_fields(instance)
+                key = (fields['identifier'], role)
+                if key in credentials:
+                    # Emails that only differ by case can't share one login
+                    self.stderr.write(f"Skipping {role} #{instance.pk}: duplicate identifier '{fields['identifier']}'")
+                    continue
+                credentials[key] = Credential(role=role, user_id=instance.pk, **fields)
+
+        with transaction.atomic():
+            Credential.objects.all().delete()
+            Credential.objects.bulk_create(credentials.values(), batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {len(credentials)} credentials."))
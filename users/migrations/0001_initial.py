@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Credential',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(help_text='Normalized email (or username for admins)', max_length=254)),
+                ('role', models.CharField(max_length=20)),
+                ('user_id', models.PositiveIntegerField()),
+                ('name', models.CharField(max_length=100)),
+                ('approval_status', models.CharField(max_length=10)),
+                ('password', models.CharField(max_length=128)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('identifier', 'role'), name='unique_credential_identifier'), models.UniqueConstraint(fields=('role', 'user_id'), name='unique_credential_principal')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PrincipalRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(max_length=20)),
+                ('user_id', models.PositiveIntegerField()),
+                ('token_version', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('role', 'user_id'), name='unique_principal_revocation')],
+            },
+        ),
+    ]
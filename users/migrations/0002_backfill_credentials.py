@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# role -> (app label, model, identifier field)
+ACCOUNTS = {
+    'farmer': ('farmer', 'Farmer', 'email'),
+    'fpo': ('fpo', 'FPO', 'email'),
+    'retailer': ('retailer', 'Retailer', 'email'),
+    'admin': ('admin_app', 'Admin', 'username'),
+}
+
+
+def backfill_credentials(apps, schema_editor):
+    """
+    Index the accounts that existed before Credential did; login resolves
+    only through it. Accounts whose email is a case variant of an earlier
+    account's can't be indexed; they are listed so an admin can rename them.
+    """
+    Credential = apps.get_model('users', 'Credential')
+    credentials, skipped = [], []
+    for role, (app_label, model_name, identifier_field) in ACCOUNTS.items():
+        model = apps.get_model(app_label, model_name)
+        existing = list(Credential.objects.filter(role=role).values_list('user_id', 'identifier'))
+        indexed = {user_id for user_id, _ in existing}
+        claimed = {identifier for _, identifier in existing}
+        for account in model.objects.order_by('pk').iterator():
+            identifier = (getattr(account, identifier_field) or '').strip().lower()
+            if account.pk in indexed:
+                continue
+            if identifier in claimed:
+                skipped.append(f'{role} {account.pk} ({getattr(account, identifier_field)})')
+                continue
+            claimed.add(identifier)
+            credentials.append(Credential(
+                identifier=identifier, role=role, user_id=account.pk,
+                name=account.username if role == 'admin' else account.name,
+                approval_status='approved' if role == 'admin' else account.approval_status,
+                password=account.password,
+            ))
+    Credential.objects.bulk_create(credentials, batch_size=1000, ignore_conflicts=True)
+    if skipped:
+        print(f"\n  Not indexed, so unable to log in until their email is changed: {', '.join(skipped)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('admin_app', '0001_initial'),
+        ('farmer', '0001_initial'),
+        ('fpo', '0001_initial'),
+        ('retailer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_credentials, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+from django.db import models
+
+
+class PrincipalRevocation(models.Model):
+    """
+    Revocation list for stateless JWTs. Access tokens carry a `tv` claim; any
+    token whose version is lower than `token_version` here is rejected.
+    """
+    role = models.CharField(max_length=20)
+    user_id = models.PositiveIntegerField()
+    token_version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['role', 'user_id'], name='unique_principal_revocation'),
+        ]
+
+    def __str__(self):
+        return f"{self.role}:{self.user_id} < v{self.token_version}"
+
+
+def normalize_identifier(value):
+    return (value or '').strip().lower()
+
+
+class Credential(models.Model):
+    """
+    One row per Farmer/FPO/Retailer/Admin account, kept in sync by
+    users.signals. Login, login-check and registration uniqueness checks
+    resolve an email/username here with a single indexed lookup instead of
+    querying each role table.
+    """
+    identifier = models.CharField(max_length=254, help_text="Normalized email (or username for admins)")
+    role = models.CharField(max_length=20)
+    user_id = models.PositiveIntegerField()
+    name = models.CharField(max_length=100)
+    approval_status = models.CharField(max_length=10)
+    password = models.CharField(max_length=128)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['identifier', 'role'], name='unique_credential_identifier'),
+            models.UniqueConstraint(fields=['role', 'user_id'], name='unique_credential_principal'),
+        ]
+
+    def __str__(self):
+        return f"{self.role}:{self.identifier}"
+
+
+def identifier_taken(value, role, user_id=None):
+    """Whether another `role` account already logs in as this email/username, ignoring case."""
+    taken = Credential.objects.filter(identifier=normalize_identifier(value), role=role)
+    if user_id is not None:
+        taken = taken.exclude(user_id=user_id)
+    return taken.exists()
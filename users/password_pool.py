@@ -0,0 +1,161 @@
+import atexit
+import multiprocessing
+import multiprocessing.util
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+try:
+    import fcntl
+except ImportError:  # not Unix: slots are per process
+    fcntl = None
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from rest_framework.exceptions import Throttled
+
+from common import metrics
+
+
+class PasswordPoolBusy(Throttled):
+    """Raised (as a 429) when too many hashes are already queued."""
+    default_detail = 'Too many login attempts in progress. Please retry shortly.'
+
+
+def _init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FarmerChain.settings')
+    import django
+    django.setup()
+
+
+def _verify(raw_password, encoded):
+    """Return (valid, new_encoded); new_encoded is set when the hash is outdated."""
+    if not check_password(raw_password, encoded):
+        return False, None
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, make_password(raw_password)
+    return True, None
+
+
+def _hash(raw_password):
+    return make_password(raw_password)
+
+
+class HostSlots:
+    """
+    A counting semaphore shared by every process on the host: one lock file
+    per slot, held with flock(). The kernel drops a dead process's locks, so
+    a crashed worker never leaks a slot.
+    """
+
+    def __init__(self, directory, count):
+        self.directory, self.count = directory, count
+        os.makedirs(directory, exist_ok=True)
+
+    def acquire(self):
+        """A held slot (pass it to release()), or None if all are taken."""
+        for index in range(self.count):
+            fd = os.open(os.path.join(self.directory, f'slot-{index}'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def release(self, fd):
+        os.close(fd)  # closing the only descriptor drops the lock
+
+
+class ProcessSlots:
+    """HostSlots stand-in where flock() is unavailable; counts this process only."""
+
+    def __init__(self, directory, count):
+        self._semaphore = threading.BoundedSemaphore(count)
+
+    def acquire(self):
+        return True if self._semaphore.acquire(blocking=False) else None
+
+    def release(self, token):
+        self._semaphore.release()
+
+
+class PasswordPool:
+    """
+    Runs PBKDF2 hashing/verification in a small process pool so login bursts
+    don't pin every web worker. At most MAX_PENDING jobs may be queued or
+    running across all web workers on the host; beyond that callers get
+    PasswordPoolBusy immediately, as do jobs still unfinished after TIMEOUT.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return settings.PASSWORD_POOL['WORKERS']
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                config = settings.PASSWORD_POOL
+                directory = config['LOCK_DIR'] or os.path.join(tempfile.gettempdir(), 'farmerchain-password-pool')
+                self._slots = (HostSlots if fcntl else ProcessSlots)(directory, config['MAX_PENDING'])
+                # spawn, not fork: the parent may be a threaded web worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+                # A web worker that is itself a multiprocessing child (uvicorn --workers)
+                # joins its children before atexit runs: stop the pool first, ahead of
+                # the finalizers that close the pool's queues
+                multiprocessing.util.Finalize(self, PasswordPool.shutdown, args=(self, True), exitpriority=100)
+            return self._executor
+
+    def run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        executor = self._get_executor()
+        slot = self._slots.acquire()
+        if slot is None:
+            metrics.incr('password_pool.rejected')
+            raise PasswordPoolBusy(wait=1)
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release(slot)
+            raise
+        # Held until the job is done, or cancelled while still queued
+        future.add_done_callback(lambda _: self._slots.release(slot))
+        metrics.incr('password_pool.submitted')
+        try:
+            return future.result(timeout=settings.PASSWORD_POOL['TIMEOUT'])
+        except TimeoutError:
+            future.cancel()
+            metrics.incr('password_pool.timeouts')
+            raise PasswordPoolBusy(wait=1)
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+password_pool = PasswordPool()
+atexit.register(password_pool.shutdown)
+
+
+def verify_password(raw_password, encoded):
+    return password_pool.run(_verify, raw_password, encoded)
+
+
+def hash_password(raw_password):
+    return password_pool.run(_hash, raw_password)
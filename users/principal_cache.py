@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from common import metrics
+
+
+class Principal:
+    """
+    Lightweight request.user for our role-based JWT auth.
+
+    Replaces the throwaway class that used to be built with type() on every
+    request. `user_obj` holds the Farmer/FPO/Retailer/Admin row.
+    """
+    __slots__ = ('id', 'username', 'role', 'name', 'user_obj')
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, id, username, role, name, user_obj=None):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.name = name
+        self.user_obj = user_obj
+
+    @property
+    def pk(self):
+        return self.id
+
+    def has_perm(self, perm, obj=None):
+        return False
+
+    def has_module_perms(self, app_label):
+        return False
+
+    def __str__(self):
+        return self.username or ''
+
+
+class PrincipalCache:
+    """
+    Bounded LRU + TTL cache of principal rows keyed by (role, user_id).
+
+    The cache is per process, so other workers only notice an invalidation
+    once their own entry expires; keep the TTL short.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return settings.PRINCIPAL_CACHE.get('MAX_ENTRIES', 10000)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return settings.PRINCIPAL_CACHE.get('TTL', 60)
+
+    def get(self, role, user_id, loader):
+        key = (role, user_id)
+        ttl = self.ttl
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                metrics.incr('principal_cache.hits')
+                return entry[1]
+            generation = self._generation
+
+        metrics.incr('principal_cache.misses')
+        user_obj = loader()
+        if ttl <= 0:
+            return user_obj
+
+        with self._lock:
+            # An invalidation raced with our load; don't store a stale row.
+            if generation != self._generation:
+                return user_obj
+            self._entries[key] = (now + ttl, user_obj)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.incr('principal_cache.evictions')
+        return user_obj
+
+    def invalidate(self, role, user_id):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop((role, user_id), None)
+        metrics.incr('principal_cache.invalidations')
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_principal(role, user_id):
+    """Call whenever a principal row (approval status, name, ...) changes."""
+    principal_cache.invalidate(role, user_id)
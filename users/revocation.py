@@ -0,0 +1,87 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from common import metrics
+from users.models import PrincipalRevocation
+
+
+def stateless_auth_enabled():
+    return settings.STATELESS_AUTH.get('ENABLED', False)
+
+
+def current_token_version(role, user_id):
+    """Version to stamp into newly issued tokens (0 if never revoked)."""
+    row = PrincipalRevocation.objects.filter(role=role, user_id=user_id).values_list('token_version', flat=True).first()
+    return row or 0
+
+
+def revoke_principal(role, user_id):
+    """
+    Invalidate every token issued so far for this principal. Called by the
+    admin reject views and on logout.
+    """
+    with transaction.atomic():
+        revocation, created = PrincipalRevocation.objects.get_or_create(role=role, user_id=user_id)
+        if not created:
+            PrincipalRevocation.objects.filter(pk=revocation.pk).update(token_version=F('token_version') + 1)
+            revocation.refresh_from_db(fields=['token_version'])
+    revocation_set.note(role, user_id, revocation.token_version)
+    metrics.incr('revocation.revoked')
+    return revocation.token_version
+
+
+class RevocationSet:
+    """
+    In-process copy of PrincipalRevocation as {(role, user_id): version}.
+
+    The table only holds principals that were ever rejected or logged out, so
+    an exact dict is both small and free of false positives. It is refreshed
+    incrementally (rows touched since the last refresh) at most once every
+    STATELESS_AUTH['REVOCATION_REFRESH'] seconds, keeping the per-request
+    cost at zero queries.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._last_refresh = None
+        self._high_water = None
+        self._lock = threading.Lock()
+
+    def note(self, role, user_id, version):
+        with self._lock:
+            if version > self._versions.get((role, user_id), 0):
+                self._versions[(role, user_id)] = version
+
+    def refresh(self, force=False):
+        interval = settings.STATELESS_AUTH.get('REVOCATION_REFRESH', 5)
+        now = time.monotonic()
+        if not force and self._last_refresh is not None and now - self._last_refresh < interval:
+            return
+        self._last_refresh = now
+
+        rows = PrincipalRevocation.objects.all()
+        if self._high_water is not None:
+            # >= so rows written in the same tick as the last refresh aren't lost
+            rows = rows.filter(updated_at__gte=self._high_water)
+        for role, user_id, version, updated_at in rows.values_list('role', 'user_id', 'token_version', 'updated_at'):
+            self.note(role, user_id, version)
+            if self._high_water is None or updated_at > self._high_water:
+                self._high_water = updated_at
+        metrics.incr('revocation.refreshes')
+
+    def is_revoked(self, role, user_id, token_version):
+        self.refresh()
+        return token_version < self._versions.get((role, user_id), 0)
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+            self._last_refresh = None
+            self._high_water = None
+
+
+revocation_set = RevocationSet()
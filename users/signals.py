@@ -0,0 +1,68 @@
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_save, post_delete
+
+from common import metrics
+
+from farmer.models import Farmer
+from fpo.models import FPO
+from retailer.models import Retailer
+from admin_app.models import Admin
+from users.models import Credential, normalize_identifier
+
+ROLE_BY_MODEL = {
+    Farmer: 'farmer',
+    FPO: 'fpo',
+    Retailer: 'retailer',
+    Admin: 'admin',
+}
+
+
+def credential_fields(instance):
+    """Credential columns for a Farmer/FPO/Retailer/Admin instance."""
+    if isinstance(instance, Admin):
+        return {
+            'identifier': normalize_identifier(instance.username),
+            'name': instance.username,
+            'approval_status': 'approved',
+            'password': instance.password,
+        }
+    return {
+        'identifier': normalize_identifier(instance.email),
+        'name': instance.name,
+        'approval_status': instance.approval_status,
+        'password': instance.password,
+    }
+
+
+logger = logging.getLogger(__name__)
+
+
+def sync_credential(sender, instance, **kwargs):
+    """
+    Mirror the account into Credential. An account whose email only differs
+    in case from another one's (possible for rows older than Credential)
+    can't be indexed: it is logged and left without a Credential, so it
+    can't log in, rather than failing the save that triggered the sync.
+    """
+    role = ROLE_BY_MODEL[sender]
+    fields = credential_fields(instance)
+    try:
+        with transaction.atomic():
+            updated = Credential.objects.filter(role=role, user_id=instance.pk).update(**fields)
+            if not updated:
+                Credential.objects.create(role=role, user_id=instance.pk, **fields)
+    except IntegrityError:
+        metrics.incr('credentials.conflicts')
+        logger.warning("Not indexing %s %s: %r is already another %s account's login.",
+                       role, instance.pk, fields['identifier'], role)
+
+
+def delete_credential(sender, instance, **kwargs):
+    Credential.objects.filter(role=ROLE_BY_MODEL[sender], user_id=instance.pk).delete()
+
+
+for model in ROLE_BY_MODEL:
+    post_save.connect(sync_credential, sender=model, dispatch_uid=f'sync_credential_{model.__name__}')
+    post_delete.connect(delete_credential, sender=model, dispatch_uid=f'delete_credential_{model.__name__}')
@@ -0,0 +1,203 @@
+import shutil
+import tempfile
+from concurrent.futures import Future
+from contextlib import redirect_stdout
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from common import metrics
+from common.testing import make_admin, make_farmer, make_fpo, principal
+from farmer.models import Farmer
+from users.models import Credential
+from users.password_pool import HostSlots, PasswordPoolBusy, password_pool
+
+
+class CredentialIndexTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_farmer(email='Ravi@Example.com')
+        self.farmer.set_password('password123')
+        self.farmer.save()
+
+    def test_credential_follows_principal_row(self):
+        credential = Credential.objects.get(role='farmer', user_id=self.farmer.id)
+        self.assertEqual(credential.identifier, 'ravi@example.com')
+        self.assertEqual(credential.password, self.farmer.password)
+
+        self.farmer.approval_status = 'rejected'
+        self.farmer.save()
+        credential.refresh_from_db()
+        self.assertEqual(credential.approval_status, 'rejected')
+
+        self.farmer.delete()
+        self.assertFalse(Credential.objects.filter(role='farmer').exists())
+
+    def test_login_is_a_single_lookup(self):
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/token/', {
+                'username': 'RAVI@example.com', 'password': 'password123', 'role': 'farmer',
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user_id'], self.farmer.id)
+
+    def test_login_rejects_pending_account(self):
+        self.farmer.approval_status = 'pending'
+        self.farmer.save()
+        response = self.client.post('/api/token/', {
+            'username': self.farmer.email, 'password': 'password123', 'role': 'farmer',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_check_and_account_status(self):
+        response = self.client.post('/api/farmer/login-check/', {'email': 'ravi@example.com'}, format='json')
+        self.assertEqual(response.json()['status'], 'approved')
+
+        make_fpo(email='ravi@example.com', approval_status='pending')
+        response = self.client.post('/api/token/status/', {'email': 'ravi@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['role'], 'farmer')
+        self.assertEqual({a['role'] for a in response.json()['accounts']}, {'farmer', 'fpo'})
+
+        response = self.client.post('/api/token/status/', {'email': 'nobody@example.com'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_registration_rejects_case_variant_email(self):
+        response = self.client.post('/api/farmer/register/', {
+            'name': 'Ravi', 'email': 'ravi@EXAMPLE.com', 'password': 'password123',
+            'aadhaar_number': '999999999999', 'wallet_address': '0xNEW', 'city': 'Pune', 'state': 'Maharashtra',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+    def test_profile_update_rejects_case_variant_email(self):
+        other = make_farmer(email='asha@example.com')
+        self.client.force_authenticate(principal(self.farmer, 'farmer'))
+        response = self.client.patch(f'/api/farmer/{self.farmer.id}/', {'email': 'Asha@Example.com'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+        self.assertEqual(Credential.objects.get(role='farmer', user_id=other.id).identifier, 'asha@example.com')
+
+        # Changing the case of one's own email is fine
+        response = self.client.patch(f'/api/farmer/{self.farmer.id}/', {'email': 'ravi@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def legacy_case_variant(self):
+        """A farmer from before Credential, sharing self.farmer's email up to case."""
+        legacy = make_farmer(email='legacy@example.com', approval_status='pending')
+        Farmer.objects.filter(pk=legacy.pk).update(email=self.farmer.email.upper())
+        Credential.objects.filter(role='farmer', user_id=legacy.id).delete()
+        legacy.refresh_from_db()
+        return legacy
+
+    def test_migration_backfills_existing_accounts(self):
+        fpo = make_fpo(email='Mandi@Example.com')
+        legacy = self.legacy_case_variant()
+        Credential.objects.exclude(role='farmer', user_id=self.farmer.id).delete()
+
+        output = StringIO()
+        with redirect_stdout(output):
+            import_module('users.migrations.0002_backfill_credentials').backfill_credentials(apps, None)
+        self.assertEqual(Credential.objects.get(role='fpo', user_id=fpo.id).identifier, 'mandi@example.com')
+        self.assertEqual(Credential.objects.filter(role='farmer').count(), 1)
+        self.assertIn(f'farmer {legacy.id} ({legacy.email})', output.getvalue())
+
+    def test_unindexable_account_can_still_be_saved(self):
+        legacy = self.legacy_case_variant()
+        metrics.reset()
+        self.client.force_authenticate(principal(make_admin(), 'admin'))
+        with self.assertLogs('users.signals', 'WARNING'):
+            response = self.client.post(f'/api/admin/approve-farmer/{legacy.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Credential.objects.filter(role='farmer', user_id=legacy.id).exists())
+        self.assertEqual(metrics.get('credentials.conflicts'), 1)
+
+
+class PasswordPoolTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_farmer()
+
+    def login(self):
+        return self.client.post('/api/token/', {
+            'username': self.farmer.email, 'password': 'password123', 'role': 'farmer',
+        }, format='json')
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        self.farmer.password = PBKDF2PasswordHasher().encode('password123', 'somesalt', iterations=1000)
+        self.farmer.save()
+
+        self.assertEqual(self.login().status_code, 200)
+
+        self.farmer.refresh_from_db()
+        self.assertFalse(PBKDF2PasswordHasher().must_update(self.farmer.password))
+        self.assertTrue(self.farmer.check_password('password123'))
+        self.assertEqual(Credential.objects.get(role='farmer', user_id=self.farmer.id).password, self.farmer.password)
+
+    def test_saturated_pool_returns_429(self):
+        self.farmer.set_password('password123')
+        self.farmer.save()
+        with mock.patch('users.token.verify_password', side_effect=PasswordPoolBusy(wait=1)):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class StalledExecutor:
+    """ProcessPoolExecutor stand-in whose jobs never start."""
+    def __init__(self, **kwargs):
+        pass
+
+    def submit(self, fn, *args):
+        return Future()
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+class PasswordPoolLimitTests(TestCase):
+    def setUp(self):
+        self.lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.lock_dir, True)
+        pool = {**settings.PASSWORD_POOL, 'WORKERS': 1, 'MAX_PENDING': 1, 'TIMEOUT': 0.05, 'LOCK_DIR': self.lock_dir}
+        self.enterContext(override_settings(PASSWORD_POOL=pool))
+        self.enterContext(mock.patch('users.password_pool.ProcessPoolExecutor', StalledExecutor))
+        password_pool.shutdown()
+        self.addCleanup(password_pool.shutdown)
+        metrics.reset()
+        self.client = APIClient()
+        self.farmer = make_farmer()
+
+    def login(self):
+        return self.client.post('/api/token/', {
+            'username': self.farmer.email, 'password': 'password123', 'role': 'farmer',
+        }, format='json')
+
+    def test_slots_are_shared_by_every_holder_of_the_lock_files(self):
+        # Each HostSlots opens its own descriptors, as another worker process would
+        first, second = HostSlots(self.lock_dir, 1), HostSlots(self.lock_dir, 1)
+        held = first.acquire()
+        self.assertIsNone(second.acquire())
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(metrics.get('password_pool.rejected'), 1)
+        first.release(held)
+        second.release(second.acquire())
+
+    def test_timeouts_answer_429_and_free_the_slot(self):
+        for _ in range(2):
+            response = self.login()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '1')
+        response = self.client.post('/api/farmer/register/', {
+            'name': 'Ravi', 'email': 'new@example.com', 'password': 'password123',
+            'aadhaar_number': '999999999999', 'wallet_address': '0xNEW', 'city': 'Pune', 'state': 'Maharashtra',
+        }, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual((metrics.get('password_pool.timeouts'), metrics.get('password_pool.rejected')), (3, 0))
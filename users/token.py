@@ -2,14 +2,23 @@ from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
-from farmer.models import Farmer
-from fpo.models import FPO
-from retailer.models import Retailer
-from admin_app.models import Admin
+from users.models import Credential, normalize_identifier
+from users.password_pool import PasswordPoolBusy, verify_password
+from users.principal_cache import Principal
+from users.token_auth import PRINCIPAL_MODELS
+from users.revocation import stateless_auth_enabled, current_token_version
 from rest_framework.response import Response
 from django.conf import settings
 
 
+ROLE_LABELS = {
+    "farmer": "Farmer",
+    "fpo": "FPO",
+    "retailer": "Retailer",
+    "admin": "Admin",
+}
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     # Require 'role' in addition to username/email and password
     role = serializers.CharField(required=True)
@@ -19,69 +28,39 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         user_identifier = attrs.get("username")
         password = attrs.get("password")
 
-        # Determine which model to authenticate against
-        user = None
-        user_data = {}
-        
-        if role == "farmer":
-            try:
-                user = Farmer.objects.get(email=user_identifier)
-                if user.approval_status != 'approved':
-                    raise serializers.ValidationError("Account pending admin approval.")
-                user_data = {
-                    'id': user.id,
-                    'username': user.email,
-                    'role': 'farmer',
-                    'name': user.name
-                }
-            except Farmer.DoesNotExist:
-                raise serializers.ValidationError("Farmer not found.")
-        elif role == "fpo":
-            try:
-                user = FPO.objects.get(email=user_identifier)
-                if user.approval_status != 'approved':
-                    raise serializers.ValidationError("Account pending admin approval.")
-                user_data = {
-                    'id': user.id,
-                    'username': user.email,
-                    'role': 'fpo',
-                    'name': user.name
-                }
-            except FPO.DoesNotExist:
-                raise serializers.ValidationError("FPO not found.")
-        elif role == "retailer":
-            try:
-                user = Retailer.objects.get(email=user_identifier)
-                if user.approval_status != 'approved':
-                    raise serializers.ValidationError("Account pending admin approval.")
-                user_data = {
-                    'id': user.id,
-                    'username': user.email,
-                    'role': 'retailer',
-                    'name': user.name
-                }
-            except Retailer.DoesNotExist:
-                raise serializers.ValidationError("Retailer not found.")
-        elif role == "admin":
-            try:
-                user = Admin.objects.get(username=user_identifier)
-                # Verify password for admin
-                if not user.check_password(password):
-                    raise serializers.ValidationError("Incorrect password.")
-                user_data = {
-                    'id': user.id,
-                    'username': user.username,
-                    'role': 'admin',
-                    'name': user.username
-                }
-            except Admin.DoesNotExist:
-                raise serializers.ValidationError("Admin not found.")
-        else:
+        if role not in ROLE_LABELS:
             raise serializers.ValidationError("Invalid role. Must be one of: farmer, fpo, retailer, admin.")
 
-        # Verify password for non-admin users
-        if role != "admin" and not user.check_password(password):
+        # One indexed lookup on the credential table instead of a per-role query
+        credential = Credential.objects.filter(
+            identifier=normalize_identifier(user_identifier), role=role
+        ).first()
+        if credential is None:
+            raise serializers.ValidationError(f"{ROLE_LABELS[role]} not found.")
+        if credential.approval_status != 'approved':
+            raise serializers.ValidationError("Account pending admin approval.")
+        valid, rehashed = verify_password(password, credential.password)
+        if not valid:
             raise serializers.ValidationError("Incorrect password.")
+        if rehashed:
+            # Transparently upgrade hashes made with an older hasher/iteration count
+            PRINCIPAL_MODELS[role].objects.filter(pk=credential.user_id).update(password=rehashed)
+            Credential.objects.filter(pk=credential.pk).update(password=rehashed)
+
+        # Admin usernames keep their original case in `name`
+        username = credential.name if role == "admin" else credential.identifier
+        user = Principal(
+            id=credential.user_id,
+            username=username,
+            role=role,
+            name=credential.name,
+        )
+        user_data = {
+            'id': credential.user_id,
+            'username': username,
+            'role': role,
+            'name': credential.name
+        }
 
         # Create a custom token payload using the proper method
         refresh = self.get_token(user)
@@ -90,6 +69,11 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         refresh['role'] = user_data['role']
         refresh['name'] = user_data['name']
 
+        if stateless_auth_enabled():
+            # Let CustomJWTAuthentication authorize without touching the DB
+            refresh['approval_status'] = credential.approval_status
+            refresh['tv'] = current_token_version(user_data['role'], user_data['id'])
+
         data = {
             "refresh": str(refresh),
             "access": str(refresh.access_token),
@@ -114,6 +98,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
         try:
             serializer.is_valid(raise_exception=True)
+        except PasswordPoolBusy as e:
+            return Response({"error": str(e.detail)}, status=429, headers={"Retry-After": str(e.wait)})
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
@@ -4,6 +4,16 @@ from farmer.models import Farmer
 from fpo.models import FPO
 from retailer.models import Retailer
 from admin_app.models import Admin
+from users.principal_cache import Principal, principal_cache
+from users.revocation import stateless_auth_enabled, revocation_set
+
+
+PRINCIPAL_MODELS = {
+    "farmer": Farmer,
+    "fpo": FPO,
+    "retailer": Retailer,
+    "admin": Admin,
+}
 
 
 class CustomJWTAuthentication(JWTAuthentication):
@@ -34,36 +44,47 @@ class CustomJWTAuthentication(JWTAuthentication):
         if not user_id or not role:
             raise InvalidToken("Token is missing required claims (user_id, role).")
 
-        # Create a simple, dynamic user object compatible with Django's request.user
-        user = type("User", (), {
-            "id": user_id,
-            "username": validated_token.get("username"),
-            "role": role,
-            "name": validated_token.get("name"),
-            "is_authenticated": True,
-            "is_active": True,
-            "is_staff": False,
-            "is_superuser": False,
-            "has_perm": lambda self, perm: False,
-            "has_module_perms": lambda self, app_label: False,
-            "__str__": lambda self: self.username,
-            "user_obj": None  # Placeholder for the real model instance
-        })()
-        
+        model = PRINCIPAL_MODELS.get(role)
+        if model is None:
+            raise InvalidToken(f"Invalid role '{role}' in token.")
+
+        if stateless_auth_enabled() and "approval_status" in validated_token and "tv" in validated_token:
+            if revocation_set.is_revoked(role, user_id, validated_token["tv"]):
+                raise InvalidToken("Token has been revoked.")
+            return Principal(
+                id=user_id,
+                username=validated_token.get("username"),
+                role=role,
+                name=validated_token.get("name"),
+                user_obj=self.get_stateless_user_obj(model, validated_token),
+            )
+
         try:
-            # Fetch the real database object and attach it to our custom user
-            if role == "farmer":
-                user.user_obj = Farmer.objects.get(pk=user_id)
-            elif role == "fpo":
-                user.user_obj = FPO.objects.get(pk=user_id)
-            elif role == "retailer":
-                user.user_obj = Retailer.objects.get(pk=user_id)
-            elif role == "admin":
-                user.user_obj = Admin.objects.get(pk=user_id)
-            else:
-                raise InvalidToken(f"Invalid role '{role}' in token.")
-            
-            return user
+            # Fetch the real database object (or a cached copy) and attach it to our user
+            user_obj = principal_cache.get(role, user_id, lambda: model.objects.get(pk=user_id))
+        except model.DoesNotExist:
+            raise InvalidToken("User not found for the given token.")
+
+        return Principal(
+            id=user_id,
+            username=validated_token.get("username"),
+            role=role,
+            name=validated_token.get("name"),
+            user_obj=user_obj,
+        )
 
-        except (Farmer.DoesNotExist, FPO.DoesNotExist, Retailer.DoesNotExist, Admin.DoesNotExist):
-            raise InvalidToken("User not found for the given token.")
\ No newline at end of file
+    @staticmethod
+    def get_stateless_user_obj(model, validated_token):
+        """
+        Unsaved stand-in for the principal row built from token claims. It only
+        carries id, name/email and approval status: enough for the permission
+        classes and for filtering by FK. Never call save() on it.
+        """
+        if model is Admin:
+            return Admin(id=validated_token["user_id"], username=validated_token.get("username"))
+        return model(
+            id=validated_token["user_id"],
+            name=validated_token.get("name"),
+            email=validated_token.get("username"),
+            approval_status=validated_token["approval_status"],
+        )
@@ -1,9 +1,44 @@
 from rest_framework.views import APIView
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 from django.conf import settings
+from common import metrics
+from common.permissions import IsAdminApp
+from users.models import Credential, normalize_identifier
+from users.revocation import revocation_set, revoke_principal
+
+
+APPROVAL_STATUS_MESSAGES = {
+    'pending': 'Your account is pending admin approval. Please wait for approval to login.',
+    'rejected': 'Your account has been rejected by admin. Please contact support.',
+    'approved': 'Account is approved. You can proceed to login.',
+}
+
+
+def approval_status_payload(approval_status):
+    return {
+        'message': APPROVAL_STATUS_MESSAGES.get(approval_status, APPROVAL_STATUS_MESSAGES['pending']),
+        'approved': approval_status == 'approved',
+        'status': approval_status,
+    }
+
+
+def login_status_response(identifier, role, not_found_message):
+    """Shared body of the farmer/fpo/retailer login-check views."""
+    approval_status = Credential.objects.filter(
+        identifier=normalize_identifier(identifier), role=role
+    ).values_list('approval_status', flat=True).first()
+
+    if approval_status is None:
+        return Response({
+            'message': not_found_message,
+            'approved': False,
+            'status': 'not_found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response(approval_status_payload(approval_status), status=status.HTTP_200_OK)
 
 
 class CookieTokenRefreshView(APIView):
@@ -18,6 +53,11 @@ class CookieTokenRefreshView(APIView):
         
         try:
             refresh = RefreshToken(refresh_token)
+            if "tv" in refresh and revocation_set.is_revoked(refresh.get("role"), refresh.get("user_id"), refresh["tv"]):
+                return Response(
+                    {"error": "Refresh token has been revoked"},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
             access_token = str(refresh.access_token)
             
             response = Response({"message": "Token refreshed successfully"})
@@ -43,6 +83,11 @@ class CookieTokenRefreshView(APIView):
 
 class LogoutView(APIView):
     def post(self, request):
+        # Kill any stateless tokens still held by other clients/devices
+        role = getattr(request.user, "role", None)
+        if role:
+            revoke_principal(role, request.user.id)
+
         response = Response({"message": "Logged out successfully"})
         
         # Clear cookies with path and samesite
@@ -50,3 +95,42 @@ class LogoutView(APIView):
         response.delete_cookie('refresh_token', path='/', samesite='Lax')
         
         return response
+
+
+class MetricsView(APIView):
+    """In-process counters (principal cache hits/misses, ...) for this worker."""
+    permission_classes = [IsAdminApp]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
+class AccountStatusView(APIView):
+    """
+    Role-agnostic login check: POST {"username" or "email", optional "role"}.
+    Lists every account registered under the identifier.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        identifier = request.data.get('username') or request.data.get('email')
+        credentials = Credential.objects.filter(identifier=normalize_identifier(identifier))
+        role = request.data.get('role')
+        if role:
+            credentials = credentials.filter(role=role.lower())
+
+        accounts = [
+            {'role': account_role, **approval_status_payload(approval_status)}
+            for account_role, approval_status in credentials.values_list('role', 'approval_status')
+        ]
+        if not accounts:
+            return Response({
+                'message': 'No account found with this email or username.',
+                'approved': False,
+                'status': 'not_found',
+                'accounts': []
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # Report the most useful account first: an approved one if there is any
+        accounts.sort(key=lambda account: not account['approved'])
+        return Response({**accounts[0], 'accounts': accounts}, status=status.HTTP_200_OK)